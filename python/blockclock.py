@@ -10,14 +10,41 @@ in sync with the built-in refresh cycle of the device.
 
 import os
 import sys
-import time
-import random
 import logging
-import requests
-import json
-import subprocess
 import re
-from datetime import datetime
+
+from device_client import DevicePool, read_display
+from device_registry import DeviceRegistry, parse_settings
+from circuit_breaker import CircuitBreakerRegistry, DeviceUnavailable, CLOSED, OPEN
+from display_cache import DisplayCache
+from send_shaping import SendPolicy
+from send_dedup import SendDeduplicator
+from device_probe import probe_devices
+from refresh_learner import RefreshPhaseLearner
+from device_scheduler import RotationScheduler
+from sync_state import SyncStateStore
+from text_selection import create_selector, create_catalog_selector, parse_text_option, DEFAULT_STRATEGY
+from text_catalog import TextCatalog, resolve_catalog_path
+from playlists import PlaylistIndex, parse_playlists
+from quiet_hours import QuietHoursPolicy
+from virtual_clock import SystemClock
+from engine_events import EventChannel, SEND_COMPLETE, DEVICE_DOWN, DEVICE_UP
+
+# Seconds the BlockClock needs to finish its refresh animation
+ANIMATION_DELAY = 6
+
+# Minimum learner confidence before its prediction replaces the fixed countdown
+PREDICTION_CONFIDENCE = 0.5
+
+# Display snapshots younger than this are reused instead of asking the device again
+DISPLAY_MAX_AGE = 0.5
+
+# Runtime files shared with the web app live next to the logs
+RUNTIME_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+DISPLAY_SNAPSHOT_FILE = os.path.join(RUNTIME_DIR, "display_snapshots.json")
+DEVICE_STATUS_FILE = os.path.join(RUNTIME_DIR, "device_status.json")
+SYNC_STATE_FILE = os.path.join(RUNTIME_DIR, "sync_state.json")
+ENGINE_EVENTS_SOCKET = os.path.join(RUNTIME_DIR, "engine_events.sock")
 
 # Sentinel to prevent multiple executions
 _BLOCKCLOCK_LOADED = False
@@ -89,10 +116,21 @@ def setup_logging(log_file=None):
 class BlockClockControl:
     """Main class for controlling BlockClock devices"""
     
-    def __init__(self, config_file=None, should_continue_callback=None):
-        """Initialize with default settings or from config file"""
+    def __init__(self, config_file=None, should_continue_callback=None, clock=None, events=None):
+        """
+        Initialize with default settings or from config file. clock is a
+        SystemClock (default) or a VirtualClock for simulated time. events
+        is the EventChannel the rotation reports to, by default the web
+        app's socket.
+        """
         self.logger = setup_logging()
         
+        # Every time, monotonic time and sleep of the rotation comes from here
+        self.clock = clock or SystemClock()
+        
+        # Typed events for the web app (see engine_events.py)
+        self.events = events or EventChannel(ENGINE_EVENTS_SOCKET, clock=self.clock.time)
+        
         # Default settings
         self.devices = [
             {
@@ -102,24 +140,72 @@ class BlockClockControl:
             }
         ]
         
+        self.registry = DeviceRegistry(self.devices)
+        
         self.text_options = ["__GFY__" "WENMOON" "_BTFD_" "FIATSUX" "_HODL_" "SATOSHI" "_NGMI_" "BITCOIN"]
+        self.text_selection = DEFAULT_STRATEGY
+        self.text_selector = create_selector(self.text_options, self.text_selection)
+        self.text_catalog = None
+        
+        # Time-windowed playlists, reloaded when the config file changes
+        self.playlists = PlaylistIndex(clock=self.clock.time)
+        self.active_playlists = {}
+        self.config_file = config_file
+        self.config_mtime = None
+        
+        # No device traffic during quiet hours (per device, group or for all)
+        self.quiet_hours = QuietHoursPolicy()
         self.clock_refresh_time = 300  # in seconds
         self.displays_between_text = 3
         
         # Default callback always returns True if none provided
         self.should_continue = should_continue_callback or (lambda: True)
         
+        # All waits go through here so an embedding engine can interrupt them
+        self.sleep = self.clock.sleep
+        
+        # Keep-alive connections to each device, reused across polls. Circuit
+        # breaker states are shared with the web app through a status file.
+        self.connections = DevicePool(timeout=5, breakers=CircuitBreakerRegistry(status_file=DEVICE_STATUS_FILE,
+                                                                                 clock=self.clock.monotonic,
+                                                                                 wall_clock=self.clock.time,
+                                                                                 on_transition=self.on_breaker_transition))
+        
+        # How sends to many devices are spread over groups and time
+        self.send_policy = SendPolicy()
+        
+        # Latest display per device, shared with the web app through a snapshot file
+        self.display_cache = DisplayCache(self.fetch_display, max_staleness=DISPLAY_MAX_AGE,
+                                          snapshot_file=DISPLAY_SNAPSHOT_FILE, clock=self.clock.time)
+        
+        # Skips sends of a text a device already shows or was just sent
+        self.send_dedup = SendDeduplicator(self.display_cache, clock=self.clock.monotonic)
+        
         # Load configuration from file if provided
         if config_file and os.path.exists(config_file):
             self.load_config(config_file)
         
+        # Learns the real refresh period and phase from detected refreshes
+        self.refresh_learner = RefreshPhaseLearner(self.clock_refresh_time)
+        self.animation_delay = ANIMATION_DELAY
+        self.prediction_confidence = PREDICTION_CONFIDENCE
+        
+        # Refresh phases and cycle positions saved for a warm restart
+        self.sync_state = SyncStateStore(SYNC_STATE_FILE, clock=self.clock)
+        
+        # Per-device rotation scheduler, created by run()
+        self.scheduler = None
+        
         self.logger.info("🚀 Starting BlockClock Custom Text Rotation Script")
         self.logger.info(f"📊 Custom Text will Display every {self.displays_between_text * self.clock_refresh_time // 60} minutes")
         
         # List configured devices
         self.logger.info("ℹ️  Current configuration:")
         for i, device in enumerate(self.devices):
-            self.logger.info(f"   - Device {i+1}: {device['name']} ({device['ip']})")
+            if "refresh_time" in device:
+                self.logger.info(f"   - Device {i+1}: {device['name']} ({device['ip']}, refreshes every {device['refresh_time']} seconds)")
+            else:
+                self.logger.info(f"   - Device {i+1}: {device['name']} ({device['ip']})")
         self.logger.info(f"   - Refresh time: {self.clock_refresh_time // 60} mins ({self.clock_refresh_time} seconds)")
         self.logger.info(f"   - Displays between Custom Text: {self.displays_between_text}")
         
@@ -129,40 +215,15 @@ class BlockClockControl:
         #self.logger.info("\n")
         self.logger.info(f"ℹ️  Loading your configuration")
             
-        # Dictionary to store settings
-        config = {}
-        
         try:
+            # Parse KEY=value settings (later lines override earlier ones)
             with open(config_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    # Skip comments and empty lines
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    # Parse key-value pairs
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        # Remove quotes if present
-                        if value.startswith('"') and value.endswith('"'):
-                            value = value[1:-1]
-                        
-                        config[key] = value
+                config = parse_settings(f)
+            self.config_mtime = os.path.getmtime(config_file)
             
-            # Process device information
-            devices = []
-            for i in range(1, 6):  # Check for up to 5 devices
-                device_ip_key = f"DEVICE_{i}_IP"
-                if device_ip_key in config and config[device_ip_key]:
-                    device = {
-                        "name": config.get(f"DEVICE_{i}_NAME", f"Device {i}"),
-                        "ip": config[device_ip_key],
-                        "password": config.get(f"DEVICE_{i}_PASSWORD", "")
-                    }
-                    devices.append(device)
+            # Process device information (any number of DEVICE_<id>_* entries)
+            self.registry = DeviceRegistry.from_settings(config)
+            devices = self.registry.list()
             
             if devices:
                 self.devices = devices
@@ -178,7 +239,18 @@ class BlockClockControl:
                     # Extract quoted strings
                     options = re.findall(r'"([^"]*)"', text_value)
                     if options:
-                        self.text_options = options
+                        self.set_text_options(options, config.get("TEXT_SELECTION", DEFAULT_STRATEGY))
+            
+            # An external catalog replaces TEXT_OPTIONS for the rotation
+            if config.get("TEXT_CATALOG"):
+                self.set_text_catalog(resolve_catalog_path(config["TEXT_CATALOG"], config_file),
+                                      config.get("TEXT_SELECTION", DEFAULT_STRATEGY))
+            
+            self.playlists.update(parse_playlists(config, config.get("TEXT_SELECTION", DEFAULT_STRATEGY)))
+            if len(self.playlists):
+                self.logger.info(f"🎵 {len(self.playlists)} playlists configured")
+            
+            self.quiet_hours = QuietHoursPolicy.from_settings(config)
             
             # Process timing settings
             if "CLOCK_REFRESH_TIME" in config:
@@ -193,40 +265,119 @@ class BlockClockControl:
                 except ValueError:
                     self.logger.warning("⚠️ Invalid DISPLAYS_BETWEEN_TEXT in config, using default")
             
+            # Process send shaping settings
+            try:
+                self.send_policy = SendPolicy(
+                    max_in_flight=int(config.get("SEND_MAX_IN_FLIGHT", self.send_policy.max_in_flight)),
+                    group_spacing=float(config.get("SEND_GROUP_SPACING", self.send_policy.group_spacing)),
+                    priorities=re.findall(r'"([^"]*)"', config.get("GROUP_PRIORITY", "")))
+            except ValueError:
+                self.logger.warning("⚠️ Invalid send shaping settings in config, using defaults")
+            
             self.logger.info("✅ Configuration loaded successfully")
             
         except Exception as e:
             self.logger.error(f"❌ Error loading configuration: {str(e)}")
             self.logger.info("ℹ️  Using default settings")
 
-    def check_devices(self):
-        """Check if devices are reachable"""
+    def set_text_options(self, entries, strategy=DEFAULT_STRATEGY):
+        """Use TEXT_OPTIONS entries ("TEXT" or "TEXT:weight") with a TEXT_SELECTION strategy"""
+        try:
+            self.text_selector = create_selector(entries, strategy)
+        except ValueError as e:
+            self.logger.warning(f"⚠️ Invalid TEXT_OPTIONS in config ({str(e)}), keeping the previous texts")
+            return
+        self.text_options = [parse_text_option(entry)[0] for entry in entries]
+        self.text_selection = strategy
+    
+    def set_text_catalog(self, path, strategy=DEFAULT_STRATEGY):
+        """Pick texts from a catalog file (see text_catalog.py) instead of TEXT_OPTIONS"""
+        try:
+            catalog = TextCatalog(path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not open TEXT_CATALOG {path} ({str(e)}), using TEXT_OPTIONS")
+            return
+        try:
+            self.text_selector = create_catalog_selector(catalog, strategy)
+        except ValueError as e:
+            self.logger.warning(f"⚠️ TEXT_CATALOG {path} has no usable texts ({str(e)}), using TEXT_OPTIONS")
+            catalog.close()
+            return
+        if self.text_catalog is not None:
+            self.text_catalog.close()
+        self.text_catalog = catalog
+        self.text_selection = strategy
+        self.logger.info(f"📚 Text catalog: {len(catalog)} texts from {path}")
+    
+    def reload_config(self):
+        """Pick up device and playlist changes in the config file, only changed playlists are recompiled"""
+        if not self.config_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.config_file)
+            if mtime == self.config_mtime:
+                return
+            with open(self.config_file, 'r') as f:
+                config = parse_settings(f)
+        except OSError:
+            return
+        self.config_mtime = mtime
+        
+        # Devices added or removed from the web app while the rotation runs
+        registry = DeviceRegistry.from_settings(config)
+        devices = registry.list()
+        if not devices:
+            self.logger.warning("⚠️ No devices left in the config, keeping the current devices")
+        elif devices != self.devices:
+            self.registry = registry
+            self.devices = devices
+            self.logger.info(f"📋 Devices updated ({len(devices)} configured)")
+        
+        changed = self.playlists.update(parse_playlists(config, config.get("TEXT_SELECTION", DEFAULT_STRATEGY)))
+        if changed:
+            self.logger.info(f"🎵 Playlists updated ({changed} changed, {len(self.playlists)} configured)")
+    
+    def selector_for(self, device=None):
+        """Text selector of the playlist active for a device right now, TEXT_OPTIONS if none is"""
+        group = device.get("group") if device else None
+        playlist = self.playlists.active(group)
+        playlist_id = playlist.id if playlist else None
+        if self.active_playlists.get(group) != playlist_id:
+            self.active_playlists[group] = playlist_id
+            clocks = f"group {group}" if group else "all clocks"
+            if playlist:
+                self.logger.info(f"🎵 Playlist \"{playlist.name}\" active for {clocks}")
+            else:
+                self.logger.info(f"🎵 No playlist active for {clocks}, back to the text options")
+        return playlist.selector if playlist else self.text_selector
+    
+    def check_devices(self, devices=None):
+        """Check if devices (all configured devices by default) are reachable"""
+        devices = self.devices if devices is None else devices
         reachable_devices = []
         unreachable_names = []
         any_reachable = False
         any_unreachable = False
         
-        for device in self.devices:
+        for device in devices:
+            self.logger.info(f"🔍 Checking connection to {device['name']} at {device['ip']}...")
+        
+        # Probe all devices at once (TCP connect + API check) instead of pinging one by one
+        for device, result in zip(devices, probe_devices(devices, pool=self.connections)):
             name = device["name"]
             ip = device["ip"]
             
-            self.logger.info(f"🔍 Checking connection to {name} at {ip}...")
-            
-            # Use ping to check if device is reachable
-            ping_command = ["ping", "-c", "1", "-W", "2", ip]
-            try:
-                result = subprocess.run(ping_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                if result.returncode == 0:
-                    self.logger.info(f"✅ {name} is reachable")
-
-                    reachable_devices.append(device)
-                    any_reachable = True
+            if result["reachable"]:
+                if result["api_ok"]:
+                    self.logger.info(f"✅ {name} is reachable ({result['rtt_ms']} ms)")
                 else:
-                    self.logger.info(f"❌ {name} is not reachable at {ip}")
-                    unreachable_names.append(name)
-                    any_unreachable = True
-            except Exception as e:
-                self.logger.error(f"❌ Error checking {name}: {str(e)}")
+                    self.logger.warning(f"⚠️ {name} is reachable but its API did not respond properly: "
+                                        f"{result['error'] or result['api_status']}")
+                
+                reachable_devices.append(device)
+                any_reachable = True
+            else:
+                self.logger.info(f"❌ {name} is not reachable at {ip}")
                 unreachable_names.append(name)
                 any_unreachable = True
         
@@ -249,42 +400,60 @@ class BlockClockControl:
             else:
                 devices_list = ", ".join([d["name"] for d in reachable_devices])
                 self.logger.info(f"ℹ️  Continuing with these devices: {devices_list}")
+            self.logger.info("ℹ️  Unreachable devices are retried automatically and rejoin once they answer")
         
-        # Update self.devices with only reachable devices
-        self.devices = reachable_devices
+        # Unreachable devices stay configured, their circuit breakers keep
+        # requests away from them until they answer again
         return True
 
-    def get_display(self, device=None):
-        """Get current display from a device"""
+    def on_breaker_transition(self, key, breaker, previous, state, reason):
+        """Report devices going offline and coming back"""
+        if state == OPEN:
+            self.events.emit(DEVICE_DOWN, device=breaker.name, ip=key, reason=reason, retry_in=breaker.backoff)
+        elif state == CLOSED:
+            self.events.emit(DEVICE_UP, device=breaker.name, ip=key)
+    
+    def device_health(self):
+        """Circuit breaker state and recent transitions of every device"""
+        return self.connections.breakers.status()
+
+    def log_connection_stats(self):
+        """Log keep-alive connection counters for each device"""
+        for stats in self.connections.stats():
+            self.logger.info(f"🔌 [{stats['name']}] requests: {stats['requests']}, "
+                             f"reused: {stats['reused']}, new connections: {stats['new_connections']}, "
+                             f"reconnects: {stats['reconnects']}, errors: {stats['errors']}")
+        send_stats = self.send_dedup.stats()
+        self.logger.info(f"📤 Text sends: {send_stats['sent']}, skipped as redundant: {send_stats['skipped_total']} "
+                         f"(already showing: {send_stats['skipped']['already_showing']}, "
+                         f"recently sent: {send_stats['skipped']['recently_sent']})")
+
+    def refresh_time_for(self, device):
+        """Refresh time of a device, falling back to CLOCK_REFRESH_TIME"""
+        return device.get("refresh_time") or self.clock_refresh_time
+
+    def get_display(self, device=None, max_age=None):
+        """Get current display from a device, reusing a snapshot up to max_age seconds old"""
         # Use the first device if none specified
         if device is None and self.devices:
             device = self.devices[0]
         elif not device and not self.devices:
             return "ERROR"
         
-        ip = device["ip"]
-        password = device["password"]
-        
-        # Prepare API URL
-        url = f"http://{ip}/api/status"
-        
+        return self.display_cache.get(device, max_age=max_age)["display"]
+
+    def fetch_display(self, device):
+        """Ask a device for its current display (used by the display cache)"""
         try:
-            # Make the request
-            if password:
-                response = requests.get(url, auth=("", password), timeout=5)
-            else:
-                response = requests.get(url, timeout=5)
-            
-            # Check if request was successful
-            if response.status_code == 200:
-                data = response.json()
-                # Extract displayed text from response
-                if "rendered" in data and "contents" in data["rendered"]:
-                    return "".join(data["rendered"]["contents"])
-            
+            # Make the request over the device's pooled connection
+            return read_display(self.connections, device)
+        except DeviceUnavailable:
+            # Already logged when the device went offline
             return "ERROR"
         except Exception as e:
-            self.logger.error(f"❌ Error getting display: {str(e)}")
+            # Once the breaker is open its transitions are logged instead
+            if self.connections.breaker(device).state == CLOSED:
+                self.logger.error(f"❌ Error getting display: {str(e)}")
             return "ERROR"
 
     def clean_display_text(self, text):
@@ -348,288 +517,82 @@ class BlockClockControl:
         else:
             return clean_text
 
-    def send_text(self, text):
-        """Send text to all configured devices"""
-        for device in self.devices:
-            name = device["name"]
-            ip = device["ip"]
-            password = device["password"]
-            
-            # Prepare API URL
-            url = f"http://{ip}/api/show/text/{text}"
-            
-            try:
-                # Make the request
-                if password:
-                    response = requests.get(url, auth=("", password), timeout=5)
+    def send_text(self, text, concurrent=True, devices=None):
+        """Send text to the given devices (default: all configured), concurrently by default"""
+        if devices is None:
+            devices = self.devices
+        
+        # Leave out devices that already show the text or were just sent it
+        devices, skipped = self.send_dedup.partition(devices, text)
+        for result in skipped:
+            self.logger.info(f"⏭️  [{result['name']}] already has \"{text}\", skipping send ({result['skipped']})")
+        
+        if concurrent and len(devices) > 1:
+            # Group by group in priority order, with a cap on requests in flight
+            results, groups = self.send_policy.fan_out(self.connections, devices, f"/api/show/text/{text}",
+                                                       sleep=self.sleep, clock=self.clock.monotonic)
+            for result in results:
+                if result["error"]:
+                    self.logger.error(f"❌ Error sending text to {result['name']}: {result['error']} "
+                                      f"(after {result['completed_after']:.2f}s)")
                 else:
-                    response = requests.get(url, timeout=5)
+                    self.logger.info(f"✅ [{result['name']}] updated with: \"{text}\" "
+                                     f"(completed after {result['completed_after']:.2f}s)")
+            if results:
+                spread = max(r["completed_after"] for r in results) - min(r["completed_after"] for r in results)
+                self.logger.info(f"⏱️  Send spread across {len(results)} devices: {spread:.2f}s")
+            if len(groups) > 1:
+                for group in groups:
+                    self.logger.info(f"⏱️  Group \"{group['group']}\": {group['succeeded']}/{group['devices']} devices "
+                                     f"updated, completed after {group['completed_after']:.2f}s")
+        else:
+            results = []
+            start_time = self.clock.monotonic()
+            for device in devices:
+                name = device["name"]
+                sent_at = self.clock.monotonic()
+                result = {"name": name, "ip": device["ip"], "success": False, "status_code": None, "error": None}
                 
-                self.logger.info(f"✅ [{name}] updated with: \"{text}\"")
-            except Exception as e:
-                self.logger.error(f"❌ Error sending text to {name}: {str(e)}")
+                try:
+                    # Make the request over the device's pooled connection
+                    response = self.connections.get(device, f"/api/show/text/{text}")
+                    result["status_code"] = response.status_code
+                    result["success"] = response.status_code == 200
+                    
+                    self.logger.info(f"✅ [{name}] updated with: \"{text}\"")
+                except Exception as e:
+                    result["error"] = str(e)
+                    self.logger.error(f"❌ Error sending text to {name}: {str(e)}")
+                
+                result["latency"] = self.clock.monotonic() - sent_at
+                result["completed_after"] = self.clock.monotonic() - start_time
+                results.append(result)
+        
+        self.send_dedup.record(results, text)
+        results += skipped
+        self.events.emit(SEND_COMPLETE, text=text, results=[
+            {"device": r["name"], "ip": r["ip"], "success": r["success"], "error": r.get("error"),
+             "skipped": r.get("skipped")} for r in results])
         
-        if len(self.devices) > 1:
+        if len(results) > 1:
             self.logger.info("")
             self.logger.info("✨ Custom Text displayed on all available devices")
             self.logger.info("")  # Empty line
         else:
             self.logger.info("✨ Custom Text displayed on device")
-
-    def wait_for_refresh(self, start_display, ignore_text=None, timeout=None, message="Waiting for refresh"):
-        """Wait for display to change, ignoring specified text"""
-        if timeout is None:
-            timeout = self.clock_refresh_time + 300  # Default timeout
-        
-        # Start monitoring for changes
-        start_time = time.time()
-        self.logger.info(f"🔍 Started Monitoring!")
-
-            # Get current display immediately to check if it has already changed
-        current_display = self.get_display()
-
-        
-        # If it's the initial waiting phase, set up for progress indicators
-        is_initial_wait = "first refresh" in message.lower()
-        if is_initial_wait:
-            # Log the start of waiting
-            self.logger.info(f"⏳ Waiting for first refresh...")
         
-        # Get current display immediately to check if it has already changed
-            #current_display = self.get_display()
-        
-        # If display has already changed at the start of monitoring
-        if (current_display != start_display and
-            current_display != ignore_text and
-            current_display and
-            current_display != "ERROR"):
-            
-            # A short artificial delay to avoid showing "0 seconds"
-            elapsed_time = max(1, int(time.time() - start_time))
-            display_info = self.get_display_info(current_display)
-            
-            # Special handling for first refresh
-            if is_initial_wait:
-                self.logger.info("")
-                #self.logger.info(f"✅ First refresh detected after {elapsed_time} seconds - Displaying: \"{display_info}\"")
-                self.logger.info(f"✅ First refresh detected after {elapsed_time} seconds")
-                self.logger.info(f"Current Display: \"{display_info}\"")
-
-            else:
-                self.logger.info(f"✅ Display changed after {elapsed_time} seconds - Displaying: \"{display_info}\"")
-                self.logger.info("")  # Empty line
-            return True
-        
-        # Monitor for changes
-        next_update_time = start_time + 10  # First update after 10 seconds
-        progress_indicators = [
-            "⏳ Still waiting... (elapsed: {elapsed_time})",
-            "⏳ Still waiting... (elapsed: {elapsed_time})",
-            "⏳ Still bloody waiting... (elapsed: {elapsed_time})",
-            "⏳ Hang in there... (elapsed: {elapsed_time})",
-            "⏳ Patience is a Virtue... (elapsed: {elapsed_time})",
-            "⏳ It will happen, trust me... (elapsed: {elapsed_time})",
-            "⏳ Won't be long now... (elapsed: {elapsed_time})"
-
-
-        ]
-        indicator_index = 0
-        
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed >= timeout:
-                self.logger.warning(f"⚠️ Timeout waiting for display change after {timeout} seconds")
-                return False
-            
-            # Show progress updates
-            if is_initial_wait and time.time() >= next_update_time:
-                # Format elapsed time
-                elapsed_mins = int(elapsed) // 60
-                elapsed_secs = int(elapsed) % 60
-                elapsed_time_str = f"{elapsed_mins:02d}:{elapsed_secs:02d}"
-                
-                # Print progress message
-                progress_msg = progress_indicators[indicator_index].format(elapsed_time=elapsed_time_str)
-                self.logger.info(progress_msg)
-                
-                # Cycle through indicators
-                indicator_index = (indicator_index + 1) % len(progress_indicators)
-                
-                # Set next update time
-                next_update_time = time.time() + 30  # Update every 30 seconds
-            
-            current_display = self.get_display()
-            
-            # Check if display has changed
-            if (current_display != start_display and
-                current_display != ignore_text and
-                current_display and
-                current_display != "ERROR"):
-                
-                display_info = self.get_display_info(current_display)
-                elapsed_time = int(time.time() - start_time)
-                
-                # Special handling for first refresh
-                if is_initial_wait:
-                    #self.logger.info(f"✅ First refresh detected after {elapsed_time} seconds - Displaying: \"{display_info}\"")
-                    self.logger.info("")
-                    self.logger.info(f"✅ First refresh detected after {elapsed_time} seconds")
-                    self.logger.info(f"Current Display: \"{display_info}\"")
-                    self.logger.info("")
-
-                else:
-                    self.logger.info(f"✅ Display changed after {elapsed_time} seconds - Displaying: \"{display_info}\"")
-                    self.logger.info("")  # Empty line
-                return True
-            
-            # Simple sleep without console updates
-            time.sleep(1)
-
-
-
-    def countdown(self, seconds):
-        """Display a countdown timer with periodic updates"""
-        start_time = time.time()
-        end_time = start_time + seconds
-        
-        # Calculate total segments to show
-        total_segments = 10  # We'll divide the countdown into 10 segments
-        segment_time = seconds / total_segments
-        
-        # Log the start of countdown
-        self.logger.info(f"Countdown started: sleep time: {seconds//60:02d}:{seconds%60:02d}")
-        
-        # Track segments for progress updates
-        for segment in range(1, total_segments + 1):
-            # Wait until this segment should be complete
-            segment_end_time = start_time + (segment * segment_time)
-            while time.time() < segment_end_time and time.time() < end_time:
-                time.sleep(1)
-            
-            # Skip printing updates if we've reached the end already
-            if time.time() >= end_time:
-                break
-                
-            # Calculate percentage and remaining time
-            elapsed = time.time() - start_time
-            remaining = end_time - time.time()
-            percent = int((elapsed / seconds) * 100)
-            
-            # Format remaining time
-            mins_remaining = int(remaining) // 60
-            secs_remaining = int(remaining) % 60
-            
-            # Create progress bar
-            progress_chars = "▮" * segment + "▯" * (total_segments - segment)
-            
-            # Instead of using print (which might get filtered), use logger
-            self.logger.info(f"Countdown progress: [{progress_chars}] {percent}% ({mins_remaining:02d}:{secs_remaining:02d} remaining)")
-        
-        # Wait for any remaining time
-        remaining_time = end_time - time.time()
-        if remaining_time > 0:
-            time.sleep(remaining_time)
-        
-        # Log completion
-        elapsed = int(time.time() - start_time)
-        self.logger.info(f"Countdown completed after {elapsed//60:02d}:{elapsed%60:02d}")
-
+        return results
 
     def run(self):
-        """Main execution loop"""
-        initial_display = self.get_display()
-        if initial_display == "ERROR":
+        """Main execution loop, every device runs its own cycle on the shared scheduler"""
+        self.scheduler = RotationScheduler(self)
+        
+        if all(self.get_display(device) == "ERROR" for device in self.devices):
             self.logger.error("❌ Error connecting to BlockClock. Check IP address and connection.")
             return
         
-        clean_initial = self.clean_display_text(initial_display)
-        display_info = self.get_display_info(initial_display)
-        
-        if not clean_initial or clean_initial == "null":
-            display_info = "(unknown)"
-        
-        #self.logger.info(f"⏳ Waiting for first refresh to synchronize... Displaying: \"{display_info}\"")
-        self.logger.info(f"⏳ Waiting for first refresh to synchronize...")
-        self.logger.info(f"⏳ Current Display: \"{display_info}\"")
-
-        self.wait_for_refresh(initial_display, None, self.clock_refresh_time + 300, "Waiting for first refresh")
-        
-        self.logger.info("⏳ Waiting 6 seconds for animation to complete...")
-        time.sleep(6)
-        
-        random_text = random.choice(self.text_options)
-        self.send_text(random_text)
         self.logger.info("🔄 Starting monitoring cycle")
-        
-        current_display = self.get_display()
-        clean_current = self.clean_display_text(current_display)
-        self.logger.info(f"⏳ Current display after sending custom text: \"{clean_current}\"")
-        
-        cycle_count = 0
-        last_custom_text = random_text
-        
-        while self.should_continue():
-            cycle_count += 1
-            self.logger.info("")  # Empty line
-            self.logger.info(f"🔄 Beginning rotation cycle #{cycle_count}")
-            
-            if cycle_count % 5 == 0:
-                self.logger.info("🔄 Performing periodic device check (every 5 cycles)")
-                if not self.check_devices():
-                    self.logger.error("❌ No devices are reachable. Please check network settings.")
-                    self.logger.error("🛑 Exiting script.")
-                    return
-            
-            for i in range(1, self.displays_between_text + 1):
-                wait_time = self.clock_refresh_time - 45
-                self.logger.info(f"⏳ Sleeping before refresh #{i} of {self.displays_between_text}...")
-                self.countdown(wait_time)
-                self.logger.info("")  # Empty line
-                self.wait_for_refresh(
-                    current_display, 
-                    last_custom_text,
-                    self.clock_refresh_time + 300, 
-                    f"Actively monitoring for refresh #{i}"
-                )
-                
-                current_display = self.get_display()
-                clean_current = self.clean_display_text(current_display)
-                display_info = self.get_display_info(current_display)
-                self.logger.info(f"🔄 BlockClock refresh {i}/{self.displays_between_text} - Displaying: \"{display_info}\"")
-                time.sleep(0.5)
-
-
-            wait_time = self.clock_refresh_time - 45
-            self.logger.info("⏳ Sleeping before final refresh check...")
-            self.countdown(wait_time)
-            
-            self.wait_for_refresh(
-                current_display, 
-                last_custom_text,
-                self.clock_refresh_time + 300, 
-                "Actively monitoring for final refresh"
-            )
-            
-            current_display = self.get_display()
-            clean_current = self.clean_display_text(current_display)
-            display_info = self.get_display_info(current_display)
-            self.logger.info(f"✅ Final refresh complete - Displaying: \"{display_info}\"")
-            
-            self.logger.info("⏳ Waiting 6 seconds for animation to complete...")
-            time.sleep(6)
-            
-            self.logger.info("🎯 Full cycle complete!")
-            random_text = random.choice(self.text_options)
-            self.logger.info(f"📤 Sending new Custom Text: \"{random_text}\"")
-            self.send_text(random_text)
-            
-            last_custom_text = random_text
-            
-            current_display = self.get_display()
-            clean_current = self.clean_display_text(current_display)
-            self.logger.info(f"⏳ Current display after sending custom text: \"Custom Text: {clean_current}\"")
-            self.logger.info("")  # Empty line
-            self.logger.info("----------------------------------------")
+        self.scheduler.run()
 
 
 def is_valid_ip(ip_address):
@@ -641,19 +604,23 @@ def is_valid_ip(ip_address):
     if not ip_address or "x.xxx" in ip_address:
         return False
     
-    # Basic IP format validation using regex
+    # Basic IP format validation using regex, with an optional port (e.g. simulated clocks)
     import re
-    ip_pattern = re.compile(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$')
+    ip_pattern = re.compile(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})(?::(\d{1,5}))?$')
     match = ip_pattern.match(ip_address)
     
     if not match:
         return False
     
     # Check each octet is in the valid range (0-255)
-    for octet in match.groups():
+    for octet in match.groups()[:4]:
         if int(octet) > 255:
             return False
     
+    port = match.group(5)
+    if port is not None and not 1 <= int(port) <= 65535:
+        return False
+    
     return True
 
 # This code only runs when the script is executed directly
@@ -701,4 +668,7 @@ if __name__ == "__main__":
         blockclock.logger.info("\n\n👋 Script terminated by you, bye for now see you soon.\n")
     except Exception as e:
         blockclock.logger.error(f"❌ Error: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+    finally:
+        # Hand the last events to the web app
+        blockclock.events.close()
\ No newline at end of file
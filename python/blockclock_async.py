@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Asyncio Rotation
+================================================
+Asyncio version of the BlockClock device API. A single event loop carries
+the requests to many clocks (and of many rotations) at once, without a
+thread or connection pool per clock. The rotation itself is the shared
+per-device RotationScheduler, so timing, quiet hours, send shaping and
+dedup behave exactly as in blockclock.py. Uses only the standard library:
+requests are plain HTTP/1.1 over keep-alive asyncio streams.
+
+Only the requests are asynchronous. The scheduler is blocking code and
+runs on its own executor thread, and each of its requests waits there
+for the event loop to answer (see LoopDevicePool). A single rotation
+therefore still occupies one thread. The loop stays free for other
+rotations and callers, but AsyncBlockClockControl.run() is not a
+scheduler made of coroutines.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from urllib.parse import quote
+
+from blockclock import BlockClockControl, is_valid_ip, ENGINE_EVENTS_SOCKET
+from engine_events import EventChannel
+from virtual_clock import SystemClock
+from circuit_breaker import CircuitBreakerRegistry, DeviceUnavailable
+from device_client import DevicePool, RECOVERY_PROBE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Default request timeout in seconds (same as the blocking client)
+DEFAULT_TIMEOUT = 5
+
+# A rotation thread waits this many request timeouts for the event loop to answer
+LOOP_TIMEOUT_FACTOR = 2
+
+
+class AsyncResponse:
+    """Minimal HTTP response returned by AsyncDeviceConnection"""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+class AsyncDeviceConnection:
+    """Keep-alive HTTP/1.1 connection to a single BlockClock device"""
+
+    def __init__(self, device, timeout=DEFAULT_TIMEOUT, breaker=None):
+        self.name = device.get("name", device["ip"])
+        self.ip = device["ip"]
+        self.password = device.get("password", "")
+        self.timeout = timeout
+        self.breaker = breaker
+
+        # "192.168.0.10" or "192.168.0.10:8080"
+        host, _, port = self.ip.partition(":")
+        self.host = host
+        self.port = int(port) if port else 80
+
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock()
+
+        # Counters reported through stats()
+        self.requests = 0
+        self.reused = 0
+        self.new_connections = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        self.new_connections += 1
+
+    def _close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+    async def _request(self, path):
+        """Write one GET request and read the response from the open connection"""
+        lines = [
+            f"GET {quote(path, safe='/%')} HTTP/1.1",
+            f"Host: {self.ip}",
+            "Connection: keep-alive",
+            "Accept: */*",
+        ]
+        if self.password:
+            token = base64.b64encode(f":{self.password}".encode("utf-8")).decode("ascii")
+            lines.append(f"Authorization: Basic {token}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by device")
+        status_code = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                body += await self.reader.readexactly(size)
+                await self.reader.readline()
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            # No length given, the device closes the connection after the body
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            self._close()
+
+        return AsyncResponse(status_code, headers, body)
+
+    async def get(self, path, timeout=None):
+        """Send a GET request for path (e.g. "/api/status") and return the response"""
+        timeout = timeout or self.timeout
+
+        # Fail fast while the device is known to be offline
+        if self.breaker is not None:
+            if not self.breaker.allow():
+                raise DeviceUnavailable(f"{self.name} is offline, next retry in "
+                                        f"{self.breaker.seconds_until_retry():.0f}s")
+            if self.breaker.is_probing():
+                timeout = min(timeout, RECOVERY_PROBE_TIMEOUT)
+
+        try:
+            response = await self._get(path, timeout)
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(str(e) or type(e).__name__)
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return response
+
+    async def _get(self, path, timeout):
+        """Send the request, reconnecting once if the kept-alive connection went stale"""
+        async with self.lock:
+            for attempt in (1, 2):
+                reusing = self.writer is not None
+                self.requests += 1
+                try:
+                    if not reusing:
+                        await self._connect()
+                    else:
+                        self.reused += 1
+                    return await asyncio.wait_for(self._request(path), timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self.errors += 1
+                    self._close()
+                    # A kept-alive socket goes stale when the clock reboots,
+                    # retry once on a fresh connection.
+                    if attempt == 1 and reusing:
+                        self.reconnects += 1
+                        logger.info(f"🔌 [{self.name}] connection dropped, reconnecting")
+                        continue
+                    raise
+                except Exception:
+                    self.errors += 1
+                    self._close()
+                    raise
+
+    def stats(self):
+        """Return request/reuse/reconnect counters for this device"""
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "requests": self.requests,
+            "reused": self.reused,
+            "new_connections": self.new_connections,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        self._close()
+
+
+class AsyncDevicePool:
+    """Per-device asyncio connections, created on first use"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, breakers=None, clock=time.monotonic):
+        """clock: monotonic time source for the latencies reported by fan_out"""
+        self.timeout = timeout
+        self.breakers = breakers if breakers is not None else CircuitBreakerRegistry()
+        self.clock = clock
+        self.connections = {}
+
+    def connection(self, device):
+        """Return the connection for a device, replacing it if the password changed"""
+        conn = self.connections.get(device["ip"])
+        if conn is None or conn.password != device.get("password", ""):
+            if conn is not None:
+                conn.close()
+            conn = AsyncDeviceConnection(device, timeout=self.timeout, breaker=self.breakers.get(device))
+            self.connections[device["ip"]] = conn
+        return conn
+
+    async def get(self, device, path, timeout=None):
+        return await self.connection(device).get(path, timeout=timeout)
+
+    async def fan_out(self, devices, path, timeout=None):
+        """
+        Send the same GET request to all devices at once.
+        Returns one result dict per device, in completion order.
+        """
+        start_time = self.clock()
+        results = []
+
+        async def request(device):
+            sent_at = self.clock()
+            result = {
+                "name": device.get("name", device["ip"]),
+                "ip": device["ip"],
+                "success": False,
+                "status_code": None,
+                "error": None,
+            }
+            try:
+                response = await self.get(device, path, timeout=timeout)
+                result["status_code"] = response.status_code
+                result["success"] = response.status_code == 200
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            finished_at = self.clock()
+            result["latency"] = finished_at - sent_at
+            result["completed_after"] = finished_at - start_time
+            results.append(result)
+
+        await asyncio.gather(*(request(device) for device in devices))
+        return results
+
+    def stats(self):
+        return [conn.stats() for conn in self.connections.values()]
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections = {}
+
+
+class LoopDevicePool(DevicePool):
+    """
+    DevicePool whose requests run on an event loop through an
+    AsyncDevicePool. The blocking rotation waits for each request on its
+    own thread, while every rotation on the loop shares the loop's
+    keep-alive connections.
+    """
+
+    def __init__(self, async_pool, loop):
+        super().__init__(timeout=async_pool.timeout, breakers=async_pool.breakers)
+        self.async_pool = async_pool
+        self.loop = loop
+
+    def get(self, device, path, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(self.async_pool.get(device, path, timeout=timeout), self.loop)
+        # The request times out on the loop, this only guards against a loop that stopped
+        try:
+            return future.result((timeout or self.timeout) * LOOP_TIMEOUT_FACTOR)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"No answer from the event loop for {device.get('name', device['ip'])}")
+
+    def request_count(self):
+        return sum(conn.requests for conn in list(self.async_pool.connections.values()))
+
+    def stats(self):
+        return self.async_pool.stats()
+
+    def close(self):
+        super().close()
+        # The asyncio streams belong to the loop's thread
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.async_pool.close)
+
+
+class AsyncBlockClockControl(BlockClockControl):
+    """
+    BlockClockControl whose device requests run on an asyncio event loop.
+    run() runs the same per-device RotationScheduler as the blocking
+    version (quiet hours, send shaping and dedup, sync state) on a worker
+    thread, so a single loop can carry the device traffic of many
+    rotations at once.
+    """
+
+    def __init__(self, config_file=None, should_continue_callback=None, clock=None, events=None):
+        super().__init__(config_file, should_continue_callback, clock=clock, events=events)
+        # Share the circuit breakers with the synchronous pool used for health checks
+        self.async_connections = AsyncDevicePool(timeout=5, breakers=self.connections.breakers,
+                                                 clock=self.clock.monotonic)
+        # Set when run() is cancelled, ends the rotation thread's current sleep
+        self.stopping = threading.Event()
+        self.keep_going = self.should_continue
+        self.should_continue = lambda: not self.stopping.is_set() and self.keep_going()
+        self.sleep = self._sleep
+
+    def _sleep(self, seconds):
+        """Sleep on the rotation's clock, a real sleep ends early once run() is cancelled"""
+        if not isinstance(self.clock, SystemClock):
+            self.clock.sleep(seconds)
+        elif seconds > 0:
+            self.stopping.wait(seconds)
+
+    async def run(self):
+        """Main execution loop, the rotation thread's device requests go through this event loop"""
+        loop = asyncio.get_running_loop()
+        self.connections = LoopDevicePool(self.async_connections, loop)
+        self.stopping.clear()
+        # A thread of its own, the default executor would limit how many rotations share the loop
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-rotation")
+        rotation = loop.run_in_executor(executor, super().run)
+        try:
+            await asyncio.shield(rotation)
+        except asyncio.CancelledError:
+            # Let the rotation thread finish its current step, its requests still need this loop
+            self.stopping.set()
+            await rotation
+            raise
+        finally:
+            executor.shutdown(wait=False)
+            self.connections.close()
+            self.async_connections.close()
+
+
+async def run_many(controls):
+    """Drive several rotations (one per config) on the same event loop"""
+    await asyncio.gather(*(control.run() for control in controls))
+
+
+# This code only runs when the script is executed directly
+if __name__ == "__main__":
+    # One rotation per config file given on the command line
+    config_files = sys.argv[1:] or [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "blockclock.conf")]
+
+    # One sender thread and connection to the web app for all rotations
+    events = EventChannel(ENGINE_EVENTS_SOCKET)
+    controls = []
+    for config_file in config_files:
+        control = AsyncBlockClockControl(config_file, events=events)
+        if not any(is_valid_ip(device["ip"]) for device in control.devices):
+            control.logger.error(f"❌ No valid IP addresses configured in {config_file}, skipping.")
+            continue
+        controls.append(control)
+
+    if not controls:
+        logging.getLogger().error("🛑 No usable configuration, exiting script.")
+        sys.exit(1)
+
+    try:
+        asyncio.run(run_many(controls))
+    except KeyboardInterrupt:
+        logging.getLogger().info("\n\n👋 Script terminated by you, bye for now see you soon.\n")
+    finally:
+        events.close()
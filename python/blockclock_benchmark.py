@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Rotation Benchmark
+================================================
+Runs BlockClockControl.run() against simulated clocks (see
+blockclock_simulator.py) for 1, 5, 20 and 100 devices and reports, per
+scenario:
+
+  refresh_to_text   seconds from a clock's refresh to the custom text
+                    being visible on it (mean/p50/p95/max)
+  skew              spread of that delay across devices in the same cycle
+  calls_per_cycle   device HTTP calls per device per rotation cycle
+  cpu_per_cycle     engine CPU seconds per rotation cycle
+  wakeups           sleep calls of the engine and voluntary context switches
+
+The simulator runs in a separate process so its CPU time is not counted.
+Results are written as JSON to compare runs between commits.
+
+Usage:
+  python python/blockclock_benchmark.py --output bench.json
+  python python/blockclock_benchmark.py --devices 1 5 --period 12 --cycles 2
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import resource
+import statistics
+import subprocess
+import urllib.request
+
+from blockclock import BlockClockControl, DISPLAY_MAX_AGE
+from blockclock_simulator import DEFAULT_PORT
+from circuit_breaker import CircuitBreakerRegistry
+from device_client import DevicePool
+from display_cache import DisplayCache
+from engine_events import EventChannel
+from send_dedup import SendDeduplicator
+from sync_state import SyncStateStore
+
+DEFAULT_DEVICE_COUNTS = [1, 5, 20, 100]
+
+# Simulated refresh period (seconds), short so a run takes minutes instead of hours
+DEFAULT_PERIOD = 15
+
+# Rotation cycles measured per scenario
+DEFAULT_CYCLES = 2
+
+# Built-in screens between custom texts in the benchmark config
+DISPLAYS_BETWEEN_TEXT = 1
+
+SIMULATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blockclock_simulator.py")
+
+
+def summarize(values):
+    """mean/p50/p95/max of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean": round(statistics.mean(ordered), 4),
+        "p50": round(ordered[len(ordered) // 2], 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def fetch_stats(ip):
+    with urllib.request.urlopen(f"http://{ip}/sim/stats", timeout=5) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def start_simulator(count, base_port, period, stagger):
+    """Start the simulated clocks in a child process and wait until they answer"""
+    args = [sys.executable, SIMULATOR, "--devices", str(count), "--base-port", str(base_port),
+            "--period", str(period)]
+    if stagger:
+        args.append("--stagger")
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    last_ip = f"127.0.0.1:{base_port + count - 1}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            fetch_stats(last_ip)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Simulator did not start on ports {base_port}-{base_port + count - 1}")
+
+
+class SleepCounter:
+    """Counts the sleep calls (engine wakeups) of a BlockClockControl while installed"""
+
+    def __init__(self, control):
+        self.control = control
+        self.calls = 0
+        self.original = None
+
+    def __enter__(self):
+        self.original = self.control.sleep
+
+        def sleep(seconds):
+            self.calls += 1
+            self.original(seconds)
+
+        self.control.sleep = sleep
+        return self
+
+    def __exit__(self, *exc):
+        self.control.sleep = self.original
+
+
+def run_scenario(count, period, cycles, base_port, stagger):
+    """Run the rotation against count simulated clocks until every clock finished cycles cycles"""
+    simulator = start_simulator(count, base_port, period, stagger)
+    try:
+        # Keep the benchmark's events away from a running web app
+        control = BlockClockControl(events=EventChannel(None))
+        control.devices = [{"name": f"Sim Clock {i + 1}", "ip": f"127.0.0.1:{base_port + i}", "password": ""}
+                           for i in range(count)]
+        control.set_text_options(["HODL", "SATS", "BITCOIN", "WENMOON"])
+        control.clock_refresh_time = period
+        control.displays_between_text = DISPLAYS_BETWEEN_TEXT
+        control.refresh_learner.nominal_period = period
+        # Every scenario starts with a cold sync against freshly started clocks
+        control.sync_state = SyncStateStore(None)
+        # Nothing is read from or written to the display snapshots and device status of a real rotation
+        breakers = CircuitBreakerRegistry(on_transition=control.on_breaker_transition)
+        control.connections = DevicePool(timeout=control.connections.timeout, breakers=breakers)
+        control.display_cache = DisplayCache(control.fetch_display, max_staleness=DISPLAY_MAX_AGE)
+        control.send_dedup = SendDeduplicator(control.display_cache)
+
+        # First refresh to sync, then (displays + 1) refreshes per cycle, plus slack
+        deadline = time.monotonic() + period * (2 + cycles * (DISPLAYS_BETWEEN_TEXT + 1)) + 30
+
+        def should_continue():
+            if time.monotonic() >= deadline:
+                return False
+            if control.scheduler is None:
+                return True
+            return any(schedule.cycle_count < cycles for schedule in control.scheduler.schedules)
+
+        control.should_continue = should_continue
+
+        started = time.monotonic()
+        cpu_started = time.process_time()
+        usage_started = resource.getrusage(resource.RUSAGE_SELF)
+        with SleepCounter(control) as sleeps:
+            control.run()
+        cpu = time.process_time() - cpu_started
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        duration = time.monotonic() - started
+
+        stats = [fetch_stats(device["ip"]) for device in control.devices]
+    finally:
+        simulator.terminate()
+        simulator.wait()
+
+    delays = [shown["after_refresh"] for clock in stats for shown in clock["shown_texts"]]
+    total_cycles = sum(schedule.cycle_count for schedule in control.scheduler.schedules)
+
+    # Skew: spread of the refresh-to-text delay across devices in the same cycle
+    skews = []
+    for cycle in range(max((len(clock["shown_texts"]) for clock in stats), default=0)):
+        cycle_delays = [clock["shown_texts"][cycle]["after_refresh"] for clock in stats
+                        if len(clock["shown_texts"]) > cycle]
+        if len(cycle_delays) > 1:
+            skews.append(max(cycle_delays) - min(cycle_delays))
+
+    status_calls = sum(clock["status_calls"] for clock in stats)
+    text_calls = sum(clock["text_calls"] for clock in stats)
+    per_cycle = max(1, total_cycles)
+
+    return {
+        "devices": count,
+        "period": period,
+        "staggered": stagger,
+        "duration": round(duration, 2),
+        "completed_cycles": total_cycles,
+        "refresh_to_text": summarize(delays),
+        "skew": summarize(skews),
+        "lost_texts": sum(clock["lost_texts"] for clock in stats),
+        "status_calls": status_calls,
+        "text_calls": text_calls,
+        "calls_per_cycle": round((status_calls + text_calls) / per_cycle, 2),
+        "cpu_seconds": round(cpu, 4),
+        "cpu_per_cycle": round(cpu / per_cycle, 4),
+        "sleep_calls": sleeps.calls,
+        "wakeups_per_cycle": round(sleeps.calls / per_cycle, 2),
+        "voluntary_context_switches": usage.ru_nvcsw - usage_started.ru_nvcsw,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(SIMULATOR), stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rotation cycle against simulated BlockClocks")
+    parser.add_argument("--devices", type=int, nargs="+", default=DEFAULT_DEVICE_COUNTS)
+    parser.add_argument("--period", type=float, default=DEFAULT_PERIOD, help="simulated refresh period")
+    parser.add_argument("--cycles", type=int, default=DEFAULT_CYCLES, help="rotation cycles per scenario")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--stagger", action="store_true", help="give the clocks different refresh phases")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="show the rotation log")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Keep the benchmark out of the rotation log
+        logging.disable(logging.INFO)
+
+    scenarios = []
+    for count in args.devices:
+        print(f"⏱️  {count} device(s)...", file=sys.stderr)
+        scenarios.append(run_scenario(count, args.period, args.cycles, args.base_port, args.stagger))
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cycles": args.cycles,
+        "scenarios": scenarios,
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Device Simulator
+================================================
+Local stand-in for BlockClock devices so the rotation engine and the web
+app can be run (and load-tested) without hardware on the LAN. Every
+virtual clock listens on its own port and implements the two endpoints
+Satoshi Shuffle uses:
+
+  GET /api/status              {"rendered": {"contents": [...]}}
+  GET /api/show/text/<text>    show custom text until the next refresh
+
+Each clock steps through its built-in screens every refresh period,
+offset by its phase. Text sent while the refresh animation is still
+running is overwritten by the animation (counted as lost), just like on a
+real clock. Latency, error rate and password auth can be injected.
+GET /sim/stats returns the clock's counters and the texts it showed.
+
+SimulatedDevicePool serves the same clocks in-process instead, on a
+virtual clock, for rotation_simulation.py.
+
+Usage:
+  python python/blockclock_simulator.py --devices 50 --period 60 --stagger
+"""
+
+import sys
+import json
+import time
+import base64
+import random
+import signal
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from device_client import DevicePool
+
+# Built-in screens a clock cycles through between custom texts
+DEFAULT_SCREENS = ["$67421", "BLK8642", "SATS148", "FEE_12", "HASH612", "MCAP1T3"]
+
+# Number of e-ink segments on a BlockClock Mini
+DISPLAY_SLOTS = 7
+
+DEFAULT_PORT = 18000
+
+
+class SimulatedBlockClock:
+    """One virtual BlockClock served on its own port"""
+
+    def __init__(self, name, port, host="127.0.0.1", period=300, phase=0.0, animation_delay=6,
+                 latency=0.0, error_rate=0.0, password="", screens=None, seed=None):
+        """
+        period: seconds between refreshes
+        phase: offset in seconds of the refresh boundaries from the epoch
+        animation_delay: seconds after a refresh during which sent text is lost
+        latency: seconds added to every response (plus up to 20% jitter)
+        error_rate: fraction of requests answered with HTTP 500
+        """
+        self.name = name
+        self.host = host
+        self.port = port
+        self.period = period
+        self.phase = phase % period
+        self.animation_delay = animation_delay
+        self.latency = latency
+        self.error_rate = error_rate
+        self.password = password
+        self.screens = screens or DEFAULT_SCREENS
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.custom_text = None
+        self.custom_text_refresh = None
+        self.server = None
+        self.thread = None
+
+        # Counters reported through stats()
+        self.status_calls = 0
+        self.text_calls = 0
+        self.auth_failures = 0
+        self.injected_errors = 0
+        self.lost_texts = 0
+        self.shown_texts = []
+
+    # ---------- display model ----------
+
+    def refresh_index(self, now):
+        """Number of the refresh period now falls into"""
+        return int((now - self.phase) // self.period)
+
+    def last_refresh_at(self, now):
+        """Epoch time of the latest refresh boundary"""
+        return self.refresh_index(now) * self.period + self.phase
+
+    def display(self, now=None):
+        """What the clock is showing at epoch time now"""
+        now = time.time() if now is None else now
+        index = self.refresh_index(now)
+        with self.lock:
+            if self.custom_text is not None and self.custom_text_refresh == index:
+                return self.custom_text
+        return self.screens[index % len(self.screens)]
+
+    def show_text(self, text, now=None):
+        """Show custom text, unless the refresh animation overwrites it. Returns True if shown."""
+        now = time.time() if now is None else now
+        refresh_at = self.last_refresh_at(now)
+        after_refresh = now - refresh_at
+        with self.lock:
+            if after_refresh < self.animation_delay:
+                self.lost_texts += 1
+                return False
+            self.custom_text = text
+            self.custom_text_refresh = self.refresh_index(now)
+            self.shown_texts.append({"text": text, "at": now, "after_refresh": after_refresh})
+        return True
+
+    def count(self, counter):
+        """Increment a counter (requests arrive on many threads)"""
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def contents(self, now=None):
+        """Display text split into the clock's segments, like the real API"""
+        segments = list(self.display(now)[:DISPLAY_SLOTS])
+        return segments + [""] * (DISPLAY_SLOTS - len(segments))
+
+    # ---------- server ----------
+
+    def _handler(self):
+        clock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self):
+                if not clock.password:
+                    return True
+                expected = base64.b64encode(f":{clock.password}".encode("utf-8")).decode("ascii")
+                return self.headers.get("Authorization", "") == f"Basic {expected}"
+
+            def _handle(self, send_body=True):
+                if clock.latency:
+                    time.sleep(clock.latency * (1 + 0.2 * clock.random.random()))
+
+                if self.path == "/sim/stats":
+                    self._send_json(200, clock.stats())
+                    return
+                if not self._authorized():
+                    clock.count("auth_failures")
+                    self.send_response(401)
+                    self.send_header("WWW-Authenticate", 'Basic realm="BlockClock"')
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if clock.error_rate and clock.random.random() < clock.error_rate:
+                    clock.count("injected_errors")
+                    self._send_json(500, {"error": "simulated failure"})
+                    return
+
+                if self.path == "/api/status":
+                    clock.count("status_calls")
+                    if send_body:
+                        self._send_json(200, {"rendered": {"contents": clock.contents()}})
+                    else:
+                        self.send_response(200)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                elif self.path.startswith("/api/show/text/"):
+                    clock.count("text_calls")
+                    text = unquote(self.path[len("/api/show/text/"):])
+                    self._send_json(200, {"text": text, "shown": clock.show_text(text)})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_GET(self):
+                self._handle()
+
+            def do_HEAD(self):
+                self._handle(send_body=False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def ip(self):
+        """Address in the "ip:port" form BlockClockControl accepts"""
+        return f"{self.host}:{self.port}"
+
+    def device(self):
+        """Device dict for BlockClockControl / the web app"""
+        return {"name": self.name, "ip": self.ip, "password": self.password}
+
+    def stats(self):
+        with self.lock:
+            shown_texts = list(self.shown_texts)
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "period": self.period,
+            "phase": self.phase,
+            "status_calls": self.status_calls,
+            "text_calls": self.text_calls,
+            "auth_failures": self.auth_failures,
+            "injected_errors": self.injected_errors,
+            "lost_texts": self.lost_texts,
+            "shown_texts": shown_texts,
+        }
+
+
+class SimulatorFleet:
+    """Many virtual clocks on consecutive ports"""
+
+    def __init__(self, count, base_port=DEFAULT_PORT, host="127.0.0.1", period=300, phase=0.0,
+                 stagger=False, **options):
+        """
+        stagger: spread the refresh phases evenly over one period instead
+        of giving every clock the same phase
+        options: passed on to every SimulatedBlockClock
+        """
+        self.clocks = []
+        for i in range(count):
+            clock_phase = phase + (i * period / count if stagger else 0)
+            self.clocks.append(SimulatedBlockClock(f"Sim Clock {i + 1}", base_port + i, host=host,
+                                                   period=period, phase=clock_phase, **options))
+
+    def start(self):
+        for clock in self.clocks:
+            clock.start()
+        return self
+
+    def stop(self):
+        for clock in self.clocks:
+            clock.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def devices(self):
+        """Device dicts for all clocks"""
+        return [clock.device() for clock in self.clocks]
+
+    def config_lines(self):
+        """DEVICE_n_* lines for a blockclock.conf pointing at the simulator"""
+        lines = []
+        for i, clock in enumerate(self.clocks, 1):
+            lines.append(f'DEVICE_{i}_NAME="{clock.name}"')
+            lines.append(f'DEVICE_{i}_IP="{clock.ip}"')
+            lines.append(f'DEVICE_{i}_PASSWORD="{clock.password}"')
+        return lines
+
+    def stats(self):
+        return [clock.stats() for clock in self.clocks]
+
+
+class SimulatedResponse:
+    """The parts of a requests.Response the rotation reads"""
+
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class SimulatedConnection:
+    """Stands in for a DeviceConnection to one in-process clock"""
+
+    def __init__(self, pool, device):
+        self.pool = pool
+        self.device = device
+
+    def get(self, path, timeout=None):
+        return self.request("GET", path, timeout=timeout)
+
+    def request(self, method, path, timeout=None):
+        return self.pool.get(self.device, path, timeout=timeout)
+
+
+class SimulatedDevicePool(DevicePool):
+    """
+    DevicePool answering from in-process SimulatedBlockClocks on the
+    given clock (e.g. a VirtualClock) instead of over HTTP. Requests take
+    no simulated time, error rates are applied, latency and passwords are
+    ignored.
+    """
+
+    def __init__(self, clocks, clock, breakers=None):
+        """clocks: {device ip: SimulatedBlockClock}"""
+        super().__init__(breakers=breakers)
+        self.clocks = clocks
+        self.clock = clock
+
+    def connection(self, device):
+        return SimulatedConnection(self, device)
+
+    def get(self, device, path, timeout=None):
+        sim = self.clocks[device["ip"]]
+        now = self.clock.time()
+        if sim.error_rate and sim.random.random() < sim.error_rate:
+            sim.count("injected_errors")
+            return SimulatedResponse(500, {"error": "simulated failure"})
+        if path == "/api/status":
+            sim.count("status_calls")
+            return SimulatedResponse(200, {"rendered": {"contents": sim.contents(now)}})
+        if path.startswith("/api/show/text/"):
+            sim.count("text_calls")
+            text = unquote(path[len("/api/show/text/"):])
+            return SimulatedResponse(200, {"text": text, "shown": sim.show_text(text, now)})
+        return SimulatedResponse(404, {"error": "not found"})
+
+    def request_count(self):
+        return sum(sim.status_calls + sim.text_calls + sim.injected_errors for sim in self.clocks.values())
+
+    def stats(self):
+        return [{"name": sim.name, "ip": sim.ip, "requests": sim.status_calls + sim.text_calls,
+                 "reused": 0, "new_connections": 0, "reconnects": 0, "errors": sim.injected_errors}
+                for sim in self.clocks.values()]
+
+    def close(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run simulated BlockClock devices")
+    parser.add_argument("--devices", type=int, default=1, help="number of virtual clocks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_PORT, help="port of the first clock")
+    parser.add_argument("--period", type=float, default=300, help="seconds between refreshes")
+    parser.add_argument("--phase", type=float, default=0, help="refresh offset in seconds")
+    parser.add_argument("--stagger", action="store_true", help="spread phases over one period")
+    parser.add_argument("--animation-delay", type=float, default=6)
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests failing with 500")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--config", help="also write DEVICE_n_* lines for these clocks to this file")
+    args = parser.parse_args(argv)
+
+    fleet = SimulatorFleet(args.devices, base_port=args.base_port, host=args.host, period=args.period,
+                           phase=args.phase, stagger=args.stagger, animation_delay=args.animation_delay,
+                           latency=args.latency, error_rate=args.error_rate, password=args.password)
+    fleet.start()
+
+    if args.config:
+        with open(args.config, "w") as f:
+            f.write("\n".join(fleet.config_lines()) + "\n")
+
+    print(f"🕰  {args.devices} simulated BlockClocks on {args.host}:{args.base_port}-{args.base_port + args.devices - 1}")
+    print(f"   refresh every {args.period:g}s, animation {args.animation_delay:g}s, "
+          f"latency {args.latency:g}s, error rate {args.error_rate:.0%}")
+    print("   Press Ctrl+C to stop")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    fleet.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
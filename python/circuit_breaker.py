@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Circuit Breakers
+================================================
+Per-device circuit breakers so an offline clock does not cost a full
+request timeout (and an error log line) on every poll.
+
+  closed     requests go through, consecutive failures are counted
+  open       requests fail immediately until the backoff has passed
+  half-open  a single probe request is let through; success closes the
+             circuit again (the device is re-admitted), failure reopens
+             it with double the backoff
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Consecutive failures before the circuit opens
+FAILURE_THRESHOLD = 3
+
+# First backoff after opening, doubled on every failed probe up to MAX_BACKOFF
+BASE_BACKOFF = 10
+MAX_BACKOFF = 300
+
+# Transitions kept per device for the status API
+MAX_TRANSITIONS = 20
+
+
+class DeviceUnavailable(Exception):
+    """Raised instead of sending a request while a device's circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state machine for one device"""
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, base_backoff=BASE_BACKOFF,
+                 max_backoff=MAX_BACKOFF, on_transition=None, clock=time.monotonic, wall_clock=time.time):
+        """clock times the backoff, wall_clock stamps the transitions (epoch seconds)"""
+        self.name = name
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_transition = on_transition
+
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = base_backoff
+        self.retry_at = 0.0
+        self.probe_in_flight = False
+        self.transitions = deque(maxlen=MAX_TRANSITIONS)
+        self.lock = threading.Lock()
+
+    def _transition(self, state, reason):
+        previous = self.state
+        self.state = state
+        self.transitions.append({"at": self.wall_clock(), "from": previous, "to": state, "reason": reason})
+        if self.on_transition:
+            self.on_transition(self, previous, state, reason)
+
+    def allow(self):
+        """True if a request may be sent now (in half-open, only the single probe)"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                self._transition(HALF_OPEN, "backoff elapsed, probing")
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def is_probing(self):
+        return self.state == HALF_OPEN
+
+    def seconds_until_retry(self):
+        """Seconds until the next probe is allowed (0 when closed)"""
+        if self.state == CLOSED:
+            return 0
+        return max(0.0, self.retry_at - self.clock())
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                self.backoff = self.base_backoff
+                self._transition(CLOSED, "device answered again")
+
+    def record_failure(self, reason=""):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                self.backoff = min(self.max_backoff, self.backoff * 2)
+                self.retry_at = self.clock() + self.backoff
+                self._transition(OPEN, f"probe failed: {reason}")
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self.retry_at = self.clock() + self.backoff
+                self._transition(OPEN, f"{self.failures} consecutive failures: {reason}")
+
+    def trip(self, reason):
+        """Open the circuit right away (e.g. the device failed a health check)"""
+        with self.lock:
+            if self.state == OPEN:
+                return
+            self.probe_in_flight = False
+            self.retry_at = self.clock() + self.backoff
+            self._transition(OPEN, reason)
+
+    def status(self):
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "backoff": self.backoff,
+            "retry_in": round(self.seconds_until_retry(), 1),
+            "transitions": list(self.transitions),
+        }
+
+
+class CircuitBreakerRegistry:
+    """One circuit breaker per device, optionally mirrored to a status file"""
+
+    def __init__(self, status_file=None, clock=time.monotonic, on_transition=None, wall_clock=time.time):
+        """on_transition: optional callable(key, breaker, previous, state, reason)"""
+        self.status_file = status_file
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.on_transition = on_transition
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def get(self, device):
+        key = device["ip"]
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(device.get("name", key), clock=self.clock, wall_clock=self.wall_clock,
+                                         on_transition=lambda *args, key=key: self._on_transition(key, *args))
+                self.breakers[key] = breaker
+            return breaker
+
+    def _on_transition(self, key, breaker, previous, state, reason):
+        if state == OPEN:
+            logger.warning(f"🔌 [{breaker.name}] unreachable ({reason}), "
+                           f"pausing requests for {breaker.backoff} seconds")
+        elif state == CLOSED:
+            logger.info(f"🔌 [{breaker.name}] is back online, resuming requests")
+        self._save_file()
+        if self.on_transition:
+            self.on_transition(key, breaker, previous, state, reason)
+
+    def _save_file(self):
+        """Write all breaker states atomically for other processes (e.g. the web app)"""
+        if not self.status_file:
+            return
+        try:
+            data = json.dumps({"updated_at": self.wall_clock(), "devices": self.status()})
+            tmp_file = f"{self.status_file}.tmp"
+            with open(tmp_file, "w") as f:
+                f.write(data)
+            os.replace(tmp_file, self.status_file)
+        except OSError as e:
+            logger.debug(f"Could not write device status: {e}")
+
+    def status(self):
+        """State and recent transitions of every device"""
+        return {key: breaker.status() for key, breaker in list(self.breakers.items())}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Device Connections
+================================================
+Keep-alive HTTP connections to BlockClock devices. Each device gets its
+own requests session so the tiny embedded web server on the clock sees a
+single long-lived TCP connection instead of one new connection per poll.
+Every device also has a circuit breaker: once a clock stops answering,
+requests to it fail immediately until its backoff has passed.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import CircuitBreakerRegistry, DeviceUnavailable
+
+logger = logging.getLogger(__name__)
+
+# Default request timeout in seconds (same as the original per-call timeout)
+DEFAULT_TIMEOUT = 5
+
+# Shorter timeout for the single probe request sent to a device that was offline
+RECOVERY_PROBE_TIMEOUT = 2
+
+
+class DeviceConnection:
+    """Persistent HTTP connection to a single BlockClock device"""
+
+    def __init__(self, device, timeout=DEFAULT_TIMEOUT, pool_size=2, breaker=None):
+        """Create a connection for a device dict with name, ip and password"""
+        self.name = device.get("name", device["ip"])
+        self.ip = device["ip"]
+        self.password = device.get("password", "")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker
+
+        self.session = None
+        self.lock = threading.Lock()
+
+        # Counters reported through stats()
+        self.requests = 0
+        self.reused = 0
+        self.new_connections = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    def _open_session(self):
+        """Create a new session with a small keep-alive pool for this device"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("http://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        if self.password:
+            session.auth = ("", self.password)
+        return session
+
+    def _connection_count(self, url):
+        """Number of TCP connections the pool has opened so far for this device"""
+        # Only look at existing pools, creating one here would evict the live pool
+        try:
+            pools = self.session.get_adapter(url).poolmanager.pools
+            return sum(pools[key].num_connections for key in pools.keys())
+        except Exception:
+            return 0
+
+    def reset(self):
+        """Drop all pooled connections, the next request reconnects"""
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def get(self, path, timeout=None):
+        """Send a GET request for path (e.g. "/api/status") and return the response"""
+        return self.request("GET", path, timeout=timeout)
+
+    def request(self, method, path, timeout=None):
+        """Send a request to the device, failing fast with DeviceUnavailable while its circuit is open"""
+        url = f"http://{self.ip}{path}"
+        timeout = timeout or self.timeout
+
+        # Fail fast while the device is known to be offline
+        if self.breaker is not None:
+            if not self.breaker.allow():
+                raise DeviceUnavailable(f"{self.name} is offline, next retry in "
+                                        f"{self.breaker.seconds_until_retry():.0f}s")
+            if self.breaker.is_probing():
+                timeout = min(timeout, RECOVERY_PROBE_TIMEOUT)
+
+        try:
+            response = self._send(method, url, timeout)
+        except Exception as e:
+            if self.breaker is not None:
+                self.breaker.record_failure(str(e) or type(e).__name__)
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return response
+
+    def _send(self, method, url, timeout):
+        """Send one request, reconnecting once if the kept-alive connection went stale"""
+        for attempt in (1, 2):
+            with self.lock:
+                if self.session is None:
+                    self.session = self._open_session()
+                session = self.session
+
+            opened_before = self._connection_count(url)
+            self.requests += 1
+
+            try:
+                response = session.request(method, url, timeout=timeout)
+            except requests.exceptions.ConnectTimeout:
+                # The device did not answer at all, reconnecting would just wait again
+                self.errors += 1
+                raise
+            except requests.exceptions.ConnectionError:
+                self.errors += 1
+                self.reset()
+                # A pooled socket can go stale when the clock reboots. Retry once
+                # on a fresh connection, but only if we were reusing one.
+                if attempt == 1 and opened_before > 0:
+                    self.reconnects += 1
+                    logger.info(f"🔌 [{self.name}] connection dropped, reconnecting")
+                    continue
+                raise
+            except requests.exceptions.RequestException:
+                self.errors += 1
+                raise
+
+            if self._connection_count(url) > opened_before:
+                self.new_connections += 1
+            else:
+                self.reused += 1
+            return response
+
+    def stats(self):
+        """Return request/reuse/reconnect counters for this device"""
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "requests": self.requests,
+            "reused": self.reused,
+            "new_connections": self.new_connections,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        """Close the underlying session"""
+        self.reset()
+
+
+class DevicePool:
+    """Per-device keep-alive connections, created on first use"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, breakers=None):
+        self.timeout = timeout
+        self.breakers = breakers if breakers is not None else CircuitBreakerRegistry()
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def connection(self, device):
+        """Return the connection for a device, replacing it if the password changed"""
+        ip = device["ip"]
+        with self.lock:
+            conn = self.connections.get(ip)
+            if conn is None or conn.password != device.get("password", ""):
+                if conn is not None:
+                    conn.close()
+                conn = DeviceConnection(device, timeout=self.timeout, breaker=self.breakers.get(device))
+                self.connections[ip] = conn
+            return conn
+
+    def breaker(self, device):
+        """Return the circuit breaker of a device"""
+        return self.breakers.get(device)
+
+    def get(self, device, path, timeout=None):
+        """Send a GET request to a device through its pooled connection"""
+        return self.connection(device).get(path, timeout=timeout)
+
+    def timed_get(self, device, path, start_time, timeout=None):
+        """
+        Send a GET request and return a result dict with the status code,
+        latency and completion time (seconds since start_time) instead of raising
+        """
+        sent_at = time.monotonic()
+        result = {
+            "name": device.get("name", device["ip"]),
+            "ip": device["ip"],
+            "success": False,
+            "status_code": None,
+            "error": None,
+        }
+        try:
+            response = self.get(device, path, timeout=timeout)
+            result["status_code"] = response.status_code
+            result["success"] = response.status_code == 200
+        except Exception as e:
+            result["error"] = str(e)
+        finished_at = time.monotonic()
+        result["latency"] = finished_at - sent_at
+        result["completed_after"] = finished_at - start_time
+        return result
+
+    def request_count(self):
+        """Total number of requests sent to all devices so far"""
+        with self.lock:
+            return sum(conn.requests for conn in self.connections.values())
+
+    def stats(self):
+        """Return counters for every device connection"""
+        with self.lock:
+            return [conn.stats() for conn in self.connections.values()]
+
+    def close(self):
+        """Close all device connections"""
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections = {}
+
+
+def read_display(pool, device, timeout=None):
+    """
+    Ask a device what it is showing via /api/status.
+    Returns the rendered text, or "ERROR" if the response has no display.
+    Connection errors are raised to the caller.
+    """
+    response = pool.get(device, "/api/status", timeout=timeout)
+    if response.status_code == 200:
+        data = response.json()
+        if "rendered" in data and "contents" in data["rendered"]:
+            return "".join(data["rendered"]["contents"])
+    return "ERROR"
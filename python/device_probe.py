@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Health Probes
+================================================
+In-process reachability checks for BlockClock devices. Replaces forking
+`ping` once per device: every device is probed in parallel with a TCP
+connect to its API port (reachability and round-trip time) followed by a
+HEAD request against /api/status (is the HTTP API actually answering).
+The outcome also opens or closes the device's circuit breaker.
+"""
+
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from device_client import DevicePool
+
+# Seconds to wait for the TCP connect and the API request (same as `ping -W 2`)
+PROBE_TIMEOUT = 2
+
+# Upper bound on simultaneous probes when checking many devices at once
+MAX_PROBE_WORKERS = 8
+
+
+def split_host_port(ip, default_port=80):
+    """Split "192.168.0.10:8080" into host and port, defaulting to the HTTP port"""
+    host, _, port = ip.partition(":")
+    return host, int(port) if port else default_port
+
+
+def probe_device(device, timeout=PROBE_TIMEOUT, check_api=True, pool=None):
+    """
+    Probe a single device.
+    Returns a dict with reachable, rtt_ms (TCP connect time), api_ok and
+    api_status (HTTP status of HEAD /api/status) plus any error message.
+    """
+    result = {
+        "name": device.get("name", device["ip"]),
+        "ip": device["ip"],
+        "reachable": False,
+        "rtt_ms": None,
+        "api_ok": False,
+        "api_status": None,
+        "error": None,
+    }
+
+    host, port = split_host_port(device["ip"])
+    pool = pool or DevicePool(timeout=timeout)
+    breaker = pool.breaker(device)
+
+    # TCP connect to the API port, this is what `ping` used to tell us
+    started = time.monotonic()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+        result["reachable"] = True
+        result["rtt_ms"] = round((time.monotonic() - started) * 1000, 1)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e) or type(e).__name__
+        # Stop sending requests to the device until it answers again
+        breaker.trip(f"health check failed: {result['error']}")
+        return result
+
+    # The device answers again, let requests through right away
+    breaker.record_success()
+
+    if not check_api:
+        return result
+
+    # HEAD against the status endpoint, through the device's kept-alive connection
+    try:
+        response = pool.connection(device).request("HEAD", "/api/status", timeout=timeout)
+        result["api_status"] = response.status_code
+        # Some embedded servers answer HEAD with 405/501, the API is still up
+        result["api_ok"] = response.status_code < 400 or response.status_code in (405, 501)
+        if response.status_code == 401:
+            result["error"] = "Device rejected the password"
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+
+    return result
+
+
+def probe_devices(devices, timeout=PROBE_TIMEOUT, check_api=True, pool=None):
+    """Probe all devices in parallel, returning results in the same order as devices"""
+    if not devices:
+        return []
+
+    pool = pool or DevicePool(timeout=timeout)
+    workers = max(1, min(MAX_PROBE_WORKERS, len(devices)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda device: probe_device(device, timeout=timeout, check_api=check_api, pool=pool),
+            devices))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Device Registry
+================================================
+All configured BlockClocks, indexed by id, name, IP address and group,
+with no limit on the number of devices. Devices are read from the
+DEVICE_<id>_* settings of blockclock.conf in a single pass:
+
+  DEVICE_12_NAME="Bar Clock"
+  DEVICE_12_IP="10.0.4.21"
+  DEVICE_12_PASSWORD=""
+  DEVICE_12_GROUP="Venue B"        (optional)
+  DEVICE_12_REFRESH_TIME=600       (optional)
+  DEVICE_12_QUIET_HOURS="01:00-08:00"   (optional, see quiet_hours.py)
+
+Adding or removing a single device appends a few lines to the config
+file instead of rewriting it. Later assignments override earlier ones
+(like sourcing the file in a shell), and a removed device is marked with
+DEVICE_<id>_REMOVED=1. The registry counts the device lines that no
+longer take effect, and once there are COMPACT_STALE_LINES of them the
+web app saves a clean file again (any full save does).
+"""
+
+import re
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEVICE_KEY_PATTERN = re.compile(r'^DEVICE_(\d+)_([A-Z_]+)$')
+
+# Per-device settings read from the config file
+DEVICE_FIELDS = ("NAME", "IP", "PASSWORD", "GROUP", "REFRESH_TIME", "QUIET_HOURS")
+
+# Overridden or removed device lines in the config file before it is worth rewriting
+COMPACT_STALE_LINES = 50
+
+
+def parse_settings(lines):
+    """
+    Parse KEY=value lines into a dict, skipping comments and stripping
+    quotes. Later lines override earlier ones.
+    """
+    settings = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        value = value.strip()
+        if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+        settings[key.strip()] = value
+    return settings
+
+
+def device_lines(device):
+    """Config lines for one device"""
+    i = device["id"]
+    lines = [
+        f'DEVICE_{i}_NAME="{device["name"]}"',
+        f'DEVICE_{i}_IP="{device["ip"]}"',
+        f'DEVICE_{i}_PASSWORD="{device.get("password", "")}"',
+    ]
+    if device.get("group"):
+        lines.append(f'DEVICE_{i}_GROUP="{device["group"]}"')
+    if device.get("refresh_time"):
+        lines.append(f'DEVICE_{i}_REFRESH_TIME={device["refresh_time"]}')
+    if device.get("quiet_hours"):
+        lines.append(f'DEVICE_{i}_QUIET_HOURS="{device["quiet_hours"]}"')
+    return lines
+
+
+def parse_device_id(device_id):
+    """Device id as an int, ValueError for anything that is not a positive whole number"""
+    text = str(device_id).strip()
+    if not text.isdigit() or int(text) == 0:
+        raise ValueError(f"Invalid device id: {device_id!r}")
+    return int(text)
+
+
+class DeviceRegistry:
+    """Devices by id, with name, IP and group indexes kept in step"""
+
+    def __init__(self, devices=()):
+        self.devices = {}
+        self.ids_by_name = {}
+        self.ids_by_ip = {}
+        self.ids_by_group = {}
+        self.next_id = 1
+        self.removed_ids = set()
+        # Device lines in the config file that no longer take effect
+        self.stale_lines = 0
+        self.lock = threading.RLock()
+        for device in devices:
+            self.add(device)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build the registry from parsed config settings (see parse_settings)"""
+        fields = {}
+        removed = set()
+        highest_id = 0
+        for key, value in settings.items():
+            match = DEVICE_KEY_PATTERN.match(key)
+            if not match:
+                continue
+            device_id, field = int(match.group(1)), match.group(2)
+            highest_id = max(highest_id, device_id)
+            if field == "REMOVED":
+                if value not in ("", "0"):
+                    removed.add(device_id)
+            elif field in DEVICE_FIELDS:
+                fields.setdefault(device_id, {})[field] = value
+
+        registry = cls()
+        for device_id in sorted(fields):
+            values = fields[device_id]
+            if device_id in removed or not values.get("IP", "").strip():
+                continue
+            device = {
+                "id": device_id,
+                "name": values.get("NAME") or f"Device {device_id}",
+                "ip": values["IP"].strip(),
+                "password": values.get("PASSWORD", ""),
+            }
+            if values.get("GROUP"):
+                device["group"] = values["GROUP"]
+            # Optional per-device refresh time, defaults to CLOCK_REFRESH_TIME
+            if values.get("REFRESH_TIME"):
+                try:
+                    device["refresh_time"] = int(values["REFRESH_TIME"])
+                except ValueError:
+                    logger.warning(f"⚠️ Invalid DEVICE_{device_id}_REFRESH_TIME in config, using CLOCK_REFRESH_TIME")
+            if values.get("QUIET_HOURS"):
+                device["quiet_hours"] = values["QUIET_HOURS"]
+            try:
+                registry.add(device)
+            except ValueError as e:
+                logger.warning(f"⚠️ Skipping DEVICE_{device_id}: {str(e)}")
+
+        # Never hand out the id of a removed device again while its lines are in the file
+        registry.next_id = max(registry.next_id, highest_id + 1)
+        registry.removed_ids = removed
+        return registry
+
+    @classmethod
+    def from_config_text(cls, content):
+        return cls.from_settings(parse_settings(content.splitlines()))
+
+    @classmethod
+    def load(cls, config_file):
+        with open(config_file, 'r') as f:
+            lines = f.readlines()
+        registry = cls.from_settings(parse_settings(lines))
+        written = sum(1 for line in lines if DEVICE_KEY_PATTERN.match(line.split('=', 1)[0].strip()))
+        registry.stale_lines = max(0, written - sum(len(device_lines(device)) for device in registry.devices.values()))
+        return registry
+
+    @property
+    def needs_compaction(self):
+        """Whether the config file has piled up enough stale device lines to be rewritten"""
+        return self.stale_lines >= COMPACT_STALE_LINES
+
+    # ---------- lookups ----------
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.list())
+
+    def list(self):
+        """All devices ordered by id"""
+        with self.lock:
+            return [self.devices[device_id] for device_id in sorted(self.devices)]
+
+    def get(self, device_id):
+        return self.devices.get(parse_device_id(device_id))
+
+    def by_name(self, name):
+        """Device with this name, the lowest id if several share it"""
+        device_ids = self.ids_by_name.get(name.lower())
+        return self.devices[min(device_ids)] if device_ids else None
+
+    def by_ip(self, ip):
+        device_id = self.ids_by_ip.get(ip)
+        return self.devices.get(device_id) if device_id is not None else None
+
+    def group(self, group):
+        """Devices in a group, ordered by id"""
+        with self.lock:
+            return [self.devices[device_id] for device_id in sorted(self.ids_by_group.get(group, ()))]
+
+    def groups(self):
+        """Group names in use"""
+        return sorted(self.ids_by_group)
+
+    # ---------- changes ----------
+
+    def add(self, device):
+        """Add (or replace) a device, assigning the next free id if it has none"""
+        with self.lock:
+            device = dict(device)
+            if not device.get("id"):
+                device["id"] = self.next_id
+            device["id"] = parse_device_id(device["id"])
+            if device["ip"] in self.ids_by_ip and self.ids_by_ip[device["ip"]] != device["id"]:
+                raise ValueError(f"A device with IP {device['ip']} is already configured")
+
+            self.remove(device["id"])
+            self.devices[device["id"]] = device
+            self.ids_by_name.setdefault(device["name"].lower(), set()).add(device["id"])
+            self.ids_by_ip[device["ip"]] = device["id"]
+            if device.get("group"):
+                self.ids_by_group.setdefault(device["group"], set()).add(device["id"])
+            self.next_id = max(self.next_id, device["id"] + 1)
+            return device
+
+    def remove(self, device_id):
+        """Remove a device by id, returning it (None if unknown)"""
+        with self.lock:
+            device = self.devices.pop(parse_device_id(device_id), None)
+            if device is None:
+                return None
+            for ids, key in ((self.ids_by_name, device["name"].lower()), (self.ids_by_group, device.get("group"))):
+                if key in ids:
+                    ids[key].discard(device["id"])
+                    if not ids[key]:
+                        del ids[key]
+            self.ids_by_ip.pop(device["ip"], None)
+            return device
+
+    # ---------- incremental config file updates ----------
+
+    def append_device(self, config_file, device):
+        """Add a device and append its lines to the config file"""
+        with self.lock:
+            replaced = self.devices.get(parse_device_id(device["id"])) if device.get("id") else None
+            device = self.add(device)
+            lines = device_lines(device)
+            if replaced is not None:
+                self.stale_lines += len(device_lines(replaced))
+            if device["id"] in self.removed_ids:
+                # Undo an earlier removal marker for this id
+                self.removed_ids.discard(device["id"])
+                lines.append(f'DEVICE_{device["id"]}_REMOVED=0')
+                self.stale_lines += 1
+            append_lines(config_file, lines)
+            return device
+
+    def append_removal(self, config_file, device_id):
+        """Remove a device and mark it removed at the end of the config file"""
+        with self.lock:
+            device = self.remove(device_id)
+            if device is not None:
+                self.removed_ids.add(device["id"])
+                append_lines(config_file, [f"DEVICE_{device['id']}_REMOVED=1"])
+                self.stale_lines += len(device_lines(device)) + 1
+            return device
+
+
+def append_lines(config_file, lines):
+    """Append lines to a config file, starting a new line only if its last one is unterminated"""
+    with open(config_file, 'a+') as f:
+        f.seek(0, 2)
+        size = f.tell()
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        f.write("\n".join(lines) + "\n")
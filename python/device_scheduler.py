@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Device Scheduler
+================================================
+Runs the rotation cycle independently for every device. Each clock has
+its own refresh phase, refresh time, last display and timers, so it gets
+its custom text at its own refresh boundary instead of on the timing of
+the first device. A single loop multiplexes all of them: every device
+wakeup, the periodic device check and progress log ticks are timers in
+one TimerQueue on the monotonic clock. The loop sleeps until the
+earliest deadline, handles every timer that is due, and sends one
+concurrent request to all devices that reach their boundary together.
+A device whose circuit breaker is open sleeps until its next recovery
+probe and goes back to syncing once it answers again.
+
+A manual text injected into the running rotation (see inject_text) is
+shown on each device at its next safe moment: right away while the
+device is syncing or well before its next refresh, otherwise in place of
+the custom text after the refresh. The sync state is kept either way.
+
+The sync state is saved on every transition (see sync_state.py). On
+start, devices with a still valid saved state skip syncing and wait for
+their next predicted refresh at their saved cycle position.
+
+During its quiet hours (see quiet_hours.py) a device gets no requests
+at all: its timer is set to the end of the window, and the periodic
+device check leaves it out. Afterwards it waits for its next refresh
+predicted from the last known phase, like after a warm restart.
+"""
+
+import math
+import threading
+from datetime import datetime
+
+from refresh_polling import AdaptivePollSchedule
+from circuit_breaker import OPEN
+from timer_queue import TimerQueue
+from virtual_clock import SystemClock
+import engine_events
+
+# Device states
+SYNCING = "syncing"      # Waiting for the first refresh to learn the phase
+WAITING = "waiting"      # Sleeping until shortly before the next refresh
+POLLING = "polling"      # Polling the display around the expected refresh
+ANIMATING = "animating"  # Refresh seen, waiting for the animation before sending text
+QUIET = "quiet"          # Quiet hours, no requests until the window ends
+
+# Seconds before the expected refresh to start polling when the phase is not learned yet
+UNLEARNED_LEAD_TIME = 45
+
+# Extra seconds to keep polling past the refresh time before giving up on a refresh
+REFRESH_TIMEOUT_MARGIN = 300
+
+# Devices whose text is due within this many seconds of each other share one send
+SEND_BATCH_WINDOW = 1.0
+
+# A manual text is only shown mid-cycle if the next refresh is at least this many seconds away
+MANUAL_TEXT_MIN_LEAD = 10
+
+# Timers besides the device wakeups (those are keyed by device IP)
+CHECK_TIMER = "device-check"
+MANUAL_TEXT_TIMER = "manual-text"
+PROGRESS_TIMER = "progress"
+
+# Progress of the first device is logged in this many steps for sleeps of at least PROGRESS_MIN_SLEEP seconds
+PROGRESS_SEGMENTS = 10
+PROGRESS_MIN_SLEEP = 60
+
+# While syncing, "still waiting" is logged after SYNC_PROGRESS_FIRST seconds, then every SYNC_PROGRESS_INTERVAL
+SYNC_PROGRESS_FIRST = 10
+SYNC_PROGRESS_INTERVAL = 30
+SYNC_PROGRESS_MESSAGES = [
+    "⏳ [{name}] Still waiting... (elapsed: {elapsed})",
+    "⏳ [{name}] Still waiting... (elapsed: {elapsed})",
+    "⏳ [{name}] Still bloody waiting... (elapsed: {elapsed})",
+    "⏳ [{name}] Hang in there... (elapsed: {elapsed})",
+    "⏳ [{name}] Patience is a Virtue... (elapsed: {elapsed})",
+    "⏳ [{name}] It will happen, trust me... (elapsed: {elapsed})",
+    "⏳ [{name}] Won't be long now... (elapsed: {elapsed})",
+]
+
+
+class ManualText:
+    """A one-time text for the running rotation and its per-device results"""
+
+    def __init__(self, text, clock=None):
+        """clock: the rotation's clock, queued times are compared with its refresh times"""
+        clock = clock or SystemClock()
+        self.text = text
+        self.queued_at = clock.time()
+        self.queued_monotonic = clock.monotonic()
+        self.waiting = set()
+        self.results = []
+        self.done = threading.Event()
+
+    def delivered(self, results):
+        """Record send results, done once every device has been sent the text"""
+        for result in results:
+            self.waiting.discard(result["ip"])
+        self.results.extend(results)
+        if not self.waiting:
+            self.done.set()
+
+    def drop(self, key, reason):
+        """Give up on one device (removed, or the text was replaced)"""
+        if key in self.waiting:
+            self.delivered([{"name": key, "ip": key, "success": False, "status_code": None, "error": reason}])
+
+    def cancel(self, reason):
+        """Give up on every device still waiting (the rotation stopped), done with at least one result"""
+        for key in list(self.waiting):
+            self.drop(key, reason)
+        if not self.results:
+            self.results.append({"name": None, "ip": None, "success": False, "status_code": None, "error": reason})
+        self.done.set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class DeviceSchedule:
+    """Scheduling state for one BlockClock"""
+
+    def __init__(self, device, refresh_time, displays_between_text, timers=None, clock=None):
+        self.device = device
+        self.timers = timers
+        self.clock = clock or SystemClock()
+        self.name = device["name"]
+        self.key = device["ip"]
+        self.refresh_time = refresh_time
+        self.displays_between_text = displays_between_text
+
+        self._state = SYNCING
+        self.state_since = self.clock.time()
+        self._next_wake = 0.0
+        self.last_display = None
+        self.last_custom_text = None
+        self.last_refresh_at = None
+        self.refresh_count = 0
+        self.cycle_count = 0
+        self.offline = False
+        self.manual_text = None
+        # Restored from the saved sync state (or back from quiet hours) and not confirmed by a refresh yet
+        self.resumed = False
+        # QuietHours of this device (None if it has none) and the end of the current window
+        self.quiet = None
+        self.quiet_until = None
+
+        # Polling state while SYNCING/POLLING
+        self.poll = AdaptivePollSchedule()
+        self.poll_started_at = None
+        self.expected_at = None
+        self.window = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        if state != self._state:
+            self.state_since = self.clock.time()
+        self._state = state
+
+    @property
+    def next_wake(self):
+        """Monotonic time this device is due next, kept in step with its timer"""
+        return self._next_wake
+
+    @next_wake.setter
+    def next_wake(self, deadline):
+        self._next_wake = deadline
+        if self.timers is not None:
+            self.timers.schedule(self.key, deadline)
+
+    def status(self):
+        """Snapshot of this device's scheduling state"""
+        return {
+            "name": self.name,
+            "ip": self.key,
+            "state": self.state,
+            "state_since": self.state_since,
+            "next_wake_in": max(0.0, round(self.next_wake - self.clock.monotonic(), 1)),
+            "refresh_time": self.refresh_time,
+            "refresh_count": self.refresh_count,
+            "cycle_count": self.cycle_count,
+            "last_display": self.last_display,
+            "last_custom_text": self.last_custom_text,
+            "offline": self.offline,
+            "manual_text": self.manual_text.text if self.manual_text else None,
+            "quiet_until": self.quiet_until,
+        }
+
+
+class RotationScheduler:
+    """Multiplexes the per-device rotation cycles of a BlockClockControl"""
+
+    def __init__(self, control):
+        self.control = control
+        self.logger = control.logger
+        self.clock = control.clock
+        self.schedules = []
+        self.schedules_by_key = {}
+        self.timers = TimerQueue(self.clock.monotonic)
+        self.check_period = None
+        self.next_check_at = None
+        self.progress = None
+        self.manual_pending = False
+        self.requests_at_last_send = control.connections.request_count()
+        self.sync_devices(control.devices)
+
+    def sync_devices(self, devices):
+        """Keep one schedule per configured device, preserving existing state"""
+        existing = {schedule.key: schedule for schedule in self.schedules}
+        schedules = []
+        for device in devices:
+            schedule = existing.get(device["ip"])
+            if schedule is None:
+                refresh_time = self.control.refresh_time_for(device)
+                schedule = DeviceSchedule(device, refresh_time, self.control.displays_between_text, self.timers,
+                                          self.clock)
+                self.control.refresh_learner.set_nominal_period(schedule.key, refresh_time)
+                # Due right away, a device added while running starts syncing now
+                schedule.poll_started_at = self.clock.monotonic()
+                schedule.next_wake = schedule.poll_started_at
+            else:
+                # Same clock, its name or group may have changed
+                schedule.device = device
+                schedule.name = device["name"]
+            schedule.quiet = self.control.quiet_hours.for_device(device)
+            schedules.append(schedule)
+        keys = {schedule.key for schedule in schedules}
+        for schedule in self.schedules:
+            if schedule.key not in keys:
+                self.timers.cancel(schedule.key)
+                if schedule.manual_text is not None:
+                    schedule.manual_text.drop(schedule.key, "Device removed")
+        self.schedules = schedules
+        self.schedules_by_key = {schedule.key: schedule for schedule in schedules}
+
+    def status(self):
+        """Scheduling state of every device"""
+        return [schedule.status() for schedule in self.schedules]
+
+    def emit(self, event_type, schedule, **fields):
+        """Send a device event to the web app (see engine_events.py)"""
+        self.control.events.emit(event_type, device=schedule.name, ip=schedule.key, **fields)
+
+    # ---------- main loop ----------
+
+    def run(self):
+        """Run all device cycles until should_continue() returns False"""
+        now = self.clock.monotonic()
+        self.check_period = 5 * (self.control.displays_between_text + 1) * self.control.clock_refresh_time
+        self.next_check_at = now + self.check_period
+        self.timers.schedule(CHECK_TIMER, self.next_check_at)
+        for schedule in self.schedules:
+            schedule.poll_started_at = now
+            schedule.next_wake = now
+        self.control.events.emit(engine_events.ROTATION_STARTED, total=self.control.displays_between_text,
+                                 devices=[{"device": schedule.name, "ip": schedule.key} for schedule in self.schedules])
+        self.restore_sync_state(now)
+        for schedule in self.schedules:
+            if schedule.state == SYNCING:
+                self.emit(engine_events.SYNCING, schedule, refresh_time=schedule.refresh_time)
+        if self.schedules and self.schedules[0].state == SYNCING:
+            self.start_sync_progress(now)
+
+        while self.control.should_continue() and self.schedules:
+            # A queued manual text may be shown right away, or sets its own timer
+            self.send_manual_text(self.clock.monotonic())
+
+            now = self.clock.monotonic()
+            keys = self.timers.pop_due(now)
+            if not keys:
+                # Sleep exactly until the next deadline, controls of the engine cut it short
+                self.control.sleep(self.timers.time_until_next(now))
+                continue
+
+            due = []
+            for key in keys:
+                if key == CHECK_TIMER:
+                    self.check_devices(now)
+                elif key == PROGRESS_TIMER:
+                    self.log_progress(now)
+                elif key in self.schedules_by_key:
+                    due.append(self.schedules_by_key[key])
+
+            for schedule in due:
+                if self.check_quiet_hours(schedule, now):
+                    continue
+                if schedule.state != ANIMATING:
+                    self.step(schedule, now)
+
+            # Send to every device whose animation has finished (or is about to)
+            if any(schedule.state == ANIMATING for schedule in due):
+                sending = [schedule for schedule in self.schedules
+                           if schedule.state == ANIMATING and schedule.next_wake <= now + SEND_BATCH_WINDOW]
+                if any(schedule in due for schedule in sending):
+                    self.send_custom_text(sending)
+
+    def check_devices(self, now):
+        """Periodic device check (every 5 rotation cycles), devices in quiet hours are left alone"""
+        awake = [schedule.device for schedule in self.schedules if schedule.state != QUIET]
+        if awake:
+            self.logger.info("🔄 Performing periodic device check (every 5 cycles)")
+            self.control.log_connection_stats()
+            # Offline devices rejoin through their circuit breakers, keep running
+            if not self.control.check_devices(awake):
+                self.logger.warning("⚠️ No devices are reachable right now, retrying automatically")
+        self.control.reload_config()
+        self.sync_devices(self.control.devices)
+        # From the previous deadline, so the checks do not drift
+        self.next_check_at += self.check_period
+        if self.next_check_at <= now:
+            self.next_check_at = now + self.check_period
+        self.timers.schedule(CHECK_TIMER, self.next_check_at)
+
+    # ---------- progress log ----------
+
+    def start_sync_progress(self, now):
+        """Log that the first device is still waiting for its first refresh every now and then"""
+        self.progress = {"schedule": self.schedules[0], "state": SYNCING, "start": now, "ticks": 0}
+        self.timers.schedule(PROGRESS_TIMER, now + SYNC_PROGRESS_FIRST)
+
+    def start_countdown_progress(self, schedule, now):
+        """Log the progress of a long sleep of the first device in PROGRESS_SEGMENTS steps"""
+        self.progress = {"schedule": schedule, "state": WAITING, "start": now, "end": schedule.next_wake, "ticks": 0}
+        self.timers.schedule(PROGRESS_TIMER, now + (schedule.next_wake - now) / PROGRESS_SEGMENTS)
+
+    def log_progress(self, now):
+        progress = self.progress
+        if progress is None:
+            return
+        schedule = progress["schedule"]
+        progress["ticks"] += 1
+        ticks = progress["ticks"]
+
+        if progress["state"] == SYNCING:
+            if schedule.state != SYNCING:
+                self.progress = None
+                return
+            elapsed = int(now - progress["start"])
+            message = SYNC_PROGRESS_MESSAGES[(ticks - 1) % len(SYNC_PROGRESS_MESSAGES)]
+            self.logger.info(message.format(name=schedule.name, elapsed=f"{elapsed // 60:02d}:{elapsed % 60:02d}"))
+            # Deadlines from the start, so the ticks do not drift
+            self.timers.schedule(PROGRESS_TIMER, progress["start"] + SYNC_PROGRESS_FIRST + ticks * SYNC_PROGRESS_INTERVAL)
+            return
+
+        # A sleep that was cut short or rescheduled ends its progress log
+        if schedule.state != WAITING or schedule.next_wake != progress["end"]:
+            self.progress = None
+            return
+        remaining = max(0, int(progress["end"] - now))
+        progress_chars = "▮" * ticks + "▯" * (PROGRESS_SEGMENTS - ticks)
+        self.logger.info(f"⏳ [{schedule.name}] Countdown progress: [{progress_chars}] {ticks * 100 // PROGRESS_SEGMENTS}% "
+                         f"({remaining // 60:02d}:{remaining % 60:02d} remaining)")
+        if ticks < PROGRESS_SEGMENTS - 1:
+            segment = (progress["end"] - progress["start"]) / PROGRESS_SEGMENTS
+            self.timers.schedule(PROGRESS_TIMER, progress["start"] + (ticks + 1) * segment)
+        else:
+            self.progress = None
+
+    def step(self, schedule, now):
+        """Advance a device that is due"""
+        if schedule.state == WAITING:
+            self.start_polling(schedule, now)
+            return
+
+        # Don't poll an offline device, sleep until its breaker allows a probe
+        breaker = self.control.connections.breaker(schedule.device)
+        if breaker.state == OPEN and breaker.seconds_until_retry() > 0:
+            schedule.offline = True
+            schedule.next_wake = now + breaker.seconds_until_retry()
+            return
+
+        display = self.control.get_display(schedule.device)
+        schedule.poll.record(display != "ERROR")
+        now = self.clock.monotonic()
+
+        if schedule.offline and display != "ERROR":
+            self.resync(schedule, now)
+            return
+
+        # First poll while syncing (or after a warm restart) just records what the clock shows now
+        if schedule.last_display is None:
+            if display != "ERROR":
+                schedule.last_display = display
+            if display != "ERROR" and schedule.state == SYNCING:
+                display_info = self.control.get_display_info(display)
+                if not self.control.clean_display_text(display) or self.control.clean_display_text(display) == "null":
+                    display_info = "(unknown)"
+                self.logger.info(f"⏳ [{schedule.name}] Waiting for first refresh to synchronize...")
+                self.logger.info(f"⏳ [{schedule.name}] Current Display: \"{display_info}\"")
+            schedule.next_wake = now + schedule.poll.next_interval(now)
+            return
+
+        if (display != schedule.last_display and
+            display != schedule.last_custom_text and
+            display and
+            display != "ERROR"):
+            self.on_refresh(schedule, display, now)
+            return
+
+        if now - schedule.poll_started_at >= schedule.refresh_time + REFRESH_TIMEOUT_MARGIN:
+            if schedule.resumed:
+                self.logger.warning(f"⚠️ [{schedule.name}] Saved sync state no longer matches the clock")
+                self.resync(schedule, now)
+                return
+            self.logger.warning(f"⚠️ [{schedule.name}] Timeout waiting for display change after "
+                                f"{schedule.refresh_time + REFRESH_TIMEOUT_MARGIN} seconds")
+            self.on_refresh(schedule, None, now)
+            return
+
+        schedule.next_wake = now + schedule.poll.next_interval(now)
+
+    def resync(self, schedule, now):
+        """Start over with a device whose refresh phase may have changed (back online, stale saved state)"""
+        if schedule.offline:
+            self.logger.info(f"🔄 [{schedule.name}] Back online, resynchronizing")
+        self.control.refresh_learner.forget(schedule.key)
+        schedule.offline = False
+        schedule.resumed = False
+        schedule.state = SYNCING
+        schedule.last_display = None
+        schedule.last_refresh_at = None
+        schedule.refresh_count = 0
+        schedule.poll = AdaptivePollSchedule()
+        schedule.poll_started_at = now
+        schedule.next_wake = now
+        if schedule is self.schedules[0]:
+            self.start_sync_progress(now)
+        self.emit(engine_events.SYNCING, schedule, refresh_time=schedule.refresh_time)
+        self.save_sync_state()
+
+    # ---------- quiet hours ----------
+
+    def check_quiet_hours(self, schedule, now):
+        """Start or end the quiet hours of a device that is due, True if it must not be stepped now"""
+        if schedule.quiet is None and schedule.state != QUIET:
+            return False
+        wall_now = self.clock.time()
+        window_end = schedule.quiet.window_end(wall_now) if schedule.quiet is not None else None
+        if window_end is not None:
+            if schedule.state != QUIET:
+                self.start_quiet_hours(schedule, window_end)
+            # Wall-clock end as a monotonic deadline, checked again on wakeup in case the clock moved
+            schedule.quiet_until = window_end
+            schedule.next_wake = now + (window_end - wall_now)
+            return True
+        if schedule.state == QUIET:
+            self.end_quiet_hours(schedule, now)
+            return True
+        return False
+
+    def start_quiet_hours(self, schedule, window_end):
+        until = datetime.fromtimestamp(window_end).strftime("%a %H:%M")
+        self.logger.info(f"🌙 [{schedule.name}] Quiet hours until {until}, no device traffic")
+        if schedule.manual_text is not None:
+            schedule.manual_text.drop(schedule.key, "Quiet hours")
+            schedule.manual_text = None
+        schedule.offline = False
+        schedule.state = QUIET
+        self.emit(engine_events.QUIET_HOURS, schedule, until=window_end)
+        if all(other.state == QUIET for other in self.schedules):
+            # Nothing is sent until one wakes up, don't hold kept-alive connections (or async streams) open
+            self.control.connections.close()
+
+    def end_quiet_hours(self, schedule, now):
+        """Pick the cycle up from the last known refresh phase, syncing only if there is none"""
+        schedule.quiet_until = None
+        if schedule.last_refresh_at is None:
+            self.logger.info(f"☀️ [{schedule.name}] Quiet hours over, synchronizing")
+            self.resync(schedule, now)
+            return
+        # Refreshes during quiet hours count towards the cycle, like after a restart
+        missed = math.floor((now - schedule.last_refresh_at) / schedule.refresh_time)
+        schedule.last_refresh_at += missed * schedule.refresh_time
+        schedule.refresh_count = min(schedule.refresh_count + missed, schedule.displays_between_text)
+        # Compare against what the clock shows now, and resync if the phase no longer holds
+        schedule.last_display = None
+        schedule.resumed = True
+        self.logger.info(f"☀️ [{schedule.name}] Quiet hours over, resuming from the last known phase")
+        self.schedule_wait(schedule, now)
+        self.save_sync_state()
+
+    def resume(self, paused_for):
+        """Continue after a pause without counting the pause against refresh timeouts"""
+        for schedule in self.schedules:
+            if schedule.poll_started_at is not None:
+                schedule.poll_started_at += paused_for
+
+    def start_polling(self, schedule, now):
+        """Switch a waiting device to polling around its expected refresh"""
+        if schedule.window is None:
+            schedule.poll = AdaptivePollSchedule(schedule.expected_at)
+        else:
+            schedule.poll = AdaptivePollSchedule(schedule.expected_at, window=schedule.window)
+        schedule.poll_started_at = now
+        schedule.state = POLLING
+        schedule.next_wake = now
+
+        number = schedule.refresh_count + 1
+        self.emit(engine_events.POLLING, schedule, number=number, total=schedule.displays_between_text)
+        if number > schedule.displays_between_text:
+            self.logger.info(f"🔍 [{schedule.name}] Actively monitoring for final refresh")
+        else:
+            self.logger.info(f"🔍 [{schedule.name}] Actively monitoring for refresh #{number} of {schedule.displays_between_text}")
+
+    def on_refresh(self, schedule, display, now):
+        """Handle a detected refresh (display is None when the wait timed out)"""
+        elapsed = max(1, int(now - schedule.poll_started_at))
+
+        if display is not None:
+            schedule.last_refresh_at = now
+            schedule.last_display = display
+            schedule.resumed = False
+            self.control.refresh_learner.record(schedule.key, now)
+            display_info = self.control.get_display_info(display)
+        else:
+            display_info = "(unknown)"
+
+        if schedule.state == SYNCING:
+            self.logger.info("")
+            self.logger.info(f"✅ [{schedule.name}] First refresh detected after {elapsed} seconds")
+            self.logger.info(f"Current Display: \"{display_info}\"")
+            self.logger.info("")
+            # Custom text goes out right after the first refresh
+            schedule.refresh_count = schedule.displays_between_text + 1
+            self.emit(engine_events.SYNC_ACQUIRED, schedule, elapsed=elapsed, display=display_info)
+        else:
+            schedule.refresh_count += 1
+            self.emit(engine_events.REFRESH, schedule, number=schedule.refresh_count,
+                      total=schedule.displays_between_text,
+                      final=schedule.refresh_count > schedule.displays_between_text, display=display_info)
+            if display is not None:
+                self.logger.info(f"✅ [{schedule.name}] Display changed after {elapsed} seconds - "
+                                 f"{schedule.poll.calls} status polls")
+            if schedule.refresh_count <= schedule.displays_between_text:
+                self.logger.info(f"🔄 [{schedule.name}] BlockClock refresh {schedule.refresh_count}/"
+                                 f"{schedule.displays_between_text} - Displaying: \"{display_info}\"")
+            else:
+                self.logger.info(f"✅ [{schedule.name}] Final refresh complete - Displaying: \"{display_info}\"")
+
+        if schedule.refresh_count > schedule.displays_between_text:
+            schedule.state = ANIMATING
+            schedule.next_wake = self.animation_done_at(schedule, now)
+        else:
+            self.schedule_wait(schedule, now)
+        self.save_sync_state()
+
+    def animation_done_at(self, schedule, now):
+        """When the refresh animation will have finished on this device"""
+        refresh_at = schedule.last_refresh_at if schedule.last_refresh_at is not None else now
+        learner = self.control.refresh_learner
+        # Time the send from the learned refresh instant rather than from when we noticed it
+        if learner.confidence(schedule.key) >= self.control.prediction_confidence:
+            refresh_at = learner.refresh_time_near(schedule.key, refresh_at)
+        return max(now, refresh_at + self.control.animation_delay)
+
+    def schedule_wait(self, schedule, now):
+        """Put a device to sleep until shortly before its next refresh"""
+        prediction = self.control.refresh_learner.predict(schedule.key, now)
+
+        if prediction and prediction["confidence"] >= self.control.prediction_confidence:
+            schedule.expected_at = prediction["next_refresh"]
+            schedule.window = prediction["window"]
+            schedule.next_wake = schedule.expected_at - schedule.window
+            detail = f" (predicted, ±{schedule.window:.0f}s, confidence {prediction['confidence']:.0%})"
+        else:
+            base = schedule.last_refresh_at if schedule.last_refresh_at is not None else now
+            schedule.expected_at = base + schedule.refresh_time
+            schedule.window = None
+            schedule.next_wake = schedule.expected_at - UNLEARNED_LEAD_TIME
+            detail = ""
+
+        schedule.state = WAITING
+        sleep_time = max(0, int(schedule.next_wake - now))
+        if schedule is self.schedules[0] and sleep_time >= PROGRESS_MIN_SLEEP:
+            self.start_countdown_progress(schedule, now)
+        number = schedule.refresh_count + 1
+        self.emit(engine_events.WAITING, schedule, number=number, total=schedule.displays_between_text,
+                  wake_in=sleep_time, predicted=schedule.window is not None)
+        if number > schedule.displays_between_text:
+            self.logger.info(f"⏳ [{schedule.name}] Sleeping before final refresh check... "
+                             f"{sleep_time // 60:02d}:{sleep_time % 60:02d}{detail}")
+        else:
+            self.logger.info(f"⏳ [{schedule.name}] Sleeping before refresh #{number} of "
+                             f"{schedule.displays_between_text}... {sleep_time // 60:02d}:{sleep_time % 60:02d}{detail}")
+
+    # ---------- sync state ----------
+
+    def save_sync_state(self):
+        self.control.sync_state.save(self.schedules, self.control.refresh_learner)
+
+    def restore_sync_state(self, now):
+        """Resume devices from the saved sync state instead of waiting for their first refresh"""
+        saved = self.control.sync_state.load()
+        for schedule in self.schedules:
+            entry = saved.get(schedule.key)
+            if entry is None or entry["refresh_time"] != schedule.refresh_time:
+                continue
+
+            learner = self.control.refresh_learner
+            for refreshed_at in entry["refreshes"]:
+                learner.record(schedule.key, refreshed_at)
+
+            # Count the refreshes that happened while the rotation was down
+            missed = math.floor((now - entry["last_refresh_at"]) / schedule.refresh_time)
+            refresh_count = entry["refresh_count"] + missed
+
+            schedule.cycle_count = entry["cycle_count"]
+            schedule.last_custom_text = entry["last_custom_text"]
+            schedule.last_refresh_at = entry["last_refresh_at"] + missed * schedule.refresh_time
+            # The first poll records the current display instead of comparing against a stale one
+            schedule.last_display = None
+            schedule.resumed = True
+
+            age = int(entry["age"])
+            self.logger.info(f"⚡ [{schedule.name}] Resuming from saved sync state "
+                             f"(last refresh {age // 60:02d}:{age % 60:02d} ago)")
+            if refresh_count > schedule.displays_between_text and missed == 0:
+                # Stopped between the final refresh and its custom text, send it now
+                schedule.refresh_count = refresh_count
+                schedule.state = ANIMATING
+                schedule.next_wake = self.animation_done_at(schedule, now)
+            else:
+                # A custom text missed while down is not sent late, it goes out after the next refresh
+                schedule.refresh_count = min(refresh_count, schedule.displays_between_text)
+                self.schedule_wait(schedule, now)
+
+    # ---------- manual text ----------
+
+    def inject_text(self, manual):
+        """Show a ManualText on every device at its next safe moment, replacing a pending one"""
+        awake = [schedule for schedule in self.schedules if schedule.state != QUIET]
+        manual.waiting = {schedule.key for schedule in awake}
+        for schedule in self.schedules:
+            if schedule.state == QUIET:
+                manual.results.append({"name": schedule.name, "ip": schedule.key, "success": False,
+                                       "status_code": None, "error": "Quiet hours"})
+        for schedule in awake:
+            if schedule.manual_text is not None:
+                schedule.manual_text.drop(schedule.key, "Replaced by a newer manual text")
+            schedule.manual_text = manual
+        self.manual_pending = True
+        if not manual.waiting:
+            manual.done.set()
+        self.logger.info(f"📥 Manual text queued: \"{manual.text}\" (rotation keeps its sync)")
+
+    def manual_text_ready_at(self, schedule, now):
+        """When a device can show its manual text mid-cycle (None: wait for the next refresh)"""
+        if schedule.state == SYNCING:
+            return now
+        if schedule.state == ANIMATING:
+            # Sent in place of the custom text
+            return None
+        ready_at = now
+        if schedule.last_refresh_at is not None:
+            # Not while the refresh animation is still playing
+            ready_at = max(now, schedule.last_refresh_at + self.control.animation_delay)
+            if schedule.last_refresh_at >= schedule.manual_text.queued_monotonic:
+                # Right after the first refresh since the text was queued
+                return ready_at
+        if schedule.state != WAITING or schedule.next_wake - ready_at < MANUAL_TEXT_MIN_LEAD:
+            return None
+        return ready_at
+
+    def send_manual_text(self, now):
+        """Show pending manual text on devices that can show it now, with a timer for the next one that can"""
+        if not self.manual_pending:
+            return
+        ready = []
+        next_ready = None
+        pending = False
+        for schedule in self.schedules:
+            if schedule.manual_text is None:
+                continue
+            pending = True
+            ready_at = self.manual_text_ready_at(schedule, now)
+            if ready_at is None:
+                continue
+            if ready_at <= now:
+                ready.append(schedule)
+            elif next_ready is None or ready_at < next_ready:
+                next_ready = ready_at
+        if ready:
+            self.show_manual_text(ready)
+        # Devices that wait for a refresh are checked again when their own timers fire
+        self.manual_pending = pending
+        if next_ready is not None:
+            self.timers.schedule(MANUAL_TEXT_TIMER, next_ready)
+        else:
+            self.timers.cancel(MANUAL_TEXT_TIMER)
+
+    def show_manual_text(self, schedules):
+        """Send the pending manual text of each device in schedules"""
+        batches = {}
+        for schedule in schedules:
+            batches.setdefault(id(schedule.manual_text), (schedule.manual_text, []))[1].append(schedule)
+
+        for manual, batch in batches.values():
+            names = ", ".join(schedule.name for schedule in batch)
+            self.logger.info(f"📤 Sending manual text: \"{manual.text}\" to {names}")
+            results = self.control.send_text(manual.text, devices=[schedule.device for schedule in batch])
+            self.control.text_selector.shown(manual.text)
+            for schedule in batch:
+                # The manual text is not a refresh of the clock
+                schedule.last_custom_text = manual.text
+                schedule.manual_text = None
+            manual.delivered(results)
+        self.save_sync_state()
+
+    def send_custom_text(self, schedules):
+        """Send one new custom text to all devices that reached their boundary together"""
+        # Wait for the latest animation in the batch (at most SEND_BATCH_WINDOW)
+        deadline = max(schedule.next_wake for schedule in schedules)
+        while self.clock.monotonic() < deadline:
+            self.control.sleep(deadline - self.clock.monotonic())
+            # The sleep returns early on engine controls, don't send while paused or after a stop
+            if not self.control.should_continue():
+                return
+
+        self.logger.info("🎯 Full cycle complete!")
+
+        # A pending manual text takes the place of this cycle's custom text
+        manual = [schedule for schedule in schedules if schedule.manual_text is not None]
+        if manual:
+            self.show_manual_text(manual)
+
+        rotation = [schedule for schedule in schedules if schedule not in manual]
+        if rotation:
+            self.control.reload_config()
+            # Devices with the same active playlist share one pick, unless it picks per device
+            picks = {}
+            batches = {}
+            for schedule in rotation:
+                selector = self.control.selector_for(schedule.device)
+                if selector.per_device:
+                    text = selector.select(schedule.key)
+                else:
+                    if id(selector) not in picks:
+                        picks[id(selector)] = selector.select()
+                    text = picks[id(selector)]
+                batches.setdefault(text, []).append(schedule)
+            for text, batch in batches.items():
+                names = ", ".join(schedule.name for schedule in batch)
+                self.logger.info(f"📤 Sending new Custom Text: \"{text}\" to {names}")
+                self.control.send_text(text, devices=[schedule.device for schedule in batch])
+                for schedule in batch:
+                    schedule.last_custom_text = text
+
+        now = self.clock.monotonic()
+        for schedule in schedules:
+            schedule.refresh_count = 0
+            schedule.cycle_count += 1
+            self.schedule_wait(schedule, now)
+        self.save_sync_state()
+
+        request_count = self.control.connections.request_count()
+        self.logger.info(f"📡 Device calls since last custom text: {request_count - self.requests_at_last_send}")
+        self.requests_at_last_send = request_count
+        self.logger.info("")  # Empty line
+        self.logger.info("----------------------------------------")
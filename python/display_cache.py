@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Display Cache
+================================================
+Shared cache of what each BlockClock is currently showing. Readers ask
+for a snapshot no older than a given age; only when the cached one is too
+stale does a single request go to the device (concurrent readers of the
+same device wait for that one request instead of each sending their own).
+
+Background pollers keep snapshots fresh for readers such as the dashboard
+and stop by themselves when nobody has read the device for a while.
+Snapshots can also be mirrored to a small JSON file so the web app can
+reuse what the rotation process has just fetched. The file is rewritten
+when a device's display changes, and otherwise at most every
+SNAPSHOT_WRITE_INTERVAL seconds, not on every poll.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default maximum age (seconds) of a snapshot before the device is asked again
+DEFAULT_MAX_STALENESS = 5
+
+# Background pollers stop after this many seconds without a reader
+POLLER_IDLE_TIMEOUT = 30
+
+# While no display changes, the snapshot file is rewritten at most this often (seconds),
+# readers in other processes still find snapshots within the default staleness
+SNAPSHOT_WRITE_INTERVAL = DEFAULT_MAX_STALENESS
+
+
+class DisplayCache:
+    """Latest display snapshot per device, shared by all readers"""
+
+    def __init__(self, fetch, max_staleness=DEFAULT_MAX_STALENESS, snapshot_file=None, clock=time.time):
+        """
+        fetch: callable(device) returning the display text or "ERROR"
+        snapshot_file: optional JSON file shared with other processes
+        clock: wall-clock time source (snapshot times are epoch seconds)
+        """
+        self.fetch = fetch
+        self.clock = clock
+        self.max_staleness = max_staleness
+        self.snapshot_file = snapshot_file
+
+        self.snapshots = {}
+        self.lock = threading.Lock()
+        self.device_locks = {}
+        self.pollers = {}
+        self.last_read = {}
+        self.file_mtime = 0
+        self.file_written_at = None
+        self.fetches = 0
+        self.hits = 0
+        self.file_writes = 0
+
+    def _device_lock(self, key):
+        with self.lock:
+            return self.device_locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, key, max_age):
+        snapshot = self.snapshots.get(key)
+        if snapshot and self.clock() - snapshot["fetched_at"] <= max_age:
+            return snapshot
+        return None
+
+    def _load_file(self):
+        """Pick up snapshots another process wrote since we last looked"""
+        if not self.snapshot_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.snapshot_file)
+            if mtime == self.file_mtime:
+                return
+            with open(self.snapshot_file, "r") as f:
+                shared = json.load(f)
+            self.file_mtime = mtime
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for key, snapshot in shared.items():
+                current = self.snapshots.get(key)
+                if current is None or snapshot["fetched_at"] > current["fetched_at"]:
+                    self.snapshots[key] = snapshot
+
+    def _save_file(self):
+        """Write all snapshots atomically so readers never see a partial file"""
+        if not self.snapshot_file:
+            return
+        try:
+            with self.lock:
+                data = json.dumps(self.snapshots)
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with open(tmp_file, "w") as f:
+                f.write(data)
+            os.replace(tmp_file, self.snapshot_file)
+            self.file_mtime = os.path.getmtime(self.snapshot_file)
+            self.file_written_at = self.clock()
+            self.file_writes += 1
+        except OSError as e:
+            logger.debug(f"Could not write display snapshots: {e}")
+
+    def publish(self, device, display):
+        """Store a freshly fetched display for a device"""
+        snapshot = {
+            "display": display,
+            "ok": display != "ERROR",
+            "fetched_at": self.clock(),
+        }
+        with self.lock:
+            previous = self.snapshots.get(device["ip"])
+            self.snapshots[device["ip"]] = snapshot
+        changed = previous is None or previous["display"] != display
+        if changed or self.file_written_at is None or \
+                snapshot["fetched_at"] - self.file_written_at >= SNAPSHOT_WRITE_INTERVAL:
+            self._save_file()
+        return snapshot
+
+    def peek(self, device, max_age=None):
+        """Return the snapshot for a device if one no older than max_age exists, never fetching"""
+        key = device["ip"]
+        max_age = self.max_staleness if max_age is None else max_age
+        snapshot = self._fresh(key, max_age)
+        if snapshot is None:
+            self._load_file()
+            snapshot = self._fresh(key, max_age)
+        return snapshot
+
+    def get(self, device, max_age=None, reader=True):
+        """
+        Return the snapshot for a device no older than max_age seconds
+        (default: max_staleness), fetching from the device only if needed.
+        The snapshot dict has display, ok and fetched_at (epoch seconds).
+        reader=False is used by the background poller so it does not keep
+        itself alive.
+        """
+        key = device["ip"]
+        max_age = self.max_staleness if max_age is None else max_age
+        if reader:
+            self.last_read[key] = self.clock()
+
+        snapshot = self._fresh(key, max_age)
+        if snapshot is None:
+            self._load_file()
+            snapshot = self._fresh(key, max_age)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        # One request per device at a time, later readers reuse its result
+        with self._device_lock(key):
+            snapshot = self._fresh(key, max_age)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.fetches += 1
+            return self.publish(device, self.fetch(device))
+
+    def start_poller(self, device, interval=None):
+        """Keep this device's snapshot fresh in the background while it is being read"""
+        key = device["ip"]
+        interval = interval or self.max_staleness
+        self.last_read[key] = self.clock()
+
+        with self.lock:
+            poller = self.pollers.get(key)
+            if poller is not None and poller.is_alive():
+                return
+            poller = threading.Thread(target=self._poll, args=(device, interval), daemon=True)
+            self.pollers[key] = poller
+        poller.start()
+
+    def _poll(self, device, interval):
+        key = device["ip"]
+        while self.clock() - self.last_read.get(key, 0) < POLLER_IDLE_TIMEOUT:
+            try:
+                # Skip the request if someone else refreshed the snapshot recently
+                self.get(device, max_age=interval, reader=False)
+            except Exception as e:
+                logger.error(f"❌ Error polling display: {str(e)}")
+            time.sleep(interval)
+        with self.lock:
+            self.pollers.pop(key, None)
+
+    def stats(self):
+        """Cache hit/fetch counters"""
+        return {"hits": self.hits, "fetches": self.fetches, "pollers": len(self.pollers),
+                "file_writes": self.file_writes}
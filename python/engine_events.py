@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Engine Events
+================================================
+Typed events from the rotation to the web app, so the web app keeps
+track of the rotation without reading blockclock.log. When the rotation
+runs on the web app's engine thread, events go straight to the web app's
+subscribers. When it runs as its own process, every event is written as
+one line of JSON to a Unix stream socket the web app listens on:
+
+  {"type": "refresh", "at": 1767600000.0, "pid": 4242,
+   "device": "Office", "ip": "192.168.0.87", "number": 2, "total": 3}
+
+Event types (per-device events carry "device" and "ip"):
+
+  rotation_started  devices (name, ip) in config order
+  syncing           waiting for the first refresh of a device
+  sync_acquired     first refresh detected, the device's phase is known
+  refresh           refresh number/total of the cycle ("final" after the last)
+  waiting           sleeping until shortly before refresh number/total
+  polling           polling for refresh number/total
+  quiet_hours       no device traffic until "until" (epoch seconds)
+  send_complete     text sent, with the result of every device
+  device_down       circuit breaker opened, requests paused
+  device_up         device answers again
+
+Sending never blocks or fails the rotation: events are queued and written
+by a sender thread, which reconnects whenever the web app (re)starts. The
+thread and its connection are only created with the first event for the
+socket, a channel that never emits one costs nothing. Events a failed
+write did not get out completely are sent again on the next connection,
+the listener drops the cut off line of a closed connection, so every
+event arrives once and whole. The queue holds MAX_QUEUED_EVENTS, the
+oldest events are dropped when it is full (no web app listening for a
+long time). Dropped events are counted and logged.
+"""
+
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ROTATION_STARTED = "rotation_started"
+SYNCING = "syncing"
+SYNC_ACQUIRED = "sync_acquired"
+REFRESH = "refresh"
+WAITING = "waiting"
+POLLING = "polling"
+QUIET_HOURS = "quiet_hours"
+SEND_COMPLETE = "send_complete"
+DEVICE_DOWN = "device_down"
+DEVICE_UP = "device_up"
+
+# Events kept for the web app while it is not connected, older ones are dropped
+MAX_QUEUED_EVENTS = 1000
+
+# Longest event line read, a send_complete for hundreds of devices fits
+MAX_EVENT_SIZE = 256 * 1024
+
+# Seconds between connection attempts while no web app is listening
+RECONNECT_DELAY = 1
+
+# Seconds a write may block before the connection is given up and reopened
+SEND_TIMEOUT = 5
+
+# Seconds close() waits for queued events to be written
+FLUSH_TIMEOUT = 2
+
+# Seconds between checks of the listener threads for stop()
+RECEIVE_TIMEOUT = 1
+
+
+class EventChannel:
+    """Sends rotation events to local subscribers and, through a sender thread, to the web app's socket"""
+
+    def __init__(self, socket_path=None, clock=time.time):
+        """socket_path: Unix socket of an EventListener, None delivers to local subscribers only"""
+        self.socket_path = socket_path if hasattr(socket, "AF_UNIX") else None
+        self.clock = clock
+        self.subscribers = []
+        self.queue = deque()
+        self.sock = None
+        self.thread = None
+        self.closing = False
+        self.ready = threading.Condition()
+
+        # Counters for stats()
+        self.sent = 0
+        self.dropped = 0
+        self.connections = 0
+
+    def subscribe(self, callback):
+        """Call callback(event) for every event emitted in this process"""
+        self.subscribers.append(callback)
+
+    def emit(self, event_type, **fields):
+        event = {"type": event_type, "at": self.clock(), "pid": os.getpid(), **fields}
+        for callback in list(self.subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.debug(f"Event subscriber failed: {e}")
+        if self.socket_path:
+            self._queue(event)
+        return event
+
+    def _queue(self, event):
+        line = json.dumps(event, default=str).encode("utf-8") + b"\n"
+        with self.ready:
+            if self.closing:
+                return
+            if len(self.queue) >= MAX_QUEUED_EVENTS:
+                self.queue.popleft()
+                self._dropped(1, "the web app is not reading them")
+            self.queue.append(line)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._send_queued, name="engine-events-sender", daemon=True)
+                self.thread.start()
+            self.ready.notify()
+
+    def _dropped(self, count, reason):
+        """Count lost events, logging the first and then every MAX_QUEUED_EVENTS-th"""
+        if self.dropped % MAX_QUEUED_EVENTS == 0:
+            logger.warning(f"⚠️ Rotation events dropped ({self.dropped + count} so far), {reason}")
+        self.dropped += count
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(SEND_TIMEOUT)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _send_queued(self):
+        """Sender thread: write queued events in order, reconnecting as needed"""
+        while True:
+            with self.ready:
+                while not self.queue and not self.closing:
+                    self.ready.wait()
+                if not self.queue:
+                    break
+                batch = list(self.queue)
+                self.queue.clear()
+
+            data = memoryview(b"".join(batch))
+            written = 0
+            try:
+                if self.sock is None:
+                    self.sock = self._connect()
+                    self.connections += 1
+                while written < len(data):
+                    written += self.sock.send(data[written:])
+                self.sent += len(batch)
+            except OSError:
+                # No web app listening (yet), or it restarted: keep the events for the next connection
+                if self.sock is not None:
+                    self.sock.close()
+                    self.sock = None
+                # Only those not written completely, the listener drops a cut off line with the connection
+                complete = 0
+                for line in batch:
+                    if written < len(line):
+                        break
+                    written -= len(line)
+                    complete += 1
+                self.sent += complete
+                batch = batch[complete:]
+                with self.ready:
+                    self.queue.extendleft(reversed(batch))
+                    overflow = len(self.queue) - MAX_QUEUED_EVENTS
+                    if overflow > 0:
+                        for _ in range(overflow):
+                            self.queue.popleft()
+                        self._dropped(overflow, "no web app is listening")
+                    if self.closing:
+                        break
+                    self.ready.wait(RECONNECT_DELAY)
+
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        """Stop the sender thread after writing the queued events (waits up to timeout seconds)"""
+        with self.ready:
+            self.closing = True
+            thread = self.thread
+            self.ready.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self.ready:
+            if self.queue:
+                self._dropped(len(self.queue), "the rotation stopped before they were sent")
+                self.queue.clear()
+
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped, "queued": len(self.queue),
+                "connections": self.connections}
+
+
+class EventListener:
+    """Receives rotation events on a Unix socket and hands them to subscribers on background threads"""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.subscribers = []
+        self.sock = None
+        self.thread = None
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        # Counters for stats()
+        self.received = 0
+        self.malformed = 0
+
+    def subscribe(self, callback):
+        """Call callback(event) for every received event"""
+        self.subscribers.append(callback)
+
+    def start(self):
+        """Bind the socket and start accepting rotations. Returns False if Unix sockets are not available."""
+        if not hasattr(socket, "AF_UNIX"):
+            logger.warning("⚠️ Unix sockets are not available, rotation events are disabled")
+            return False
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        # A socket file left behind by an earlier web app would make bind() fail
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(self.socket_path)
+        self.sock.listen()
+        self.sock.settimeout(RECEIVE_TIMEOUT)
+        self.thread = threading.Thread(target=self._accept, name="engine-events", daemon=True)
+        self.thread.start()
+        return True
+
+    def _accept(self):
+        """One reader thread per connected rotation (a restarted rotation connects again)"""
+        while self.sock is not None:
+            try:
+                connection, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except (OSError, AttributeError):
+                # Closed by stop()
+                return
+            connection.settimeout(RECEIVE_TIMEOUT)
+            self.connections.add(connection)
+            threading.Thread(target=self._receive, args=(connection,), name="engine-events-reader",
+                             daemon=True).start()
+
+    def _receive(self, connection):
+        buffer = b""
+        try:
+            while self.sock is not None:
+                try:
+                    data = connection.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return
+                if not data:
+                    # The rotation closed its end, a cut off last line is dropped
+                    return
+                *lines, buffer = (buffer + data).split(b"\n")
+                if len(buffer) > MAX_EVENT_SIZE:
+                    logger.debug("Ignoring oversized rotation event")
+                    self.malformed += 1
+                    buffer = b""
+                for line in lines:
+                    self._handle(line)
+        finally:
+            self.connections.discard(connection)
+            connection.close()
+
+    def _handle(self, line):
+        try:
+            event = json.loads(line.decode("utf-8"))
+        except ValueError:
+            logger.debug("Ignoring malformed rotation event")
+            self.malformed += 1
+            return
+        # Events of two connections (a rotation restarting) are handled one at a time
+        with self.lock:
+            self.received += 1
+            for callback in list(self.subscribers):
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"❌ Error handling rotation event {event.get('type')}: {str(e)}")
+
+    def stop(self):
+        sock, self.sock = self.sock, None
+        # Closing the connections makes the rotation's next write fail, so it keeps its events
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if sock is not None:
+            sock.close()
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {"received": self.received, "malformed": self.malformed}
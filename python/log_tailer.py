@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Log Tailer
+================================================
+Follows blockclock.log without re-reading it. The tailer remembers the
+byte offset it has read up to and the file's inode, and every poll reads
+only the bytes appended since. Complete lines go to the subscribers, a
+line still being written is held back until its newline arrives.
+
+The log is started over when:
+
+  - the inode changed (the file was replaced or deleted and recreated)
+  - the file is shorter than the offset (truncated)
+  - the first bytes of the file changed (rotate_logs() copies the log to
+    archive/ and rewrites it with two header lines, which can leave it
+    longer than the offset when the log was small)
+
+Polls of an unchanged file cost one stat() and one small read.
+"""
+
+import os
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Bytes at the start of the file compared on every poll to notice a rewrite
+SIGNATURE_SIZE = 64
+
+# Largest number of bytes read in one go
+READ_CHUNK = 1024 * 1024
+
+# Seconds between polls of the background thread
+DEFAULT_INTERVAL = 1
+
+
+def tail_lines(path, count, end=None, block_size=8192):
+    """The last count complete lines before byte end (default: the end of the file), read backwards"""
+    try:
+        with open(path, "rb") as f:
+            if end is None:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+            position = end
+            data = b""
+            # One more newline than lines wanted, the first line may be cut off
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step)[:end - position] + data
+    except OSError:
+        return []
+    lines = data.split(b"\n")
+    # A file not ending in a newline has a partial last line, and the first line may be cut off
+    lines = lines[:-1]
+    if position > 0:
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-count:]]
+
+
+class LogTailer:
+    """Reads the lines appended to a log file, surviving truncation and rotation"""
+
+    def __init__(self, path, from_end=True):
+        """from_end: skip what the file holds now and only report lines written from here on"""
+        self.path = path
+        self.inode = None
+        self.offset = 0
+        self.signature = b""
+        self.partial = b""
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+
+        # Counters for stats()
+        self.bytes_read = 0
+        self.lines = 0
+        self.restarts = 0
+
+        if from_end:
+            try:
+                stat = os.stat(path)
+                with open(path, "rb") as f:
+                    self._open(stat, f)
+                    self.offset = stat.st_size
+            except OSError:
+                pass
+
+    def subscribe(self, callback):
+        """Call callback(lines) with every batch of new complete lines"""
+        self.subscribers.append(callback)
+
+    def _open(self, stat, f):
+        """Start reading a (new) file from its beginning"""
+        self.inode = (stat.st_dev, stat.st_ino)
+        self.offset = 0
+        self.partial = b""
+        self.signature = f.read(SIGNATURE_SIZE)
+        f.seek(0)
+
+    def _restarted(self, stat, f):
+        """True if the file is not the one read so far (replaced, truncated or rewritten)"""
+        if self.inode != (stat.st_dev, stat.st_ino) or stat.st_size < self.offset:
+            return True
+        if self.offset and self.signature:
+            head = f.read(len(self.signature))
+            f.seek(0)
+            return head != self.signature
+        return False
+
+    def poll(self):
+        """Read what was appended since the last poll, returns the new complete lines"""
+        with self.lock:
+            try:
+                stat = os.stat(self.path)
+                f = open(self.path, "rb")
+            except OSError:
+                # Not there (yet), it is read from its start once it exists
+                self.inode = None
+                return []
+
+            with f:
+                if self.inode is None:
+                    self._open(stat, f)
+                elif self._restarted(stat, f):
+                    self.restarts += 1
+                    self._open(stat, f)
+                elif stat.st_size == self.offset:
+                    return []
+                elif len(self.signature) < SIGNATURE_SIZE and self.offset < SIGNATURE_SIZE:
+                    # Still a tiny file, keep its signature growing with it
+                    self.signature = f.read(SIGNATURE_SIZE)
+
+                f.seek(self.offset)
+                chunks = []
+                while True:
+                    chunk = f.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                data = b"".join(chunks)
+
+            self.offset += len(data)
+            self.bytes_read += len(data)
+            *complete, self.partial = (self.partial + data).split(b"\n")
+            lines = [line.decode("utf-8", errors="replace") for line in complete]
+            self.lines += len(lines)
+
+        if lines:
+            for callback in list(self.subscribers):
+                try:
+                    callback(lines)
+                except Exception as e:
+                    logger.debug(f"Log subscriber failed: {e}")
+        return lines
+
+    def start(self, interval=DEFAULT_INTERVAL):
+        """Poll on a background thread every interval seconds"""
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, args=(interval,), name="log-tailer", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self, interval):
+        while not self.stopping.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.debug(f"Log tailer poll failed: {e}")
+
+    def stop(self):
+        self.stopping.set()
+
+    def stats(self):
+        return {"path": self.path, "offset": self.offset, "bytes_read": self.bytes_read, "lines": self.lines,
+                "restarts": self.restarts}
+
+
+class RecentLines:
+    """The last few lines of a log, kept up to date by a LogTailer"""
+
+    def __init__(self, tailer, maxlen):
+        # Up to where the tailer starts, so no line is in both
+        self.lines = deque(tail_lines(tailer.path, maxlen, end=tailer.offset), maxlen=maxlen)
+        tailer.subscribe(self.lines.extend)
+
+    def text(self):
+        return "\n".join(self.lines)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Playlists
+================================================
+Texts for certain times, e.g. weekday evenings, holidays or the event
+hours of a venue. While a playlist is active it replaces TEXT_OPTIONS
+for the clocks it applies to:
+
+  PLAYLIST_1_NAME="Weekday evenings"
+  PLAYLIST_1_WHEN="Mon-Fri 18:00-23:00"
+  PLAYLIST_1_TEXTS=("BEER" "_HODL_:2")
+  PLAYLIST_2_NAME="Christmas"
+  PLAYLIST_2_WHEN="12-24..12-26; 12-31 20:00-02:00"
+  PLAYLIST_2_TEXTS=("XMAS" "SATOSHI")
+  PLAYLIST_2_PRIORITY=10           (optional, higher wins where playlists overlap)
+  PLAYLIST_3_GROUP="Venue A"       (optional, only the clocks of this group)
+
+WHEN holds windows separated by ";", each an optional day part and an
+optional time range in local time (a range past midnight ends the next
+day). Days are weekdays (Mon-Fri, Sat,Sun), dates (2026-11-14), yearly
+dates (12-25) or ranges of dates (12-24..12-26), or "daily".
+
+The windows are expanded into concrete intervals over the next
+COMPILE_HORIZON days and swept into one table of boundaries per device
+group, holding the winning playlist between each pair of boundaries.
+Finding the active playlist is a binary search, however many rules
+overlap. When the config changes only the changed playlists are
+expanded again, and only the groups they apply to are swept again.
+"""
+
+import re
+import heapq
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime, time as day_time, timedelta
+
+from text_selection import create_selector, DEFAULT_STRATEGY
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_KEY_PATTERN = re.compile(r'^PLAYLIST_(\d+)_([A-Z_]+)$')
+
+# Days of windows expanded ahead, the index is recompiled when the horizon runs out
+COMPILE_HORIZON = 14
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+TIME_RANGE_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+DATE_PATTERN = re.compile(r'^(?:(\d{4})-)?(\d{1,2})-(\d{1,2})$')
+
+# No playlist is active between these boundaries
+NO_PLAYLIST = -1
+
+
+def parse_day_item(item):
+    """Predicate on dates for one day item (Mon, Mon-Fri, 12-25, 2026-12-24..2026-12-26)"""
+    item = item.strip().lower()
+    if item in ("", "daily", "*"):
+        return lambda day: True
+
+    if all(part[:3] in WEEKDAYS for part in item.split("-")):
+        parts = item.split("-")
+        if len(parts) > 2:
+            raise ValueError(f"Invalid weekday range \"{item}\"")
+        first, last = WEEKDAYS.index(parts[0][:3]), WEEKDAYS.index(parts[-1][:3])
+        # Fri-Mon wraps over the weekend
+        days = {(first + i) % 7 for i in range((last - first) % 7 + 1)}
+        return lambda day: day.weekday() in days
+
+    first, _, last = item.partition("..")
+    start, end = parse_date(first), parse_date(last or first)
+    if start[0] is not None and end[0] is not None:
+        start, end = date(*start), date(*end)
+        return lambda day: start <= day <= end
+    if start[0] is not None or end[0] is not None:
+        raise ValueError(f"Mixed yearly and dated range \"{item}\"")
+    start, end = start[1:], end[1:]
+    if start <= end:
+        return lambda day: start <= (day.month, day.day) <= end
+    # 12-31..01-01 wraps over the new year
+    return lambda day: (day.month, day.day) >= start or (day.month, day.day) <= end
+
+
+def parse_date(text):
+    """(year or None, month, day) of 2026-12-25 or 12-25"""
+    match = DATE_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid day \"{text}\"")
+    year, month, day = match.groups()
+    month, day = int(month), int(day)
+    # Validates month and day (29 February is fine for yearly dates)
+    date(int(year) if year else 2000, month, day)
+    return (int(year) if year else None, month, day)
+
+
+def parse_window(text):
+    """
+    One WHEN window as (day predicate, start time, duration): e.g.
+    "Mon-Fri 18:00-23:00", "12-25" or "22:00-06:00"
+    """
+    tokens = text.split()
+    start, duration = day_time(0), timedelta(days=1)
+    if tokens and TIME_RANGE_PATTERN.match(tokens[-1]):
+        h1, m1, h2, m2 = (int(part) for part in TIME_RANGE_PATTERN.match(tokens.pop()).groups())
+        if h1 > 23 or h2 > 24 or m1 > 59 or m2 > 59 or (h2 == 24 and m2):
+            raise ValueError(f"Invalid time range in \"{text}\"")
+        start = day_time(h1, m1)
+        duration = timedelta(hours=h2, minutes=m2) - timedelta(hours=h1, minutes=m1)
+        if duration <= timedelta(0):
+            duration += timedelta(days=1)
+    predicates = [parse_day_item(item) for item in " ".join(tokens).split(",")]
+    return (lambda day: any(predicate(day) for predicate in predicates)), start, duration
+
+
+def parse_windows(when):
+    """All windows of a WHEN value, separated by ";" (see parse_window)"""
+    windows = [parse_window(window) for window in when.split(";") if window.strip()]
+    if not windows:
+        raise ValueError("No WHEN windows")
+    return windows
+
+
+def window_intervals(windows, start_day, end_day):
+    """[start, end) epoch times of all windows that overlap the days from start_day to end_day"""
+    intervals = []
+    # From the day before, a window past midnight may still be open
+    day = start_day - timedelta(days=1)
+    while day <= end_day:
+        for matches, start, duration in windows:
+            if matches(day):
+                begin = datetime.combine(day, start)
+                intervals.append((begin.timestamp(), (begin + duration).timestamp()))
+        day += timedelta(days=1)
+    return intervals
+
+
+class Playlist:
+    """One PLAYLIST_<id>_* entry with its own text selector"""
+
+    def __init__(self, playlist_id, name, when, entries, group=None, priority=0, strategy=DEFAULT_STRATEGY):
+        self.id = playlist_id
+        self.name = name
+        self.when = when
+        self.entries = list(entries)
+        self.group = group
+        self.priority = priority
+        self.strategy = strategy
+        self.windows = parse_windows(when)
+        self.selector = create_selector(self.entries, strategy)
+
+    def signature(self):
+        """Everything the index and selector depend on, unchanged playlists are kept as they are"""
+        return (self.name, self.when, tuple(self.entries), self.group, self.priority, self.strategy)
+
+    def rank(self):
+        """Order between overlapping playlists: priority, then group playlists, then the higher id"""
+        return (self.priority, self.group is not None, self.id)
+
+    def intervals(self, start_day, end_day):
+        return window_intervals(self.windows, start_day, end_day)
+
+    def status(self):
+        return {"id": self.id, "name": self.name, "when": self.when, "group": self.group,
+                "priority": self.priority, "texts": self.entries}
+
+
+def read_playlists(settings):
+    """PLAYLIST_<id>_* settings as dicts like Playlist.status(), not validated, by id"""
+    fields = {}
+    for key, value in settings.items():
+        match = PLAYLIST_KEY_PATTERN.match(key)
+        if match:
+            fields.setdefault(int(match.group(1)), {})[match.group(2)] = value
+
+    playlists = {}
+    for playlist_id in sorted(fields):
+        values = fields[playlist_id]
+        playlists[playlist_id] = {
+            "id": playlist_id,
+            "name": values.get("NAME") or f"Playlist {playlist_id}",
+            "when": values.get("WHEN", ""),
+            "texts": re.findall(r'"([^"]*)"', values.get("TEXTS", "")),
+            "group": values.get("GROUP") or None,
+            "priority": values.get("PRIORITY") or 0,
+        }
+    return playlists
+
+
+def parse_playlists(settings, strategy=DEFAULT_STRATEGY):
+    """Playlists from parsed config settings (see parse_settings), by id"""
+    playlists = {}
+    for playlist_id, values in read_playlists(settings).items():
+        if not values["when"] or not values["texts"]:
+            logger.warning(f"⚠️ PLAYLIST_{playlist_id} needs WHEN and TEXTS, skipping it")
+            continue
+        try:
+            playlists[playlist_id] = Playlist(playlist_id, values["name"], values["when"], values["texts"],
+                                              group=values["group"], priority=int(values["priority"]),
+                                              strategy=strategy)
+        except ValueError as e:
+            logger.warning(f"⚠️ Invalid PLAYLIST_{playlist_id} ({str(e)}), skipping it")
+    return playlists
+
+
+def playlist_lines(playlist):
+    """Config lines for one playlist (a dict like Playlist.status())"""
+    i = playlist["id"]
+    texts = " ".join(f'"{entry}"' for entry in playlist["texts"])
+    lines = [
+        f'PLAYLIST_{i}_NAME="{playlist["name"]}"',
+        f'PLAYLIST_{i}_WHEN="{playlist["when"]}"',
+        f'PLAYLIST_{i}_TEXTS=({texts})',
+    ]
+    if playlist.get("group"):
+        lines.append(f'PLAYLIST_{i}_GROUP="{playlist["group"]}"')
+    if playlist.get("priority") not in (None, 0, "0", ""):
+        lines.append(f'PLAYLIST_{i}_PRIORITY={playlist["priority"]}')
+    return lines
+
+
+class PlaylistIndex:
+    """Active playlist per device group at any time, by binary search over compiled boundaries"""
+
+    def __init__(self, playlists=None, clock=None):
+        self.clock = clock or (lambda: datetime.now().timestamp())
+        self.playlists = {}
+        self.intervals = {}
+        # Per group (None for clocks without a group): boundaries and the winning playlist id after each
+        self.tables = {}
+        self.horizon = None
+        if playlists:
+            self.update(playlists)
+
+    def __len__(self):
+        return len(self.playlists)
+
+    def update(self, playlists):
+        """
+        Switch to a new set of playlists (by id). Unchanged playlists keep
+        their intervals and selector state, and only the groups touched by
+        a change are swept again. Returns the number of changed playlists.
+        """
+        if self.horizon is None:
+            self._set_horizon(self.clock())
+
+        changed = set()
+        count = 0
+        for playlist_id in set(self.playlists) - set(playlists):
+            changed.add(self.playlists.pop(playlist_id).group)
+            del self.intervals[playlist_id]
+            count += 1
+        for playlist_id, playlist in playlists.items():
+            current = self.playlists.get(playlist_id)
+            if current is not None:
+                if current.signature() == playlist.signature():
+                    continue
+                changed.add(current.group)
+            changed.add(playlist.group)
+            self.playlists[playlist_id] = playlist
+            self.intervals[playlist_id] = playlist.intervals(*self.horizon_days)
+            count += 1
+
+        if changed:
+            self._rebuild(changed)
+        return count
+
+    def _set_horizon(self, now):
+        today = datetime.fromtimestamp(now).date()
+        self.horizon_days = (today, today + timedelta(days=COMPILE_HORIZON))
+        self.horizon = datetime.combine(self.horizon_days[1], day_time(0)).timestamp()
+
+    def _recompile(self, now):
+        """Expand every playlist again for a new horizon"""
+        self._set_horizon(now)
+        for playlist_id, playlist in self.playlists.items():
+            self.intervals[playlist_id] = playlist.intervals(*self.horizon_days)
+        self.tables = {}
+        self._rebuild(None, every_group=True)
+
+    def _rebuild(self, changed_groups, every_group=False):
+        groups = {playlist.group for playlist in self.playlists.values()} - {None}
+        if every_group or None in changed_groups:
+            # A playlist for all clocks is part of every group's table
+            targets = groups | {None}
+        else:
+            targets = changed_groups & groups
+        for group in list(self.tables):
+            if group is not None and group not in groups:
+                del self.tables[group]
+        for group in targets:
+            self.tables[group] = self._sweep(group)
+
+    def _sweep(self, group):
+        """Boundaries and winners for one group, from all intervals that apply to it in O(n log n)"""
+        playlists = sorted((playlist for playlist in self.playlists.values()
+                            if playlist.group is None or playlist.group == group), key=Playlist.rank)
+        intervals = []
+        # Heap entries compare a plain int instead of the rank tuple, the best playlist has the lowest
+        for order, playlist in enumerate(reversed(playlists)):
+            intervals.extend((start, end, order, playlist.id) for start, end in self.intervals[playlist.id])
+        intervals.sort()
+        points = sorted({point for start, end, _, _ in intervals for point in (start, end)})
+
+        boundaries = array("d")
+        winners = array("q")
+        active = []
+        i = 0
+        for point in points:
+            while i < len(intervals) and intervals[i][0] <= point:
+                start, end, order, playlist_id = intervals[i]
+                heapq.heappush(active, (order, end, playlist_id))
+                i += 1
+            # Ended windows are dropped once they reach the top
+            while active and active[0][1] <= point:
+                heapq.heappop(active)
+            winner = active[0][2] if active else NO_PLAYLIST
+            if winners and winners[-1] == winner:
+                continue
+            boundaries.append(point)
+            winners.append(winner)
+        return boundaries, winners
+
+    def active(self, group=None, now=None):
+        """The playlist active at now (epoch seconds) for a clock of group, None if none is"""
+        if not self.playlists:
+            return None
+        now = self.clock() if now is None else now
+        if now >= self.horizon:
+            self._recompile(now)
+        boundaries, winners = self.tables.get(group) or self.tables.get(None) or (None, None)
+        if boundaries is None:
+            return None
+        i = bisect_right(boundaries, now) - 1
+        if i < 0 or winners[i] == NO_PLAYLIST:
+            return None
+        return self.playlists[winners[i]]
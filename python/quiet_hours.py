@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Quiet Hours
+================================================
+Times when nobody looks at the clocks. During quiet hours the rotation
+sends no requests at all to a clock and sleeps until the window ends,
+then picks the cycle up again from the last known refresh phase instead
+of syncing from scratch:
+
+  QUIET_HOURS="23:00-07:00"                            (all clocks)
+  GROUP_QUIET_HOURS=("Venue A=Mon-Fri 01:00-17:00")    (a group)
+  DEVICE_3_QUIET_HOURS="Sun; Mon-Sat 00:00-08:00"      (one clock)
+
+A clock uses its own quiet hours, else those of its group, else
+QUIET_HOURS. Windows are written like playlist WHEN values (see
+playlists.py), "none" switches quiet hours off for a clock or group.
+"""
+
+import re
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from playlists import parse_windows, window_intervals
+
+logger = logging.getLogger(__name__)
+
+# Days of windows expanded ahead, a window running past them is checked again when it gets there
+QUIET_LOOKAHEAD = 7
+
+# Switches off inherited quiet hours
+NO_QUIET_HOURS = "none"
+
+
+class QuietHours:
+    """The quiet windows of one QUIET_HOURS value, merged into sorted intervals"""
+
+    def __init__(self, when):
+        self.when = when
+        self.windows = parse_windows(when)
+        self.starts = []
+        self.ends = []
+        self.valid_until = None
+
+    def _expand(self, now):
+        today = datetime.fromtimestamp(now).date()
+        intervals = sorted(window_intervals(self.windows, today, today + timedelta(days=QUIET_LOOKAHEAD)))
+        starts, ends = [], []
+        for start, end in intervals:
+            # Back-to-back windows (e.g. Sat,Sun) are one quiet stretch
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts, self.ends = starts, ends
+        self.valid_until = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def window_end(self, now=None):
+        """End (epoch seconds) of the quiet window now is in, None outside quiet hours"""
+        now = datetime.now().timestamp() if now is None else now
+        if self.valid_until is None or now >= self.valid_until:
+            self._expand(now)
+        i = bisect_right(self.starts, now) - 1
+        if i >= 0 and now < self.ends[i]:
+            return self.ends[i]
+        return None
+
+
+def parse_group_quiet_hours(value):
+    """GROUP_QUIET_HOURS=("Group=WHEN" ...) as {group: WHEN}"""
+    groups = {}
+    for entry in re.findall(r'"([^"]*)"', value or ""):
+        group, separator, when = entry.partition("=")
+        if not separator or not group.strip():
+            logger.warning(f"⚠️ Invalid GROUP_QUIET_HOURS entry \"{entry}\", use \"Group=WHEN\"")
+            continue
+        groups[group.strip()] = when.strip()
+    return groups
+
+
+def format_group_quiet_hours(groups):
+    """{group: WHEN} as the GROUP_QUIET_HOURS value"""
+    return "(" + " ".join(f'"{group}={when}"' for group, when in groups.items()) + ")"
+
+
+class QuietHoursPolicy:
+    """Resolves the quiet hours of every device from the config settings"""
+
+    def __init__(self, default=None, groups=None):
+        self.default = default or None
+        self.groups = dict(groups or {})
+        self.parsed = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get("QUIET_HOURS"), parse_group_quiet_hours(settings.get("GROUP_QUIET_HOURS")))
+
+    def when_for(self, device):
+        """The WHEN value that applies to a device, None if it has no quiet hours"""
+        when = device.get("quiet_hours")
+        if not when and device.get("group"):
+            when = self.groups.get(device["group"])
+        when = when or self.default
+        if not when or when.strip().lower() == NO_QUIET_HOURS:
+            return None
+        return when
+
+    def for_device(self, device):
+        """QuietHours of a device (shared between devices with the same value), None if it has none"""
+        when = self.when_for(device)
+        if when is None:
+            return None
+        if when not in self.parsed:
+            try:
+                self.parsed[when] = QuietHours(when)
+            except ValueError as e:
+                logger.warning(f"⚠️ Invalid quiet hours \"{when}\" for {device['name']} ({str(e)}), ignoring them")
+                self.parsed[when] = None
+        return self.parsed[when]
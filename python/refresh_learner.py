@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Refresh Phase Learner
+================================================
+Learns when each BlockClock actually refreshes. Every detected refresh is
+recorded per device and a robust line fit (Theil-Sen: medians of pairwise
+slopes) over the recent observations gives the real refresh period, its
+phase and how tightly the observations agree. From that we predict the
+next refresh and how wide a polling window is needed around it.
+"""
+
+import math
+from collections import deque
+
+# Observations kept per device, enough to ride out a few missed refreshes
+MAX_OBSERVATIONS = 24
+
+# Observations needed before a prediction is trusted fully
+FULL_CONFIDENCE_SAMPLES = 4
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+class RefreshPhaseLearner:
+    """Online per-device estimate of refresh period, phase and confidence"""
+
+    def __init__(self, nominal_period, max_observations=MAX_OBSERVATIONS):
+        """nominal_period: the configured CLOCK_REFRESH_TIME in seconds"""
+        self.nominal_period = nominal_period
+        self.max_observations = max_observations
+        self.observations = {}
+        self.nominal_periods = {}
+        self.estimates = {}
+
+    def set_nominal_period(self, key, period):
+        """Use a different configured refresh time for one device"""
+        self.nominal_periods[key] = period
+        self.estimates.pop(key, None)
+
+    def record(self, key, timestamp):
+        """Record a detected refresh for a device and refit its estimate"""
+        observations = self.observations.setdefault(key, deque(maxlen=self.max_observations))
+        # Ignore duplicates of the same refresh (e.g. two detections a second apart)
+        period = self.nominal_periods.get(key, self.nominal_period)
+        if observations and timestamp - observations[-1] < period / 2:
+            return
+        observations.append(timestamp)
+        self.estimates[key] = self._fit(observations, period)
+
+    def forget(self, key):
+        """Drop everything learned about a device"""
+        self.observations.pop(key, None)
+        self.estimates.pop(key, None)
+
+    def _fit(self, observations, nominal_period):
+        """Fit timestamp = anchor + n * period over the observed refreshes"""
+        times = list(observations)
+        anchor = times[-1]
+
+        if len(times) == 1:
+            return {"anchor": anchor, "period": nominal_period, "spread": None, "samples": 1}
+
+        # Number each refresh relative to the latest one, allowing for missed refreshes
+        indices = [round((t - anchor) / nominal_period) for t in times]
+
+        # Period: median of pairwise slopes, robust against a few late detections
+        slopes = []
+        for i in range(len(times)):
+            for j in range(i + 1, len(times)):
+                if indices[j] != indices[i]:
+                    slopes.append((times[j] - times[i]) / (indices[j] - indices[i]))
+        period = _median(slopes) if slopes else nominal_period
+
+        # Phase: median intercept, then how far the observations scatter around the fit
+        anchor = _median([t - n * period for t, n in zip(times, indices)])
+        spread = _median([abs(t - (anchor + n * period)) for t, n in zip(times, indices)])
+
+        return {"anchor": anchor, "period": period, "spread": spread, "samples": len(times)}
+
+    def confidence(self, key):
+        """0..1, grows with the number of observations and shrinks with their scatter"""
+        estimate = self.estimates.get(key)
+        if not estimate or estimate["spread"] is None:
+            return 0.0
+        samples = min(1.0, (estimate["samples"] - 1) / (FULL_CONFIDENCE_SAMPLES - 1))
+        return samples / (1.0 + estimate["spread"])
+
+    def refresh_time_near(self, key, timestamp):
+        """The fitted refresh instant closest to timestamp (e.g. to a detection time)"""
+        estimate = self.estimates.get(key)
+        if not estimate:
+            return timestamp
+        n = round((timestamp - estimate["anchor"]) / estimate["period"])
+        return estimate["anchor"] + n * estimate["period"]
+
+    def predict(self, key, now):
+        """
+        Predict the next refresh after now.
+        Returns a dict with next_refresh, period, confidence and window (the
+        suggested polling half-width in seconds), or None if nothing is known.
+        """
+        estimate = self.estimates.get(key)
+        if not estimate:
+            return None
+
+        period = estimate["period"]
+        n = math.floor((now - estimate["anchor"]) / period) + 1
+        spread = estimate["spread"] if estimate["spread"] is not None else period
+
+        return {
+            "next_refresh": estimate["anchor"] + n * period,
+            "period": period,
+            "confidence": self.confidence(key),
+            # Three times the typical scatter plus the 1s detection granularity
+            "window": min(period / 4, max(2.0, 3 * spread + 1)),
+        }
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Refresh Polling
+================================================
+Adaptive poll intervals while waiting for a refresh. The clock refreshes on a
+known cadence (CLOCK_REFRESH_TIME), so there is no need to ask the device
+what it is showing every second: poll coarsely while the refresh is still
+far away, densely in a window around the expected time, and back off
+exponentially while the device is returning errors.
+"""
+
+
+class AdaptivePollSchedule:
+    """Decides how long to wait before the next /api/status poll"""
+
+    def __init__(self, expected_at=None, window=8, dense_interval=1, coarse_interval=15, max_backoff=30):
+        """
+        expected_at: monotonic time the refresh is expected, or None if unknown
+        window: seconds either side of expected_at polled every dense_interval
+        coarse_interval: longest gap between polls outside the window
+        max_backoff: longest gap between polls while the device is erroring
+        """
+        self.expected_at = expected_at
+        self.window = window
+        self.dense_interval = dense_interval
+        self.coarse_interval = coarse_interval
+        self.max_backoff = max_backoff
+
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+
+    def record(self, ok):
+        """Record the outcome of a poll"""
+        self.calls += 1
+        if ok:
+            self.consecutive_errors = 0
+        else:
+            self.errors += 1
+            self.consecutive_errors += 1
+
+    def next_interval(self, now):
+        """Seconds to sleep before the next poll"""
+        if self.consecutive_errors:
+            # Exponential backoff while the device is failing: 2, 4, 8... seconds
+            return min(self.max_backoff, self.dense_interval * 2 ** self.consecutive_errors)
+
+        if self.expected_at is None:
+            # Refresh time unknown (e.g. first sync), poll densely like before
+            return self.dense_interval
+
+        until_window = (self.expected_at - self.window) - now
+        if until_window > 0:
+            # Far ahead of the refresh: sleep until the dense window opens
+            return min(self.coarse_interval, max(self.dense_interval, until_window))
+
+        overdue = now - (self.expected_at + self.window)
+        if overdue > 0:
+            # Refresh is late: widen the interval gradually, the phase estimate was off
+            return min(self.coarse_interval, self.dense_interval + overdue / self.window)
+
+        return self.dense_interval
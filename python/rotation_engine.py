@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Rotation Engine
+================================================
+Runs the text rotation inside the web app process on a managed thread
+instead of spawning python/blockclock.py. Start, stop and pause take
+effect within milliseconds: every wait of the rotation goes through the
+engine and is interrupted as soon as a control changes. The routes read
+the live BlockClockControl and scheduler state directly instead of
+parsing the log file, and subscribe to the engine's events, which are
+delivered in this process instead of through the events socket.
+
+Commands such as a manual text go through a queue that the rotation
+thread drains on every wakeup, so they reach the running scheduler
+without a restart or a new sync.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+from blockclock import BlockClockControl, is_valid_ip
+from device_scheduler import SYNCING, ManualText
+from engine_events import EventChannel
+
+logger = logging.getLogger(__name__)
+
+STOPPED = "stopped"
+RUNNING = "running"
+PAUSED = "paused"
+
+# Seconds stop() waits for the rotation thread to finish its current step
+STOP_JOIN_TIMEOUT = 2
+
+
+class RotationEngine:
+    """A BlockClockControl rotation on a background thread with start/stop/pause"""
+
+    def __init__(self, config_file, control_class=BlockClockControl):
+        self.config_file = config_file
+        self.control_class = control_class
+
+        self.control = None
+        self.thread = None
+        # Events of every rotation this engine runs, subscribe() to follow them
+        self.events = EventChannel()
+        self.started_at = None
+        self.paused_at = None
+        self.error = None
+
+        self.stopping = False
+        self.paused = False
+        self.changed = threading.Event()
+        self.lock = threading.Lock()
+        self.commands = queue.Queue()
+
+    # ---------- controls ----------
+
+    def start(self):
+        """Start the rotation thread. Returns False if it is already running."""
+        with self.lock:
+            if self.is_running():
+                return False
+            self.stopping = False
+            self.paused = False
+            self.error = None
+            self.changed.clear()
+
+            self.control = self.control_class(self.config_file, should_continue_callback=self._should_continue,
+                                              events=self.events)
+            self.control.sleep = self._sleep
+            # The routes read this cache directly, no other process needs its snapshot file
+            self.control.display_cache.snapshot_file = None
+            self.started_at = time.time()
+            self.thread = threading.Thread(target=self._run, name="rotation-engine", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self, timeout=STOP_JOIN_TIMEOUT):
+        """Stop the rotation, waiting up to timeout seconds for the thread to exit"""
+        with self.lock:
+            thread = self.thread
+            self.stopping = True
+            self.paused = False
+            self.changed.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return thread is None or not thread.is_alive()
+
+    def pause(self):
+        """Stop all device traffic until resume(), keeping the sync state"""
+        if not self.is_running() or self.paused:
+            return False
+        self.paused = True
+        self.paused_at = self.control.clock.monotonic()
+        self.changed.set()
+        logger.info("⏸️  Rotation paused")
+        return True
+
+    def resume(self):
+        if not self.paused:
+            return False
+        self.paused = False
+        self.changed.set()
+        logger.info("▶️  Rotation resumed")
+        return True
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def show_text(self, text):
+        """
+        Queue a one-time text for the running rotation. Returns its
+        ManualText (wait() on it for the send results), or None if the
+        rotation is not running.
+        """
+        if not self.is_running():
+            return None
+        manual = ManualText(text, clock=self.control.clock)
+        self.commands.put(manual)
+        self.changed.set()
+        return manual
+
+    # ---------- rotation thread ----------
+
+    def _sleep(self, seconds):
+        """Sleep for the rotation, returning early when a control changes"""
+        if seconds > 0 and self.changed.wait(seconds):
+            self.changed.clear()
+
+    def _should_continue(self):
+        """Checked by the rotation loop on every wakeup, blocks while paused"""
+        if self.paused and not self.stopping:
+            paused_at = self.paused_at or self.control.clock.monotonic()
+            while self.paused and not self.stopping:
+                self.changed.wait()
+                self.changed.clear()
+            scheduler = self.control.scheduler if self.control else None
+            if scheduler is not None:
+                scheduler.resume(self.control.clock.monotonic() - paused_at)
+        if not self.stopping:
+            self._run_commands()
+        return not self.stopping
+
+    def _run_commands(self):
+        """Hand queued commands to the scheduler (on the rotation thread)"""
+        scheduler = self.control.scheduler if self.control else None
+        if scheduler is None:
+            return
+        while True:
+            try:
+                manual = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            scheduler.inject_text(manual)
+
+    def _run(self):
+        control = self.control
+        try:
+            if not any(is_valid_ip(device["ip"]) for device in control.devices):
+                control.logger.error("❌ No valid IP addresses configured.")
+                control.logger.error("   Use the web interface at http://localhost:5010/settings")
+                return
+            if not control.check_devices():
+                control.logger.error("❌ No devices are reachable. Please check network settings.")
+                return
+            control.run()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"❌ Error in rotation engine: {str(e)}")
+        finally:
+            control.connections.close()
+            # Nobody is left to show queued texts, or the ones already handed to devices
+            scheduler = control.scheduler
+            for schedule in scheduler.schedules if scheduler is not None else []:
+                if schedule.manual_text is not None:
+                    schedule.manual_text.cancel("Rotation stopped")
+                    schedule.manual_text = None
+            while True:
+                try:
+                    self.commands.get_nowait().cancel("Rotation stopped")
+                except queue.Empty:
+                    break
+
+    # ---------- live state ----------
+
+    def state(self):
+        """Live engine, device and sync state for the web app"""
+        if not self.is_running():
+            engine_state = STOPPED
+        elif self.paused:
+            engine_state = PAUSED
+        else:
+            engine_state = RUNNING
+
+        control = self.control
+        scheduler = control.scheduler if control else None
+        devices = scheduler.status() if scheduler else []
+        return {
+            "state": engine_state,
+            "started_at": self.started_at,
+            "error": self.error,
+            "synced": any(device["state"] != SYNCING for device in devices),
+            "devices": devices,
+            "health": control.device_health() if control else {},
+            "sends": control.send_dedup.stats() if control else {},
+        }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Rotation Simulation
+================================================
+Runs the real rotation (BlockClockControl.run()) for days of simulated
+time against in-process simulated clocks (see blockclock_simulator.py)
+and reports what every clock showed. Time is a VirtualClock: it only
+moves when the rotation sleeps, so a week of 5 minute refreshes takes
+seconds. The clocks mirror the configured devices (names, groups,
+refresh times), with random or staggered refresh phases. Playlists,
+quiet hours and text selection all run on the simulated time.
+
+The JSON report has, overall and per device:
+
+  timeline          what the clock showed after every refresh, with the
+                    custom texts (marked "custom") where they were shown
+  text_counts       how often each custom text was shown, to check the
+                    TEXT_SELECTION strategy and playlist weights
+  refresh_to_text   simulated seconds from a refresh to its custom text
+  lost_texts        texts overwritten by the refresh animation
+  calls_per_cycle   device requests per rotation cycle
+
+Usage:
+  python python/rotation_simulation.py --days 7 --output simulation.json
+  python python/rotation_simulation.py --config config/blockclock.conf --days 1 --no-timeline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime
+
+from blockclock import BlockClockControl, DISPLAY_MAX_AGE
+from blockclock_benchmark import summarize
+from blockclock_simulator import SimulatedBlockClock, SimulatedDevicePool
+from circuit_breaker import CircuitBreakerRegistry
+from display_cache import DisplayCache
+from engine_events import EventChannel
+from send_dedup import SendDeduplicator
+from sync_state import SyncStateStore
+from virtual_clock import VirtualClock
+
+# Simulated days when --days is not given
+DEFAULT_DAYS = 1
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "blockclock.conf")
+
+
+class SimulatedControl(BlockClockControl):
+    """BlockClockControl on a VirtualClock, talking to in-process simulated clocks"""
+
+    def __init__(self, config_file, clock, end_at, stagger=False, seed=None):
+        # Nothing is sent to the web app
+        super().__init__(config_file, clock=clock, events=EventChannel(None, clock=clock.time))
+        self.end_at = end_at
+        self.should_continue = lambda: self.clock.monotonic() < self.end_at
+        rng = random.Random(seed)
+
+        self.simulated_clocks = []
+        for i, device in enumerate(self.devices):
+            period = self.refresh_time_for(device)
+            if stagger:
+                phase = i * period / max(1, len(self.devices))
+            else:
+                phase = rng.uniform(0, period)
+            self.simulated_clocks.append(SimulatedBlockClock(device["name"], None, period=period,
+                                                             phase=phase, seed=rng.random()))
+
+        # Nothing is read from or written to the runtime files of a real rotation
+        clocks = {device["ip"]: sim for device, sim in zip(self.devices, self.simulated_clocks)}
+        breakers = CircuitBreakerRegistry(clock=clock.monotonic, wall_clock=clock.time,
+                                          on_transition=self.on_breaker_transition)
+        self.connections = SimulatedDevicePool(clocks, clock, breakers=breakers)
+        self.display_cache = DisplayCache(self.fetch_display, max_staleness=DISPLAY_MAX_AGE, clock=clock.time)
+        self.send_dedup = SendDeduplicator(self.display_cache, clock=clock.monotonic)
+        self.sync_state = SyncStateStore(None, clock=clock)
+
+    def check_devices(self, devices=None):
+        """Every simulated clock answers"""
+        return bool(self.devices if devices is None else devices)
+
+
+def device_timeline(sim, start, end):
+    """What a simulated clock showed after each refresh between start and end (epoch seconds)"""
+    custom = {}
+    for shown in sim.shown_texts:
+        custom[sim.refresh_index(shown["at"])] = shown
+    timeline = []
+    for index in range(sim.refresh_index(start), sim.refresh_index(end) + 1):
+        at = index * sim.period + sim.phase
+        if at >= start:
+            timeline.append({"at": datetime.fromtimestamp(at).isoformat(timespec="seconds"),
+                             "display": sim.screens[index % len(sim.screens)]})
+        if index in custom:
+            shown = custom[index]
+            timeline.append({"at": datetime.fromtimestamp(shown["at"]).isoformat(timespec="seconds"),
+                             "display": shown["text"], "custom": True})
+    return timeline
+
+
+def text_counts(texts):
+    """{text: {"count", "share"}}, most shown first"""
+    counts = Counter(texts)
+    total = max(1, len(texts))
+    return {text: {"count": count, "share": round(count / total, 4)} for text, count in counts.most_common()}
+
+
+def run_simulation(config_file, days, stagger=False, seed=None, start=None, timeline=True):
+    """Run the rotation for days of simulated time and return the report"""
+    clock = VirtualClock(start)
+    control = SimulatedControl(config_file, clock, days * 86400, stagger=stagger, seed=seed)
+    started_at = clock.time()
+
+    wall_started = time.monotonic()
+    control.run()
+    runtime = time.monotonic() - wall_started
+
+    ended_at = clock.time()
+    cycles = {schedule.key: schedule.cycle_count for schedule in control.scheduler.schedules}
+    devices = []
+    for device, sim in zip(control.devices, control.simulated_clocks):
+        texts = [shown["text"] for shown in sim.shown_texts]
+        report = {
+            "name": device["name"],
+            "ip": device["ip"],
+            "group": device.get("group"),
+            "period": sim.period,
+            "phase": round(sim.phase, 2),
+            "cycles": cycles.get(device["ip"], 0),
+            "custom_texts": len(texts),
+            "lost_texts": sim.lost_texts,
+            "status_calls": sim.status_calls,
+            "text_calls": sim.text_calls,
+            "calls_per_cycle": round((sim.status_calls + sim.text_calls) / max(1, cycles.get(device["ip"], 0)), 2),
+            "refresh_to_text": summarize([shown["after_refresh"] for shown in sim.shown_texts]),
+            "text_counts": text_counts(texts),
+        }
+        if timeline:
+            report["timeline"] = device_timeline(sim, started_at, ended_at)
+        devices.append(report)
+
+    all_texts = [shown["text"] for sim in control.simulated_clocks for shown in sim.shown_texts]
+    total_cycles = sum(cycles.values())
+    status_calls = sum(sim.status_calls for sim in control.simulated_clocks)
+    text_calls = sum(sim.text_calls for sim in control.simulated_clocks)
+    return {
+        "start": datetime.fromtimestamp(started_at).isoformat(timespec="seconds"),
+        "end": datetime.fromtimestamp(ended_at).isoformat(timespec="seconds"),
+        "simulated_days": days,
+        "runtime": round(runtime, 2),
+        "sleep_calls": clock.sleeps,
+        "devices": len(devices),
+        "completed_cycles": total_cycles,
+        "custom_texts": len(all_texts),
+        "lost_texts": sum(sim.lost_texts for sim in control.simulated_clocks),
+        "status_calls": status_calls,
+        "text_calls": text_calls,
+        "calls_per_cycle": round((status_calls + text_calls) / max(1, total_cycles), 2),
+        "refresh_to_text": summarize([shown["after_refresh"] for sim in control.simulated_clocks
+                                      for shown in sim.shown_texts]),
+        "text_counts": text_counts(all_texts),
+        "per_device": devices,
+    }
+
+
+def parse_start(value):
+    """--start as epoch seconds, from an ISO date or date and time"""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate days of the rotation against simulated BlockClocks")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="config file with the devices and texts")
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS, help="simulated days to run")
+    parser.add_argument("--start", type=parse_start, help="simulated start time, e.g. 2026-01-05T08:00 (default now)")
+    parser.add_argument("--stagger", action="store_true", help="spread the refresh phases instead of random ones")
+    parser.add_argument("--seed", type=int, help="seed for the refresh phases")
+    parser.add_argument("--no-timeline", action="store_true", help="leave the per-refresh timelines out")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="show the rotation log")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Keep the simulation out of the rotation log
+        logging.disable(logging.INFO)
+
+    print(f"⏱️  Simulating {args.days:g} day(s) of rotation...", file=sys.stderr)
+    results = run_simulation(args.config, args.days, stagger=args.stagger, seed=args.seed,
+                             start=args.start, timeline=not args.no_timeline)
+    print(f"✅ {results['completed_cycles']} cycles on {results['devices']} device(s) in {results['runtime']}s",
+          file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
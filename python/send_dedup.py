@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Idempotent Sends
+================================================
+Skips /api/show/text requests that would not change anything: the
+device's cached display already shows the text, or the same text was
+sent to the device moments ago (a retried or repeated send). Skipped
+sends are counted per reason.
+"""
+
+import time
+import threading
+
+# Seconds a successful send is remembered per device
+SEND_RECORD_TTL = 10
+
+# Only trust cached displays this recent (seconds) when deciding to skip
+DISPLAY_CHECK_MAX_AGE = 2
+
+ALREADY_SHOWING = "already_showing"
+RECENTLY_SENT = "recently_sent"
+
+
+class SendDeduplicator:
+    """Short-lived per-device record of sent texts, checked before every send"""
+
+    def __init__(self, display_cache=None, ttl=SEND_RECORD_TTL, display_max_age=DISPLAY_CHECK_MAX_AGE,
+                 clock=time.monotonic):
+        self.display_cache = display_cache
+        self.clock = clock
+        self.ttl = ttl
+        self.display_max_age = display_max_age
+        self.recent = {}
+        self.lock = threading.Lock()
+
+        # Counters reported through stats()
+        self.sent = 0
+        self.skipped = {ALREADY_SHOWING: 0, RECENTLY_SENT: 0}
+
+    def skip_reason(self, device, text):
+        """Why sending text to device is redundant, or None if it should be sent"""
+        with self.lock:
+            record = self.recent.get(device["ip"])
+        if record is not None and record[0] == text and self.clock() - record[1] < self.ttl:
+            return RECENTLY_SENT
+
+        if self.display_cache is not None:
+            snapshot = self.display_cache.peek(device, self.display_max_age)
+            if snapshot is not None and snapshot["ok"] and snapshot["display"] == text:
+                return ALREADY_SHOWING
+        return None
+
+    def partition(self, devices, text):
+        """
+        Split devices into those that need the text and result dicts for
+        the skipped ones (success True, with the skip reason)
+        """
+        to_send = []
+        skipped = []
+        for device in devices:
+            reason = self.skip_reason(device, text)
+            if reason is None:
+                to_send.append(device)
+                continue
+            with self.lock:
+                self.skipped[reason] += 1
+            skipped.append({
+                "name": device.get("name", device["ip"]),
+                "ip": device["ip"],
+                "success": True,
+                "status_code": None,
+                "error": None,
+                "skipped": reason,
+                "latency": 0.0,
+                "completed_after": 0.0,
+            })
+        return to_send, skipped
+
+    def record(self, results, text):
+        """Remember the successful sends among results"""
+        now = self.clock()
+        with self.lock:
+            for result in results:
+                if result["success"] and not result.get("skipped"):
+                    self.sent += 1
+                    self.recent[result["ip"]] = (text, now)
+            # Drop expired records so the table stays as small as the fleet
+            for ip in [ip for ip, (_, sent_at) in self.recent.items() if now - sent_at >= self.ttl]:
+                del self.recent[ip]
+
+    def stats(self):
+        with self.lock:
+            return {"sent": self.sent, "skipped": dict(self.skipped), "skipped_total": sum(self.skipped.values())}
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Send Shaping
+================================================
+Sends the same request to many devices without one burst across the
+whole LAN. Devices are sent to group by group in priority order, each
+group starting a fixed spacing after the previous one, with a cap on the
+number of requests in flight at any moment. Groups overlap rather than
+wait for each other, so a large fleet is still not sent to one by one.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Requests in flight at the same time across all groups
+MAX_IN_FLIGHT = 4
+
+# Seconds between the start of one group and the next
+GROUP_SPACING = 0.25
+
+# Group of devices without DEVICE_<id>_GROUP
+DEFAULT_GROUP = "default"
+
+
+def device_group(device):
+    return device.get("group") or DEFAULT_GROUP
+
+
+class SendPolicy:
+    """Max in-flight requests, spacing between groups and group priority order"""
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, group_spacing=GROUP_SPACING, priorities=None):
+        """priorities: group names sent first, in this order"""
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.group_spacing = max(0.0, float(group_spacing))
+        self.priorities = list(priorities or [])
+
+    def order_groups(self, devices):
+        """
+        Split devices into (group, devices) pairs: prioritized groups first,
+        other groups by name, devices without a group last
+        """
+        groups = {}
+        for device in devices:
+            groups.setdefault(device_group(device), []).append(device)
+
+        rank = {group: i for i, group in enumerate(self.priorities)}
+
+        def sort_key(group):
+            if group in rank:
+                return (0, rank[group], "")
+            if group == DEFAULT_GROUP:
+                return (2, 0, "")
+            return (1, 0, group.lower())
+
+        return [(group, groups[group]) for group in sorted(groups, key=sort_key)]
+
+    def fan_out(self, pool, devices, path, timeout=None, sleep=time.sleep, clock=time.monotonic):
+        """
+        Send a GET request for path to all devices through pool, shaped by
+        this policy. Returns (results, groups): one result dict per device
+        (see DevicePool.timed_get, plus its group) in completion order, and
+        one summary per group with its start and completion times in
+        seconds since dispatch.
+
+        sleep and clock time the group spacing, e.g. the rotation's
+        interruptible sleep and its (possibly virtual) monotonic clock. A
+        sleep that returns early starts the next group right away.
+        """
+        if not devices:
+            return [], []
+
+        ordered = self.order_groups(devices)
+        start_time = clock()
+        lock = threading.Lock()
+        summaries = {}
+        for i, (group, members) in enumerate(ordered):
+            summaries[group] = {
+                "group": group,
+                "devices": len(members),
+                "succeeded": 0,
+                "started_after": None,
+                "completed_after": None,
+                "scheduled_after": i * self.group_spacing,
+            }
+
+        def send(group, device):
+            with lock:
+                if summaries[group]["started_after"] is None:
+                    summaries[group]["started_after"] = clock() - start_time
+            result = pool.timed_get(device, path, start_time, timeout=timeout)
+            # On the policy's clock, the pool always times on the real one
+            result["completed_after"] = clock() - start_time
+            result["group"] = group
+            with lock:
+                summary = summaries[group]
+                summary["succeeded"] += 1 if result["success"] else 0
+                summary["completed_after"] = max(summary["completed_after"] or 0, result["completed_after"])
+            return result
+
+        workers = min(self.max_in_flight, len(devices))
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            # The queue is first in, first out, so groups go out in priority order
+            for i, (group, members) in enumerate(ordered):
+                delay = start_time + i * self.group_spacing - clock()
+                if delay > 0:
+                    sleep(delay)
+                futures.extend(executor.submit(send, group, device) for device in members)
+            for future in as_completed(futures):
+                results.append(future.result())
+
+        groups = [summaries[group] for group, _ in ordered]
+        for summary in groups:
+            for key in ("scheduled_after", "started_after", "completed_after"):
+                if summary[key] is not None:
+                    summary[key] = round(summary[key], 3)
+        return results, groups
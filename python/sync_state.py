@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Sync State
+================================================
+Keeps what the rotation knows about every clock's refresh phase in a
+small state file, so a restart picks up the running cycle instead of
+waiting for the first refresh again. The file is rewritten on every
+scheduler transition (refresh detected, text sent, resync) and holds per
+device:
+
+  last_refresh_at    last detected refresh
+  refreshes          recent refresh times, to restore the phase learner
+  refresh_time, displays_between_text
+  refresh_count      refreshes since the last custom text (cycle position)
+  cycle_count, last_custom_text
+
+Times are monotonic, stored as seconds relative to an anchor: the
+clock's monotonic and wall-clock time read together when the file was
+written. On load they are placed on the new process's monotonic clock
+through the anchor's wall-clock time. An entry is only used if the
+device's refresh time is unchanged and its last refresh is at most one
+full rotation cycle old (refresh time x (displays between texts + 1)),
+the refresh phase of a clock drifts.
+"""
+
+import os
+import json
+import logging
+
+from virtual_clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+# Entries are trusted for this many rotation cycles after their last refresh
+SNAPSHOT_MAX_CYCLES = 1
+
+STATE_VERSION = 2
+
+
+def max_entry_age(refresh_time, displays_between_text):
+    """Seconds after its last refresh that a device's saved state is still used"""
+    return SNAPSHOT_MAX_CYCLES * refresh_time * (displays_between_text + 1)
+
+
+class SyncStateStore:
+    """Reads and writes the per-device sync state file"""
+
+    def __init__(self, state_file, max_age=None, clock=None):
+        """
+        state_file: JSON file path, None disables saving and restoring.
+        max_age: fixed age limit in seconds instead of one rotation cycle per device.
+        """
+        self.state_file = state_file
+        self.max_age = max_age
+        self.clock = clock or SystemClock()
+
+    def save(self, schedules, learner):
+        """Write the sync state of every synchronized device atomically"""
+        if not self.state_file:
+            return
+        anchor = {"wall": self.clock.time(), "monotonic": self.clock.monotonic()}
+        devices = {}
+        for schedule in schedules:
+            if schedule.last_refresh_at is None:
+                # Still syncing, nothing worth keeping
+                continue
+            devices[schedule.key] = {
+                "name": schedule.name,
+                "refresh_time": schedule.refresh_time,
+                "displays_between_text": schedule.displays_between_text,
+                "last_refresh_at": schedule.last_refresh_at - anchor["monotonic"],
+                "refreshes": [t - anchor["monotonic"] for t in learner.observations.get(schedule.key, ())],
+                "refresh_count": schedule.refresh_count,
+                "cycle_count": schedule.cycle_count,
+                "last_custom_text": schedule.last_custom_text,
+            }
+        try:
+            data = json.dumps({"version": STATE_VERSION, "anchor": anchor, "devices": devices})
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, "w") as f:
+                f.write(data)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.debug(f"Could not write sync state: {e}")
+
+    def load(self):
+        """
+        Still valid entries by device IP, with times converted to
+        clock.monotonic() values. Empty if there is no usable state file.
+        """
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+            return {}
+
+        try:
+            # Seconds since the anchor, and the anchor on this process's monotonic clock
+            since_anchor = self.clock.time() - float(state["anchor"]["wall"])
+            anchor = self.clock.monotonic() - since_anchor
+        except (KeyError, TypeError, ValueError):
+            return {}
+
+        entries = {}
+        for ip, entry in state.get("devices", {}).items():
+            try:
+                age = since_anchor - entry["last_refresh_at"]
+                max_age = self.max_age
+                if max_age is None:
+                    max_age = max_entry_age(entry["refresh_time"], entry["displays_between_text"])
+                if not 0 <= age <= max_age:
+                    continue
+                entries[ip] = {
+                    "refresh_time": entry["refresh_time"],
+                    "last_refresh_at": anchor + entry["last_refresh_at"],
+                    "refreshes": [anchor + t for t in entry.get("refreshes", [])],
+                    "refresh_count": int(entry.get("refresh_count", 0)),
+                    "cycle_count": int(entry.get("cycle_count", 0)),
+                    "last_custom_text": entry.get("last_custom_text"),
+                    "age": age,
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+        return entries
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Text Catalog
+================================================
+A large list of custom texts in an external file, one text per line
+("TEXT" or "TEXT:weight", blank lines and # comments are skipped):
+
+  TEXT_CATALOG="catalogs/bitcoin.txt"    (relative to the config file)
+
+The file is memory-mapped and only an index of line start offsets is
+kept in memory (4 or 8 bytes per line in a flat array), so a catalog of
+millions of texts does not become millions of Python objects. A text is
+decoded only when it is picked or shown on a settings page. The index is
+cached next to the catalog (<file>.idx) and rebuilt when the file
+changes.
+"""
+
+import os
+import mmap
+import logging
+from array import array
+from collections.abc import Sequence
+
+from text_selection import parse_text_option
+
+logger = logging.getLogger(__name__)
+
+# Texts returned per page at most
+MAX_PAGE_SIZE = 500
+
+INDEX_SUFFIX = ".idx"
+
+
+class TextCatalog(Sequence):
+    """Read-only, line-indexed view of a catalog file, catalog[i] is the i-th text"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        stat = os.fstat(self.file.fileno())
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        # mmap cannot map an empty file
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        # Offsets fit in 4 bytes for files under 4 GB
+        self.typecode = "I" if self.size < 2 ** 32 and array("I").itemsize == 4 else "Q"
+        self.offsets = self._load_index() or self._build_index()
+
+    # ---------- line index ----------
+
+    def _build_index(self):
+        """Offsets of all lines that hold a text"""
+        offsets = array(self.typecode)
+        data = self.map
+        pos = 0
+        end = self.size
+        while pos < end:
+            newline = data.find(b"\n", pos)
+            if newline == -1:
+                newline = end
+            first = data[pos:pos + 1]
+            if first not in (b"#", b"\n", b"\r") and (first not in (b" ", b"\t") or data[pos:newline].strip()):
+                offsets.append(pos)
+            pos = newline + 1
+        self._save_index(offsets)
+        return offsets
+
+    def _index_header(self):
+        return f"{self.size} {self.mtime!r} {self.typecode}\n".encode()
+
+    def _load_index(self):
+        """The cached index, if it belongs to this version of the file"""
+        try:
+            with open(self.path + INDEX_SUFFIX, "rb") as f:
+                if f.readline() != self._index_header():
+                    return None
+                offsets = array(self.typecode)
+                offsets.frombytes(f.read())
+                return offsets
+        except (OSError, ValueError):
+            return None
+
+    def _save_index(self, offsets):
+        try:
+            tmp_file = f"{self.path}{INDEX_SUFFIX}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(self._index_header())
+                offsets.tofile(f)
+            os.replace(tmp_file, self.path + INDEX_SUFFIX)
+        except OSError as e:
+            # A read-only catalog directory only costs a rebuild on the next start
+            logger.debug(f"Could not write catalog index: {e}")
+
+    def changed(self):
+        """True if the file was modified since it was indexed"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return stat.st_size != self.size or stat.st_mtime != self.mtime
+
+    # ---------- reading ----------
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def entry(self, i):
+        """(text, weight) of the i-th text"""
+        start = self.offsets[i]
+        end = self.map.find(b"\n", start)
+        if end == -1:
+            end = self.size
+        line = self.map[start:end].decode("utf-8", "replace").strip()
+        return parse_text_option(line)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.entry(j)[0] for j in range(*i.indices(len(self)))]
+        return self.entry(i)[0]
+
+    def weights(self):
+        """Weights of all texts as a flat array (reads the whole file once)"""
+        return array("d", (self.entry(i)[1] for i in range(len(self))))
+
+    def page(self, offset=0, limit=50):
+        """A page of (text, weight) entries for the settings UI"""
+        offset = max(0, offset)
+        limit = max(0, min(limit, MAX_PAGE_SIZE))
+        return [self.entry(i) for i in range(offset, min(offset + limit, len(self)))]
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def resolve_catalog_path(path, config_file):
+    """Catalog paths in the config are relative to the config file's directory"""
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), path)
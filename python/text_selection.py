@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Text Selection
+================================================
+Picks the next custom text. The strategy is set with TEXT_SELECTION and
+texts can carry a weight after a colon in TEXT_OPTIONS:
+
+  TEXT_SELECTION="weighted"
+  TEXT_OPTIONS=("_HODL_:3" "SATOSHI" "BITCOIN:0.5")
+
+A number after a colon is only a weight if the text before it is not a
+number itself, so texts like "4:20" or "12:30" stay literal. Such a text
+is weighted by adding the weight after another colon ("4:20:3").
+
+Strategies (every pick is O(1) and the tables are flat arrays, so
+catalogs of millions of texts are fine, see text_catalog.py):
+
+  shuffle        each text once per round in random order, never the
+                 same text twice in a row (default)
+  weighted       random by weight, sampled from a precomputed alias table
+  least_recent   the text shown longest ago, manual texts included
+  round_robin    every device walks the list in order on its own
+  random         uniform random pick, may repeat
+"""
+
+import re
+import random
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+SHUFFLE = "shuffle"
+WEIGHTED = "weighted"
+LEAST_RECENT = "least_recent"
+ROUND_ROBIN = "round_robin"
+RANDOM = "random"
+
+DEFAULT_STRATEGY = SHUFFLE
+
+# A weight suffix, e.g. 3, 0.5 or .25 (negative ones are warned about and read as 0)
+WEIGHT_PATTERN = re.compile(r"-?(\d+(\.\d*)?|\.\d+)")
+
+# Texts that are numbers (times, prices), a colon in them is not a weight
+NUMERIC_TEXT_PATTERN = re.compile(r"[\d.,$]*")
+
+
+def parse_text_option(entry):
+    """Split a TEXT_OPTIONS entry like "HODL:3" into (text, weight), "4:20" stays one text"""
+    text, separator, weight = entry.rpartition(":")
+    if not separator or not text or not WEIGHT_PATTERN.fullmatch(weight) or NUMERIC_TEXT_PATTERN.fullmatch(text):
+        return entry, 1.0
+    weight = float(weight)
+    if weight < 0:
+        logger.warning(f"⚠️ Negative weight for text option \"{text}\", using 0")
+        weight = 0.0
+    return text, weight
+
+
+def index_array(n):
+    """array of 0..n-1 with the smallest item size that fits"""
+    typecode = "I" if n < 2 ** 32 and array("I").itemsize == 4 else "Q"
+    return array(typecode, range(n))
+
+
+def format_text_option(text, weight=1.0):
+    """TEXT_OPTIONS entry for a text, with its weight unless it is the default"""
+    # A text that would read as weighted (e.g. "HODL:3") keeps its weight so it stays literal
+    if weight == 1 and parse_text_option(text) == (text, 1.0):
+        return text
+    return f"{text}:{weight:g}"
+
+
+class TextSelector:
+    """Base class, picks uniformly at random"""
+
+    # Picks are made per device (select() is called with each device key)
+    per_device = False
+
+    def __init__(self, texts, weights=None, rng=None):
+        """texts: a list or any sequence (e.g. a TextCatalog), it is not copied"""
+        if not len(texts):
+            raise ValueError("No text options to select from")
+        self.texts = texts
+        self.rng = rng or random.Random()
+
+    def select(self, device_key=None):
+        return self.texts[self.rng.randrange(len(self.texts))]
+
+    def shown(self, text):
+        """Called for texts shown outside the selector (e.g. a manual text)"""
+
+
+class ShuffleBag(TextSelector):
+    """Every text once per round, drawn by an incremental Fisher-Yates shuffle"""
+
+    def __init__(self, texts, weights=None, rng=None):
+        super().__init__(texts, weights, rng)
+        self.order = index_array(len(self.texts))
+        self.remaining = len(self.order)
+        self.last = None
+
+    def select(self, device_key=None):
+        if self.remaining == 0:
+            # New round, the order left from the last one is as good as a fresh shuffle
+            self.remaining = len(self.order)
+        j = self.rng.randrange(self.remaining)
+        if self.order[j] == self.last and self.remaining > 1:
+            # Only possible on the first draw of a round, pick any other text instead
+            j = (j + 1 + self.rng.randrange(self.remaining - 1)) % self.remaining
+        last = self.remaining - 1
+        self.order[j], self.order[last] = self.order[last], self.order[j]
+        self.remaining = last
+        self.last = self.order[last]
+        return self.texts[self.last]
+
+
+class AliasTable(TextSelector):
+    """Weighted picks from a Vose alias table, built once in O(n)"""
+
+    def __init__(self, texts, weights=None, rng=None):
+        super().__init__(texts, weights, rng)
+        if weights is None:
+            weights = array("d", [1.0]) * len(texts)
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("Text option weights must not all be 0")
+
+        n = len(weights)
+        scaled = array("d", (weight * n / total for weight in weights))
+        self.probability = array("d", [0.0]) * n
+        self.alias = index_array(n)
+        # Work stacks as flat arrays too, not lists of millions of ints
+        small = array(self.alias.typecode, (i for i, p in enumerate(scaled) if p < 1))
+        large = array(self.alias.typecode, (i for i, p in enumerate(scaled) if p >= 1))
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # Whatever is left is 1 up to rounding
+        for i in small + large:
+            self.probability[i] = 1.0
+        del scaled, small, large
+
+    def select(self, device_key=None):
+        i = self.rng.randrange(len(self.probability))
+        if self.rng.random() >= self.probability[i]:
+            i = self.alias[i]
+        return self.texts[i]
+
+
+class LeastRecentlyShown(TextSelector):
+    """
+    The text shown longest ago: texts come up in a fixed shuffled cycle,
+    and a text shown in between (a manual text) is skipped on its next
+    turn so it goes to the back of the line
+    """
+
+    def __init__(self, texts, weights=None, rng=None):
+        super().__init__(texts, weights, rng)
+        self.order = index_array(len(self.texts))
+        self.rng.shuffle(self.order)
+        self.position = 0
+        self.picks = 0
+        # Texts shown outside the cycle, with the pick count at that moment
+        self.shown_at = {}
+
+    def select(self, device_key=None):
+        for _ in range(len(self.order)):
+            text = self.texts[self.order[self.position]]
+            self.position = (self.position + 1) % len(self.order)
+            shown_at = self.shown_at.pop(text, None)
+            # Each shown() costs at most one skip, so picks stay O(1) amortized
+            if shown_at is None or self.picks - shown_at >= len(self.order):
+                break
+        self.picks += 1
+        return text
+
+    def shown(self, text):
+        self.shown_at[text] = self.picks
+
+
+class RoundRobin(TextSelector):
+    """Every device walks the list in order, starting at a different position"""
+
+    per_device = True
+
+    def __init__(self, texts, weights=None, rng=None):
+        super().__init__(texts, weights, rng)
+        self.positions = {}
+
+    def select(self, device_key=None):
+        position = self.positions.get(device_key)
+        if position is None:
+            # Start every device one text further so neighbouring clocks differ
+            position = len(self.positions) % len(self.texts)
+        self.positions[device_key] = (position + 1) % len(self.texts)
+        return self.texts[position]
+
+
+SELECTORS = {
+    SHUFFLE: ShuffleBag,
+    WEIGHTED: AliasTable,
+    LEAST_RECENT: LeastRecentlyShown,
+    ROUND_ROBIN: RoundRobin,
+    RANDOM: TextSelector,
+}
+
+
+def selector_class(strategy):
+    if strategy not in SELECTORS:
+        logger.warning(f"⚠️ Unknown TEXT_SELECTION \"{strategy}\", using {DEFAULT_STRATEGY}")
+        return SELECTORS[DEFAULT_STRATEGY]
+    return SELECTORS[strategy]
+
+
+def create_selector(entries, strategy=DEFAULT_STRATEGY, rng=None):
+    """Build the selector for TEXT_OPTIONS entries (see parse_text_option)"""
+    options = [parse_text_option(entry) for entry in entries]
+    cls = selector_class(strategy)
+    if cls is not AliasTable:
+        # Weight 0 switches a text off for the other strategies too
+        options = [option for option in options if option[1] > 0] or options
+    texts = [text for text, _ in options]
+    weights = [weight for _, weight in options]
+    return cls(texts, weights, rng)
+
+
+def create_catalog_selector(catalog, strategy=DEFAULT_STRATEGY, rng=None):
+    """Build the selector for a TextCatalog, only weighted selection reads the weights"""
+    cls = selector_class(strategy)
+    weights = catalog.weights() if cls is AliasTable else None
+    return cls(catalog, weights, rng)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Timer Queue
+================================================
+One heap of pending timers on the monotonic clock, shared by everything
+the rotation waits for: the next poll or send of every device, the
+periodic device check and progress log ticks. Each timer has a key
+(e.g. a device IP) and at most one deadline; scheduling a key again
+moves its timer and cancel() drops it. The rotation loop sleeps exactly
+until the earliest deadline, so an idle rotation wakes only when
+something is due, and deadlines are absolute so long runs do not drift.
+
+Cancelled and moved timers are left in the heap and skipped when they
+come up, the heap is rebuilt once they make up most of it.
+"""
+
+import time
+import heapq
+import itertools
+
+# Rebuild the heap when it holds this many times more entries than live timers
+COMPACT_RATIO = 2
+
+
+class TimerQueue:
+    """Keyed timers ordered by monotonic deadline"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def schedule(self, key, deadline):
+        """Set the timer for key to deadline (monotonic seconds), replacing an earlier one"""
+        self.cancel(key)
+        # The counter keeps equal deadlines in scheduling order and never compares keys
+        entry = [deadline, next(self.counter), key, True]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > COMPACT_RATIO * len(self.entries) + 16:
+            self._compact()
+
+    def schedule_in(self, key, delay):
+        self.schedule(key, self.clock() + delay)
+
+    def cancel(self, key):
+        """Drop the timer for key, returns True if there was one"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        return True
+
+    def deadline(self, key):
+        """Deadline of the timer for key, None if it has none"""
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def next_deadline(self):
+        """Earliest pending deadline, None if no timers are pending"""
+        while self.heap and not self.heap[0][3]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def time_until_next(self, now=None):
+        """Seconds until the earliest deadline (0 if one is due, None if none are pending)"""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        now = self.clock() if now is None else now
+        return max(0.0, deadline - now)
+
+    def pop_due(self, now=None):
+        """Remove and return the keys of all timers due at now, earliest first"""
+        now = self.clock() if now is None else now
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, key, live = heapq.heappop(self.heap)
+            if live:
+                del self.entries[key]
+                due.append(key)
+        return due
+
+    def _compact(self):
+        self.heap = [entry for entry in self.heap if entry[3]]
+        heapq.heapify(self.heap)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+BlockClock Clocks
+================================================
+Every timing call of the rotation (wall-clock time, monotonic time and
+sleeping) goes through a clock object, so the same scheduling code runs
+in real time or in simulated time:
+
+  SystemClock    the real clocks and time.sleep (the default)
+  VirtualClock   time only moves when the rotation sleeps, so days of
+                 rotation cycles run in seconds (see rotation_simulation.py)
+"""
+
+import time
+
+
+class SystemClock:
+    """Real time"""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Simulated time that advances by exactly the time slept, never by itself"""
+
+    def __init__(self, start=None):
+        """start: wall-clock time (epoch seconds) the clock starts at, default now"""
+        self.start = time.time() if start is None else start
+        self.elapsed = 0.0
+        self.sleeps = 0
+
+    def time(self):
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        return self.elapsed
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        if seconds > 0:
+            self.elapsed += seconds
+
+    def advance(self, seconds):
+        """Move time forward without counting a sleep (e.g. for a simulated request latency)"""
+        self.elapsed += max(0.0, seconds)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+"""Shared pytest setup: the modules under python/ import each other by name"""
+
+import os
+import sys
+import logging
+
+import pytest
+
+PYTHON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python")
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+
+@pytest.fixture(autouse=True)
+def quiet_rotation_log():
+    """Keep test runs out of the rotation log"""
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
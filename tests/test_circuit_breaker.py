@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from circuit_breaker import (CircuitBreaker, CircuitBreakerRegistry, CLOSED, OPEN, HALF_OPEN,
+                             FAILURE_THRESHOLD, BASE_BACKOFF, MAX_BACKOFF)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def open_breaker(clock):
+    breaker = CircuitBreaker("Bar Clock", clock=clock, wall_clock=clock)
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record_failure("timeout")
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker("Bar Clock", clock=clock, wall_clock=clock)
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure("timeout")
+    assert breaker.state == CLOSED and breaker.allow()
+
+    # A success in between starts the count over
+    breaker.record_success()
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure("timeout")
+    assert breaker.state == CLOSED
+
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.seconds_until_retry() == BASE_BACKOFF
+
+
+def test_half_open_lets_a_single_probe_through():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+
+    clock.now = BASE_BACKOFF - 0.1
+    assert not breaker.allow()
+    clock.now = BASE_BACKOFF
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Everyone else waits for the probe's outcome
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert [t["to"] for t in breaker.transitions] == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probes_double_the_backoff_up_to_the_maximum():
+    clock = FakeClock()
+    breaker = open_breaker(clock)
+
+    backoffs = []
+    for _ in range(8):
+        clock.now = breaker.retry_at
+        assert breaker.allow()
+        breaker.record_failure("still down")
+        assert breaker.state == OPEN
+        backoffs.append(breaker.backoff)
+    assert backoffs[:3] == [BASE_BACKOFF * 2, BASE_BACKOFF * 4, BASE_BACKOFF * 8]
+    assert max(backoffs) == MAX_BACKOFF == backoffs[-1]
+
+    # Coming back resets the backoff for the next outage
+    clock.now = breaker.retry_at
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.backoff == BASE_BACKOFF
+
+
+def test_trip_opens_right_away_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker("Bar Clock", clock=clock, wall_clock=clock)
+    breaker.trip("health check failed")
+    breaker.trip("health check failed")
+    assert breaker.state == OPEN
+    assert len(breaker.transitions) == 1
+
+
+def test_registry_reports_transitions_and_writes_the_status_file(tmp_path):
+    clock = FakeClock()
+    status_file = tmp_path / "device_status.json"
+    seen = []
+    registry = CircuitBreakerRegistry(status_file=str(status_file), clock=clock, wall_clock=clock,
+                                      on_transition=lambda key, breaker, previous, state, reason:
+                                      seen.append((key, previous, state)))
+    device = {"name": "Bar Clock", "ip": "10.0.4.21"}
+    breaker = registry.get(device)
+    assert registry.get(device) is breaker
+
+    for _ in range(FAILURE_THRESHOLD):
+        breaker.record_failure("timeout")
+    assert seen == [("10.0.4.21", CLOSED, OPEN)]
+    status = json.loads(status_file.read_text())
+    assert status["devices"]["10.0.4.21"]["state"] == OPEN
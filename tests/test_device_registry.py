@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from device_registry import DeviceRegistry, COMPACT_STALE_LINES, parse_device_id
+
+CONFIG = """# --------- DEVICE SETTINGS ---------
+DEVICE_1_NAME="Bar Clock"
+DEVICE_1_IP="10.0.4.21"
+DEVICE_1_PASSWORD=""
+DEVICE_1_GROUP="Venue B"
+
+# Device 2 (Optional)
+#DEVICE_2_NAME="BlockClock Device 2"
+#DEVICE_2_IP=""
+DEVICE_3_NAME="Door Clock"
+DEVICE_3_IP="10.0.4.23"
+DEVICE_3_PASSWORD="secret"
+DEVICE_3_REFRESH_TIME=600
+DEVICE_4_NAME="Gone"
+DEVICE_4_IP="10.0.4.24"
+DEVICE_4_REMOVED=1
+CLOCK_REFRESH_TIME=300
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "blockclock.conf"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def test_reads_devices_from_settings(config_file):
+    registry = DeviceRegistry.load(config_file)
+    assert [device["id"] for device in registry] == [1, 3]
+    assert registry.get("3")["refresh_time"] == 600
+    assert registry.by_name("bar clock")["ip"] == "10.0.4.21"
+    assert registry.by_ip("10.0.4.23")["password"] == "secret"
+    assert [device["id"] for device in registry.group("Venue B")] == [1]
+    assert registry.groups() == ["Venue B"]
+    # The id of a removed device is not handed out again while its lines are in the file
+    assert registry.next_id == 5
+
+
+def test_add_and_remove_keep_the_indexes_in_step():
+    registry = DeviceRegistry()
+    bar = registry.add({"name": "Bar", "ip": "10.0.0.1", "group": "Venue"})
+    patio = registry.add({"name": "Bar", "ip": "10.0.0.2", "group": "Venue"})
+    assert (bar["id"], patio["id"]) == (1, 2)
+    with pytest.raises(ValueError):
+        registry.add({"name": "Copy", "ip": "10.0.0.1"})
+
+    # Both share a name, removing one keeps the other findable
+    assert registry.by_name("Bar")["id"] == 1
+    assert registry.remove(1)["ip"] == "10.0.0.1"
+    assert registry.by_name("Bar")["id"] == 2
+    assert registry.by_ip("10.0.0.1") is None
+    assert [device["id"] for device in registry.group("Venue")] == [2]
+
+    # Replacing a device by id moves it in every index
+    registry.add({"id": 2, "name": "Patio", "ip": "10.0.0.3"})
+    assert registry.by_name("Bar") is None
+    assert registry.by_ip("10.0.0.2") is None
+    assert registry.groups() == []
+    assert registry.remove(2)["name"] == "Patio"
+    assert registry.remove(2) is None
+    assert len(registry) == 0
+
+
+def test_invalid_device_ids_raise_value_error():
+    registry = DeviceRegistry()
+    assert parse_device_id(" 12 ") == 12
+    for device_id in ("abc", "", "-1", "0", "1.5", None):
+        with pytest.raises(ValueError):
+            registry.get(device_id)
+    with pytest.raises(ValueError):
+        registry.remove("abc")
+
+
+def test_appended_changes_round_trip_through_the_file(config_file):
+    registry = DeviceRegistry.load(config_file)
+    patio = {"name": "Patio Clock", "ip": "10.0.4.25", "password": "", "refresh_time": 900}
+    added = registry.append_device(config_file, patio)
+    assert added["id"] == 5
+    registry.append_removal(config_file, 1)
+    # Re-adding a removed id undoes its removal marker
+    registry.append_device(config_file, {"id": 4, "name": "Back", "ip": "10.0.4.24", "password": ""})
+
+    reloaded = DeviceRegistry.load(config_file)
+    assert reloaded.list() == registry.list()
+    assert [device["id"] for device in reloaded] == [3, 4, 5]
+    assert reloaded.get(5)["refresh_time"] == 900
+    assert reloaded.get(1) is None
+    assert reloaded.stale_lines == registry.stale_lines
+
+    content = open(config_file).read()
+    assert content.startswith(CONFIG)
+    assert "\n\n" not in content[len(CONFIG):]
+
+
+def test_stale_lines_ask_for_compaction(config_file):
+    registry = DeviceRegistry.load(config_file)
+    # The removed device's lines and marker no longer take effect
+    assert registry.stale_lines == 3
+    while not registry.needs_compaction:
+        device = registry.append_device(config_file, {"name": "Temp", "ip": "10.0.9.1"})
+        registry.append_removal(config_file, device["id"])
+    assert registry.stale_lines >= COMPACT_STALE_LINES
+    assert DeviceRegistry.load(config_file).needs_compaction
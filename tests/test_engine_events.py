@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import threading
+
+import pytest
+
+import engine_events
+from engine_events import EventChannel, EventListener
+
+
+class FlakySocket:
+    """Writes at most limit bytes in total, then fails like a web app that went away"""
+
+    def __init__(self, limit=None, chunk=7):
+        self.limit = limit
+        self.chunk = chunk
+        self.data = b""
+
+    def send(self, data):
+        if self.limit is not None and len(self.data) >= self.limit:
+            raise BrokenPipeError("web app restarted")
+        count = min(len(data), self.chunk)
+        if self.limit is not None:
+            count = min(count, self.limit - len(self.data))
+        self.data += bytes(data[:count])
+        return count
+
+    def close(self):
+        pass
+
+
+def lines(data):
+    return [json.loads(line)["n"] for line in data.split(b"\n")[:-1]]
+
+
+def test_no_thread_until_the_first_event_for_the_socket(tmp_path):
+    local = EventChannel()
+    received = []
+    local.subscribe(received.append)
+    local.emit("refresh", n=1)
+    assert [event["n"] for event in received] == [1]
+    assert local.thread is None
+
+    channel = EventChannel(str(tmp_path / "events.sock"))
+    assert channel.thread is None and channel.sock is None
+    channel.emit("refresh", n=1)
+    assert channel.thread is not None
+    channel.close(timeout=0.1)
+
+
+def test_a_failed_write_resends_only_the_unwritten_events(monkeypatch):
+    monkeypatch.setattr(engine_events, "RECONNECT_DELAY", 0.01)
+    # The first connection breaks in the middle of the second event
+    first_line = len(json.dumps({"type": "refresh", "at": 0, "pid": 0, "n": 0}).encode()) + 1
+    sockets = [FlakySocket(limit=first_line + 10), FlakySocket()]
+    channel = EventChannel("unused", clock=lambda: 0)
+    monkeypatch.setattr(channel, "_connect", lambda: sockets.pop(0) if len(sockets) > 1 else sockets[0])
+    first, second = sockets
+
+    with channel.ready:
+        # Queue all events before the sender thread starts, so they go out as one batch
+        for n in range(4):
+            channel._queue({"type": "refresh", "at": 0, "pid": 0, "n": n})
+    # close() gives up on a failed write, let the sender reconnect first
+    deadline = time.monotonic() + 5
+    while channel.sent < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    channel.close()
+
+    assert lines(first.data) == [0]
+    # The torn event is sent again whole, the complete one is not
+    assert lines(second.data) == [1, 2, 3]
+    assert channel.stats() == {"sent": 4, "dropped": 0, "queued": 0, "connections": 2}
+
+
+def test_listener_receives_every_event_once(tmp_path):
+    socket_path = str(tmp_path / "events.sock")
+    listener = EventListener(socket_path)
+    received = []
+    done = threading.Event()
+
+    def collect(event):
+        received.append(event["n"])
+        if len(received) == 50:
+            done.set()
+
+    listener.subscribe(collect)
+    if not listener.start():
+        pytest.skip("Unix sockets are not available")
+    channel = EventChannel(socket_path)
+    try:
+        for n in range(50):
+            channel.emit("refresh", n=n, device="Bar Clock", ip="10.0.4.21")
+        assert done.wait(5)
+    finally:
+        channel.close()
+        listener.stop()
+    assert received == list(range(50))
+    assert listener.stats()["malformed"] == 0
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from log_tailer import LogTailer, RecentLines, tail_lines
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_reads_only_appended_lines(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("old 1\nold 2\n")
+    tailer = LogTailer(str(log))
+
+    assert tailer.poll() == []
+    append(log, "new 1\nnew 2\n")
+    assert tailer.poll() == ["new 1", "new 2"]
+    assert tailer.poll() == []
+    assert tailer.stats()["bytes_read"] == len("new 1\nnew 2\n")
+
+
+def test_holds_back_a_partial_line(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("")
+    tailer = LogTailer(str(log))
+
+    append(log, "half a li")
+    assert tailer.poll() == []
+    append(log, "ne\nnext\n")
+    assert tailer.poll() == ["half a line", "next"]
+
+
+def test_truncation_starts_over(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("line 1\nline 2\nline 3\n")
+    tailer = LogTailer(str(log))
+
+    log.write_text("fresh\n")
+    assert tailer.poll() == ["fresh"]
+    assert tailer.stats()["restarts"] == 1
+
+
+def test_rotation_to_a_new_file_starts_over(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("before rotation\n")
+    tailer = LogTailer(str(log))
+
+    os.rename(log, tmp_path / "blockclock.log.1")
+    log.write_text("after rotation\n")
+    assert tailer.poll() == ["after rotation"]
+    assert tailer.stats()["restarts"] == 1
+
+
+def test_rewrite_in_place_longer_than_the_offset(tmp_path):
+    # rotate_logs() copies the log away and rewrites it with header lines,
+    # same inode and possibly longer than what was read so far
+    log = tmp_path / "blockclock.log"
+    log.write_text("short\n")
+    tailer = LogTailer(str(log))
+
+    with open(log, "w") as f:
+        f.write("=== Log rotated ===\nheader line two\n")
+    assert tailer.poll() == ["=== Log rotated ===", "header line two"]
+    assert tailer.stats()["restarts"] == 1
+
+
+def test_missing_file_is_read_from_its_start_once_created(tmp_path):
+    log = tmp_path / "blockclock.log"
+    tailer = LogTailer(str(log))
+
+    assert tailer.poll() == []
+    log.write_text("first\n")
+    assert tailer.poll() == ["first"]
+
+
+def test_subscribers_get_every_batch(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("")
+    tailer = LogTailer(str(log))
+    batches = []
+    tailer.subscribe(batches.append)
+
+    append(log, "a\nb\n")
+    tailer.poll()
+    append(log, "c\n")
+    tailer.poll()
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_tail_lines_reads_backwards(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("".join(f"line {i}\n" for i in range(1000)) + "partial")
+
+    assert tail_lines(str(log), 3, block_size=16) == ["line 997", "line 998", "line 999"]
+    assert tail_lines(str(log), 5000) == [f"line {i}" for i in range(1000)]
+    assert tail_lines(str(tmp_path / "missing.log"), 3) == []
+
+
+def test_recent_lines_joins_history_and_new_lines(tmp_path):
+    log = tmp_path / "blockclock.log"
+    log.write_text("one\ntwo\nthree\n")
+    tailer = LogTailer(str(log))
+    recent = RecentLines(tailer, 3)
+
+    append(log, "four\n")
+    tailer.poll()
+    assert recent.text() == "two\nthree\nfour"
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import random
+from datetime import datetime, timedelta
+
+from playlists import Playlist, PlaylistIndex
+
+# Monday 2026-01-05 00:00 local time
+MONDAY = datetime(2026, 1, 5).timestamp()
+
+
+def at(day, hour, minute=0):
+    """Epoch seconds of a local time, day 0 being Monday 2026-01-05"""
+    return (datetime(2026, 1, 5, hour, minute) + timedelta(days=day)).timestamp()
+
+
+def make_index(*playlists):
+    return PlaylistIndex({playlist.id: playlist for playlist in playlists}, clock=lambda: MONDAY)
+
+
+def active_name(index, when, group=None):
+    playlist = index.active(group, now=when)
+    return playlist.name if playlist else None
+
+
+def test_higher_priority_wins_an_overlap():
+    index = make_index(
+        Playlist(1, "Evenings", "daily 18:00-23:00", ["BEER"], priority=5),
+        Playlist(2, "Late", "daily 21:00-02:00", ["MOON"]),
+    )
+    assert active_name(index, at(0, 17, 59)) is None
+    assert active_name(index, at(0, 18)) == "Evenings"
+    assert active_name(index, at(0, 22)) == "Evenings"
+    # The lower priority playlist takes over once the other one ends, past midnight
+    assert active_name(index, at(0, 23, 30)) == "Late"
+    assert active_name(index, at(1, 1, 59)) == "Late"
+    assert active_name(index, at(1, 2)) is None
+
+
+def test_equal_priority_goes_to_group_then_higher_id():
+    index = make_index(
+        Playlist(1, "All", "daily", ["HODL"]),
+        Playlist(2, "Also all", "daily 12:00-13:00", ["SATS"]),
+        Playlist(3, "Venue", "Mon-Fri", ["VENUE"], group="Venue A"),
+    )
+    assert active_name(index, at(0, 10)) == "All"
+    assert active_name(index, at(0, 12, 30)) == "Also all"
+    # A group playlist beats a playlist for all clocks, but only on that group's clocks
+    assert active_name(index, at(0, 12, 30), group="Venue A") == "Venue"
+    assert active_name(index, at(5, 12, 30), group="Venue A") == "Also all"
+    # Groups without playlists of their own follow the playlists for all clocks
+    assert active_name(index, at(0, 12, 30), group="Venue B") == "Also all"
+
+
+def test_nested_windows():
+    index = make_index(
+        Playlist(1, "December", "12-01..12-31", ["XMAS"]),
+        Playlist(2, "Holidays", "2026-01-01..2026-01-10", ["NEW YEAR"]),
+        Playlist(3, "Party", "2026-01-07 20:00-02:00", ["PARTY"], priority=1),
+    )
+    assert active_name(index, at(2, 19)) == "Holidays"
+    assert active_name(index, at(2, 21)) == "Party"
+    assert active_name(index, at(3, 1)) == "Party"
+    assert active_name(index, at(3, 3)) == "Holidays"
+    assert active_name(index, at(6, 12)) is None
+
+
+def test_update_rebuilds_only_what_changed():
+    evenings = Playlist(1, "Evenings", "daily 18:00-23:00", ["BEER"])
+    venue = Playlist(2, "Venue", "daily 19:00-20:00", ["VENUE"], group="Venue A", priority=1)
+    index = make_index(evenings, venue)
+    selector = evenings.selector
+
+    changed = index.update({1: Playlist(1, "Evenings", "daily 18:00-23:00", ["BEER"]),
+                            2: Playlist(2, "Venue", "daily 21:00-22:00", ["VENUE"], group="Venue A", priority=1)})
+    assert changed == 1
+    # The unchanged playlist keeps its selector state
+    assert index.playlists[1].selector is selector
+    assert active_name(index, at(0, 19, 30), group="Venue A") == "Evenings"
+    assert active_name(index, at(0, 21, 30), group="Venue A") == "Venue"
+
+    assert index.update({2: index.playlists[2]}) == 1
+    assert active_name(index, at(0, 19, 30)) is None
+    assert active_name(index, at(0, 21, 30), group="Venue A") == "Venue"
+
+
+def test_index_recompiles_past_its_horizon():
+    index = make_index(Playlist(1, "Sundays", "Sun", ["SUNDAY"]))
+    # Four weeks ahead is past the compiled horizon
+    assert active_name(index, at(27, 12)) == "Sundays"
+    assert active_name(index, at(28, 12)) is None
+
+
+def test_overlaps_match_a_brute_force_search():
+    rng = random.Random(21)
+    days = ["daily", "Mon-Fri", "Sat,Sun", "Tue", "2026-01-06..2026-01-08", ""]
+    groups = [None, None, "Venue A", "Venue B"]
+    playlists = []
+    for playlist_id in range(1, 13):
+        start, length = rng.randrange(24 * 4), rng.randrange(1, 12 * 4)
+        end = (start + length) % (24 * 4)
+        when = f"{days[playlist_id % len(days)]} {start // 4:02d}:{start % 4 * 15:02d}-{end // 4:02d}:{end % 4 * 15:02d}"
+        playlists.append(Playlist(playlist_id, f"P{playlist_id}", when.strip(), ["TEXT"],
+                                  group=rng.choice(groups), priority=rng.randrange(3)))
+    index = make_index(*playlists)
+
+    def brute_force(group, now):
+        candidates = [playlist for playlist in playlists
+                      if (playlist.group is None or playlist.group == group)
+                      and any(start <= now < end for start, end in playlist.intervals(*index.horizon_days))]
+        return max(candidates, key=Playlist.rank) if candidates else None
+
+    for _ in range(500):
+        now = MONDAY + rng.uniform(0, 13 * 86400)
+        for group in (None, "Venue A", "Venue B"):
+            assert index.active(group, now=now) is brute_force(group, now)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+from quiet_hours import QuietHours, QuietHoursPolicy, parse_group_quiet_hours, format_group_quiet_hours
+
+
+def at(day, hour, minute=0):
+    """Epoch seconds of a local time, day 0 being Monday 2026-01-05"""
+    return (datetime(2026, 1, 5, hour, minute) + timedelta(days=day)).timestamp()
+
+
+def test_window_past_midnight():
+    quiet = QuietHours("23:00-07:00")
+    assert quiet.window_end(at(0, 22, 59)) is None
+    assert quiet.window_end(at(0, 23)) == at(1, 7)
+    assert quiet.window_end(at(1, 6, 59)) == at(1, 7)
+    assert quiet.window_end(at(1, 7)) is None
+
+
+def test_back_to_back_windows_are_one_stretch():
+    quiet = QuietHours("Sat,Sun; Mon-Fri 00:00-08:00")
+    # Saturday morning runs on until Monday 08:00
+    assert quiet.window_end(at(5, 9)) == at(7, 8)
+    assert quiet.window_end(at(2, 12)) is None
+
+
+def test_device_then_group_then_default():
+    policy = QuietHoursPolicy.from_settings({
+        "QUIET_HOURS": "23:00-07:00",
+        "GROUP_QUIET_HOURS": '("Venue A=Mon-Fri 01:00-17:00" "Venue B=none")',
+    })
+    assert policy.when_for({"name": "Own", "quiet_hours": "Sun", "group": "Venue A"}) == "Sun"
+    assert policy.when_for({"name": "Group", "group": "Venue A"}) == "Mon-Fri 01:00-17:00"
+    assert policy.when_for({"name": "Off", "group": "Venue B"}) is None
+    assert policy.when_for({"name": "Plain"}) == "23:00-07:00"
+    # Devices with the same value share one parsed QuietHours
+    assert policy.for_device({"name": "A"}) is policy.for_device({"name": "B", "group": "Venue C"})
+
+
+def test_invalid_quiet_hours_are_ignored():
+    policy = QuietHoursPolicy("25:00-26:00")
+    assert policy.for_device({"name": "Bar Clock"}) is None
+
+
+def test_group_quiet_hours_round_trip():
+    groups = parse_group_quiet_hours('("Venue A=Mon-Fri 01:00-17:00" "broken" "Venue B=none")')
+    assert groups == {"Venue A": "Mon-Fri 01:00-17:00", "Venue B": "none"}
+    assert parse_group_quiet_hours(format_group_quiet_hours(groups)) == groups
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from device_scheduler import QUIET
+from rotation_simulation import SimulatedControl
+from virtual_clock import VirtualClock
+
+# A Monday morning, so quiet hours by weekday and time are predictable
+START = datetime(2026, 1, 5, 8, 0).timestamp()
+
+
+def write_config(tmp_path, extra=""):
+    config = tmp_path / "blockclock.conf"
+    config.write_text(
+        'DEVICE_1_NAME="Office"\n'
+        'DEVICE_1_IP="10.0.0.1"\n'
+        'DEVICE_2_NAME="Shop"\n'
+        'DEVICE_2_IP="10.0.0.2"\n'
+        'DEVICE_2_REFRESH_TIME=600\n'
+        'TEXT_OPTIONS=("HODL" "SATS")\n'
+        'CLOCK_REFRESH_TIME=300\n'
+        'DISPLAYS_BETWEEN_TEXT=2\n' + extra)
+    return str(config)
+
+
+def run_rotation(config, seconds, seed=1):
+    clock = VirtualClock(START)
+    control = SimulatedControl(config, clock, seconds, seed=seed)
+    control.run()
+    return control, clock
+
+
+def test_every_device_runs_its_own_cycle(tmp_path):
+    control, clock = run_rotation(write_config(tmp_path), 6 * 3600)
+
+    # The rotation only stops at the end of the simulated time
+    assert clock.monotonic() >= 6 * 3600
+    cycles = {schedule.name: schedule.cycle_count for schedule in control.scheduler.schedules}
+    # A first refresh to sync, then a text every (displays + 1) refreshes of the device's own period
+    assert 22 <= cycles["Office"] <= 24
+    assert 10 <= cycles["Shop"] <= 12
+
+    for sim in control.simulated_clocks:
+        assert sim.lost_texts == 0
+        assert len(sim.shown_texts) >= 10
+        # Sent after this clock's own refresh animation, not on the other clock's timing
+        for shown in sim.shown_texts:
+            assert control.animation_delay <= shown["after_refresh"] < control.animation_delay + 5
+
+
+def test_rotation_sleeps_until_the_next_timer(tmp_path):
+    control, clock = run_rotation(write_config(tmp_path), 6 * 3600)
+
+    # No busy waiting: wakeups for polls, sends and progress log ticks, not one per second
+    assert clock.sleeps < 6 * 3600 / 10
+    # Polls cluster around the expected refreshes instead of running all the time
+    for sim in control.simulated_clocks:
+        assert sim.status_calls < 6 * 3600 / 20
+
+
+def test_quiet_hours_stop_device_traffic(tmp_path):
+    config = write_config(tmp_path, 'DEVICE_2_QUIET_HOURS="07:00-20:00"\n')
+    control, clock = run_rotation(config, 6 * 3600)
+
+    office, shop = control.simulated_clocks
+    assert shop.status_calls == 0
+    assert shop.text_calls == 0
+    assert office.text_calls > 0
+
+    states = {schedule.name: schedule.state for schedule in control.scheduler.schedules}
+    assert states["Shop"] == QUIET
+
+
+def test_rotation_resumes_after_quiet_hours(tmp_path):
+    config = write_config(tmp_path, 'DEVICE_2_QUIET_HOURS="07:00-10:00"\n')
+    control, clock = run_rotation(config, 6 * 3600)
+
+    office, shop = control.simulated_clocks
+    quiet_end = datetime(2026, 1, 5, 10, 0).timestamp()
+    assert shop.shown_texts
+    assert all(shown["at"] >= quiet_end for shown in shop.shown_texts)
+    assert office.shown_texts[0]["at"] < quiet_end
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from send_shaping import SendPolicy, DEFAULT_GROUP
+from virtual_clock import VirtualClock
+
+
+class RecordingPool:
+    """Answers every request at once, remembering the order and the most requests at a time"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+    def timed_get(self, device, path, start_time, timeout=None):
+        with self.lock:
+            self.sent.append(device["name"])
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.release.wait(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        success = device["name"] not in self.failing
+        return {"name": device["name"], "ip": device["ip"], "success": success,
+                "status_code": 200 if success else 500, "error": None if success else "HTTP 500",
+                "latency": 0.0, "completed_after": 0.0}
+
+
+def devices(*names_and_groups):
+    return [{"name": name, "ip": f"10.0.0.{i}", "group": group}
+            for i, (name, group) in enumerate(names_and_groups, start=1)]
+
+
+def test_groups_in_priority_order_then_by_name_then_ungrouped():
+    policy = SendPolicy(priorities=["Venue B"])
+    ordered = policy.order_groups(devices(("a", None), ("b", "venue c"), ("c", "Venue B"), ("d", "Venue A")))
+    assert [group for group, _ in ordered] == ["Venue B", "Venue A", "venue c", DEFAULT_GROUP]
+
+
+def test_group_spacing_runs_on_the_given_clock():
+    clock = VirtualClock()
+    pool = RecordingPool(failing={"c"})
+    pool.release.set()
+    policy = SendPolicy(max_in_flight=1, group_spacing=30)
+    results, groups = policy.fan_out(pool, devices(("a", "X"), ("b", "Y"), ("c", "Y")), "/api/show/text/HI",
+                                     sleep=clock.sleep, clock=clock.monotonic)
+    assert clock.monotonic() == 30
+    assert pool.sent == ["a", "b", "c"]
+    assert sorted(result["name"] for result in results) == ["a", "b", "c"]
+    assert [(group["group"], group["devices"], group["succeeded"], group["scheduled_after"])
+            for group in groups] == [("X", 1, 1, 0.0), ("Y", 2, 1, 30.0)]
+
+
+def test_requests_in_flight_are_capped():
+    pool = RecordingPool()
+    policy = SendPolicy(max_in_flight=2, group_spacing=0)
+    results, _ = policy.fan_out(pool, devices(*[(str(i), None) for i in range(6)]), "/api/status")
+    assert len(results) == 6
+    assert pool.max_in_flight == 2
+
+
+def test_nothing_to_send():
+    assert SendPolicy().fan_out(RecordingPool(), [], "/api/status") == ([], [])
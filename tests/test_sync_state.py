@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import json
+from types import SimpleNamespace
+
+from sync_state import SyncStateStore, max_entry_age
+from virtual_clock import VirtualClock
+
+REFRESH_TIME = 300
+DISPLAYS_BETWEEN_TEXT = 3
+
+
+def saved_state(path, refreshed_ago=50):
+    """Save one synchronized device on a clock at wall time 1500, monotonic 500"""
+    clock = VirtualClock(start=1000)
+    clock.sleep(500)
+    last_refresh = clock.monotonic() - refreshed_ago
+    schedule = SimpleNamespace(key="10.0.4.21", name="Bar Clock", last_refresh_at=last_refresh,
+                               refresh_time=REFRESH_TIME, displays_between_text=DISPLAYS_BETWEEN_TEXT,
+                               refresh_count=2, cycle_count=7, last_custom_text="_HODL_")
+    syncing = SimpleNamespace(key="10.0.4.22", name="New Clock", last_refresh_at=None)
+    learner = SimpleNamespace(observations={"10.0.4.21": [last_refresh - REFRESH_TIME, last_refresh]})
+    SyncStateStore(str(path), clock=clock).save([schedule, syncing], learner)
+
+
+def test_restart_places_times_on_the_new_monotonic_clock(tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    saved_state(state_file)
+
+    # A new process 100 seconds later, its monotonic clock starts at 0
+    entries = SyncStateStore(str(state_file), clock=VirtualClock(start=1600)).load()
+    assert list(entries) == ["10.0.4.21"]
+    entry = entries["10.0.4.21"]
+    assert entry["age"] == 150
+    assert entry["last_refresh_at"] == -150
+    assert entry["refreshes"] == [-150 - REFRESH_TIME, -150]
+    assert (entry["refresh_count"], entry["cycle_count"], entry["last_custom_text"]) == (2, 7, "_HODL_")
+
+
+def test_entries_expire_after_one_rotation_cycle(tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    saved_state(state_file, refreshed_ago=0)
+    max_age = max_entry_age(REFRESH_TIME, DISPLAYS_BETWEEN_TEXT)
+    assert max_age == REFRESH_TIME * (DISPLAYS_BETWEEN_TEXT + 1)
+
+    assert SyncStateStore(str(state_file), clock=VirtualClock(start=1500 + max_age)).load()
+    assert SyncStateStore(str(state_file), clock=VirtualClock(start=1500 + max_age + 1)).load() == {}
+    # A fixed limit replaces the per-device cycle
+    assert SyncStateStore(str(state_file), max_age=60, clock=VirtualClock(start=1561)).load() == {}
+
+
+def test_wall_clock_going_backwards_discards_the_state(tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    saved_state(state_file, refreshed_ago=0)
+    assert SyncStateStore(str(state_file), clock=VirtualClock(start=1400)).load() == {}
+
+
+def test_unusable_files_are_ignored(tmp_path):
+    state_file = tmp_path / "sync_state.json"
+    assert SyncStateStore(str(state_file)).load() == {}
+    state_file.write_text("{not json")
+    assert SyncStateStore(str(state_file)).load() == {}
+    state_file.write_text(json.dumps({"version": 1, "devices": {}}))
+    assert SyncStateStore(str(state_file)).load() == {}
+    assert SyncStateStore(None).load() == {}
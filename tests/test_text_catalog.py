@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from text_catalog import TextCatalog, INDEX_SUFFIX, MAX_PAGE_SIZE, resolve_catalog_path
+
+CATALOG = """# Bitcoin texts
+_HODL_
+STACK SATS:3
+
+
+  #NOT A COMMENT
+TICK TOCK"""
+
+
+def write_catalog(tmp_path, content=CATALOG):
+    path = tmp_path / "bitcoin.txt"
+    path.write_text(content)
+    return str(path)
+
+
+def test_skips_comments_and_blank_lines(tmp_path):
+    with TextCatalog(write_catalog(tmp_path)) as catalog:
+        # Only a # in the first column starts a comment, the last line has no newline
+        assert list(catalog) == ["_HODL_", "STACK SATS", "#NOT A COMMENT", "TICK TOCK"]
+        assert list(catalog.weights()) == [1.0, 3.0, 1.0, 1.0]
+        assert catalog[1:3] == ["STACK SATS", "#NOT A COMMENT"]
+
+
+def test_pages_are_clamped(tmp_path):
+    content = "\n".join(f"TEXT {i}" for i in range(1200)) + "\n"
+    with TextCatalog(write_catalog(tmp_path, content)) as catalog:
+        assert len(catalog) == 1200
+        assert catalog.page(10, 3) == [("TEXT 10", 1.0), ("TEXT 11", 1.0), ("TEXT 12", 1.0)]
+        assert len(catalog.page(0, 10000)) == MAX_PAGE_SIZE
+        assert catalog.page(-5, 1) == [("TEXT 0", 1.0)]
+        assert catalog.page(1199, 50) == [("TEXT 1199", 1.0)]
+        assert catalog.page(5000, 50) == []
+
+
+def test_empty_catalog(tmp_path):
+    with TextCatalog(write_catalog(tmp_path, "")) as catalog:
+        assert len(catalog) == 0
+        assert catalog.page() == []
+
+
+def test_index_is_reused_until_the_file_changes(tmp_path, monkeypatch):
+    path = write_catalog(tmp_path)
+    TextCatalog(path).close()
+    assert os.path.exists(path + INDEX_SUFFIX)
+
+    def no_rebuild(self):
+        raise AssertionError("index rebuilt")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(TextCatalog, "_build_index", no_rebuild)
+        with TextCatalog(path) as catalog:
+            assert len(catalog) == 4
+
+    with TextCatalog(path) as catalog:
+        with open(path, "a") as f:
+            f.write("\nMOON\n")
+        assert catalog.changed()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(TextCatalog, "_build_index", no_rebuild)
+        with pytest.raises(AssertionError):
+            TextCatalog(path)
+    with TextCatalog(path) as catalog:
+        assert list(catalog)[-1] == "MOON"
+        assert not catalog.changed()
+
+
+def test_corrupt_index_is_rebuilt(tmp_path):
+    path = write_catalog(tmp_path)
+    TextCatalog(path).close()
+    with open(path + INDEX_SUFFIX, "wb") as f:
+        f.write(b"garbage\n\x00\x01")
+    with TextCatalog(path) as catalog:
+        assert list(catalog) == ["_HODL_", "STACK SATS", "#NOT A COMMENT", "TICK TOCK"]
+
+
+def test_paths_are_relative_to_the_config_file(tmp_path):
+    config_file = str(tmp_path / "config" / "blockclock.conf")
+    assert resolve_catalog_path("catalogs/bitcoin.txt", config_file) == str(tmp_path / "config" / "catalogs" / "bitcoin.txt")
+    assert resolve_catalog_path("/srv/bitcoin.txt", config_file) == "/srv/bitcoin.txt"
+    assert resolve_catalog_path("", config_file) == ""
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import random
+from collections import Counter
+
+import pytest
+
+from text_selection import (AliasTable, ShuffleBag, create_selector, format_text_option,
+                            parse_text_option)
+
+
+def alias_distribution(table):
+    """Exact pick probability of every index, from the alias table itself"""
+    n = len(table.probability)
+    distribution = [0.0] * n
+    for i in range(n):
+        distribution[i] += table.probability[i] / n
+        distribution[table.alias[i]] += (1 - table.probability[i]) / n
+    return distribution
+
+
+@pytest.mark.parametrize("weights", [
+    [1, 1, 1, 1],
+    [3, 1, 0.5],
+    [10, 0, 0, 1, 2.5],
+    [0.001, 1000],
+])
+def test_alias_table_matches_weights(weights):
+    texts = [f"T{i}" for i in range(len(weights))]
+    table = AliasTable(texts, weights)
+    total = sum(weights)
+    for probability, weight in zip(alias_distribution(table), weights):
+        assert probability == pytest.approx(weight / total, abs=1e-9)
+
+
+def test_alias_table_sampling():
+    table = AliasTable(["HODL", "SATS", "MOON"], [6, 3, 1], rng=random.Random(7))
+    counts = Counter(table.select() for _ in range(20000))
+    assert counts["HODL"] / 20000 == pytest.approx(0.6, abs=0.02)
+    assert counts["SATS"] / 20000 == pytest.approx(0.3, abs=0.02)
+    assert counts["MOON"] / 20000 == pytest.approx(0.1, abs=0.02)
+
+
+def test_alias_table_rejects_zero_total():
+    with pytest.raises(ValueError):
+        AliasTable(["HODL", "SATS"], [0, 0])
+
+
+def test_shuffle_bag_shows_every_text_once_per_round():
+    texts = [f"T{i}" for i in range(7)]
+    bag = ShuffleBag(texts, rng=random.Random(3))
+    picks = [bag.select() for _ in range(7 * 20)]
+    for start in range(0, len(picks), 7):
+        assert sorted(picks[start:start + 7]) == sorted(texts)
+
+
+def test_shuffle_bag_never_repeats_across_rounds():
+    for seed in range(50):
+        bag = ShuffleBag(["HODL", "SATS", "MOON"], rng=random.Random(seed))
+        picks = [bag.select() for _ in range(60)]
+        assert all(a != b for a, b in zip(picks, picks[1:]))
+
+
+def test_shuffle_bag_single_text():
+    bag = ShuffleBag(["HODL"])
+    assert [bag.select() for _ in range(3)] == ["HODL"] * 3
+
+
+@pytest.mark.parametrize("entry, expected", [
+    ("HODL", ("HODL", 1.0)),
+    ("HODL:3", ("HODL", 3.0)),
+    ("BITCOIN:0.5", ("BITCOIN", 0.5)),
+    ("MOON:.25", ("MOON", 0.25)),
+    ("4:20", ("4:20", 1.0)),
+    ("12:30", ("12:30", 1.0)),
+    ("$1:00", ("$1:00", 1.0)),
+    ("4:20:3", ("4:20", 3.0)),
+    ("TIME:", ("TIME:", 1.0)),
+    (":3", (":3", 1.0)),
+    ("WEN:MOON", ("WEN:MOON", 1.0)),
+    ("HODL:nan", ("HODL:nan", 1.0)),
+    ("HODL:inf", ("HODL:inf", 1.0)),
+    ("HODL:-2", ("HODL", 0.0)),
+])
+def test_parse_text_option(entry, expected):
+    assert parse_text_option(entry) == expected
+
+
+@pytest.mark.parametrize("text, weight", [
+    ("HODL", 1), ("HODL", 3), ("4:20", 1), ("4:20", 2.5), ("HODL:3", 1), ("WEN:MOON", 1),
+])
+def test_format_text_option_round_trips(text, weight):
+    assert parse_text_option(format_text_option(text, weight)) == (text, weight)
+
+
+def test_zero_weight_switches_a_text_off():
+    selector = create_selector(["HODL", "SATS:0"], strategy="shuffle", rng=random.Random(1))
+    assert {selector.select() for _ in range(10)} == {"HODL"}
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from timer_queue import TimerQueue
+from virtual_clock import VirtualClock
+
+
+def test_pop_due_returns_keys_earliest_first():
+    timers = TimerQueue(clock=lambda: 0.0)
+    timers.schedule("c", 30)
+    timers.schedule("a", 10)
+    timers.schedule("b", 20)
+
+    assert timers.pop_due(25) == ["a", "b"]
+    assert timers.pop_due(25) == []
+    assert timers.pop_due(30) == ["c"]
+    assert len(timers) == 0
+
+
+def test_equal_deadlines_keep_scheduling_order():
+    timers = TimerQueue(clock=lambda: 0.0)
+    for key in ("x", "y", "z"):
+        timers.schedule(key, 5)
+
+    assert timers.pop_due(5) == ["x", "y", "z"]
+
+
+def test_rescheduling_moves_the_timer():
+    timers = TimerQueue(clock=lambda: 0.0)
+    timers.schedule("device", 10)
+    timers.schedule("other", 20)
+    timers.schedule("device", 30)
+
+    assert timers.deadline("device") == 30
+    assert timers.next_deadline() == 20
+    assert timers.pop_due(25) == ["other"]
+    assert timers.pop_due(30) == ["device"]
+
+
+def test_cancel_drops_the_timer():
+    timers = TimerQueue(clock=lambda: 0.0)
+    timers.schedule("device", 10)
+    timers.schedule("check", 15)
+
+    assert timers.cancel("device") is True
+    assert timers.cancel("device") is False
+    assert "device" not in timers
+    assert timers.deadline("device") is None
+    assert timers.next_deadline() == 15
+    assert timers.pop_due(100) == ["check"]
+    assert timers.next_deadline() is None
+
+
+def test_time_until_next_on_the_queue_clock():
+    clock = VirtualClock()
+    timers = TimerQueue(clock=clock.monotonic)
+    assert timers.time_until_next() is None
+
+    timers.schedule_in("device", 60)
+    clock.advance(45)
+    assert timers.time_until_next() == 15
+    clock.advance(30)
+    assert timers.time_until_next() == 0.0
+    assert timers.pop_due() == ["device"]
+
+
+def test_heap_is_compacted_after_many_reschedules():
+    timers = TimerQueue(clock=lambda: 0.0)
+    for i in range(1000):
+        timers.schedule("device", i)
+
+    assert len(timers) == 1
+    assert len(timers.heap) < 100
+    assert timers.pop_due(999) == ["device"]
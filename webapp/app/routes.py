@@ -1,4 +1,4 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, flash, request, jsonify
 from app import app
 from datetime import datetime, timedelta
 import markdown
@@ -7,14 +7,11 @@ import sys
 import json
 import subprocess
 import time
-import importlib.util
 import threading
-import signal
-import requests
 import re
-import logging
 import shutil
 import glob
+from collections import deque
 
 #######################################################
 # INITIALIZATION AND CONFIGURATION
@@ -25,12 +22,32 @@ project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 
 # Add the python directory to the path
 sys.path.append(os.path.join(project_root, 'python'))
-from blockclock import BlockClockControl, setup_logging
+from blockclock import setup_logging, DISPLAY_SNAPSHOT_FILE, DEVICE_STATUS_FILE, ENGINE_EVENTS_SOCKET
+from device_client import DevicePool, read_display
+from device_registry import DeviceRegistry, device_lines, parse_settings
+from display_cache import DisplayCache
+from device_probe import probe_device, probe_devices
+from send_shaping import SendPolicy, MAX_IN_FLIGHT, GROUP_SPACING
+from send_dedup import SendDeduplicator
+from rotation_engine import RotationEngine
+from device_scheduler import SYNCING, WAITING, POLLING, ANIMATING, QUIET
+from text_selection import parse_text_option, format_text_option, SELECTORS, DEFAULT_STRATEGY
+from text_catalog import TextCatalog, resolve_catalog_path
+from playlists import read_playlists, playlist_lines
+from quiet_hours import parse_group_quiet_hours, format_group_quiet_hours
+from engine_events import EventListener
+import engine_events
+from log_tailer import LogTailer, RecentLines
 
 # Set up the logger with the central log file path
 log_file_path = os.path.join(project_root, 'logs', 'blockclock.log')
 logger = setup_logging(log_file_path)
 
+# Lines shown by /logs, the tailer reads only what was appended since the last request
+LOG_LINES_SHOWN = 200
+log_tailer = LogTailer(log_file_path)
+recent_log_lines = RecentLines(log_tailer, LOG_LINES_SHOWN)
+
 # Log that the routes module is initialized
 #logger.info("🚀 Routes module initialized - logging configured to: %s", log_file_path)
 
@@ -49,6 +66,45 @@ first_refresh_detected = False
 last_manual_text_time = 0
 RATE_LIMIT_SECONDS = 70  # Minimum time between manual text submissions (70 seconds)
 
+# The rotation runs on a thread in this process unless ROTATION_ENGINE=process
+IN_PROCESS_ENGINE = os.environ.get("ROTATION_ENGINE", "thread") != "process"
+rotation_engine = RotationEngine(app.config['DEFAULT_CONFIG_FILE'])
+
+device_pool = DevicePool(timeout=5)  # Keep-alive connections shared by all web requests
+
+def fetch_device_display(device):
+    """Fetch a device's display for the shared display cache"""
+    try:
+        return read_display(device_pool, device)
+    except Exception:
+        return "ERROR"
+
+# Latest display per device, shared by all browser tabs and with the rotation process
+# (an in-process rotation shares its own cache instead, see engine_display_cache)
+display_cache = DisplayCache(fetch_device_display,
+                             snapshot_file=None if IN_PROCESS_ENGINE else DISPLAY_SNAPSHOT_FILE)
+
+# Skips manual sends of a text a device already shows or was just sent
+send_dedup = SendDeduplicator(display_cache)
+
+# Text catalog paged through by the settings page (opened on first use)
+text_catalog = None
+text_catalog_lock = threading.Lock()
+
+def engine_control():
+    """BlockClockControl of the in-process rotation, None if it runs in a subprocess or not at all"""
+    return rotation_engine.control if IN_PROCESS_ENGINE and rotation_engine.is_running() else None
+
+def engine_display_cache():
+    """The rotation's own display cache while it runs in this process, so both share reads and breakers"""
+    control = engine_control()
+    return control.display_cache if control is not None else display_cache
+
+def engine_device_pool():
+    """The rotation's own connections while it runs in this process, the web app's pool otherwise"""
+    control = engine_control()
+    return control.connections if control is not None else device_pool
+
 #######################################################
 # LOG ROTATION FUNCTIONS
 #######################################################
@@ -193,12 +249,23 @@ def kill_all_blockclock_processes():
         logger.error(f"⚠️ Error cleaning up processes: {str(e)}")
         return False
 
+def refresh_rotation_status():
+    """Update rotation_active from the engine thread or the rotation process"""
+    global rotation_active
+    
+    if IN_PROCESS_ENGINE:
+        rotation_active = rotation_engine.is_running()
+    elif blockclock_process and blockclock_process.poll() is not None:
+        # Process has exited
+        rotation_active = False
+    return rotation_active
+
 def start_rotation():
-    """Start the text rotation as a separate process"""
-    global blockclock_process, rotation_active, monitoring_active, monitoring_message, monitoring_start_time, first_refresh_detected
+    """Start the text rotation on the engine thread (or as a separate process)"""
+    global blockclock_process, blockclock_instance, rotation_active, monitoring_active, monitoring_message, monitoring_start_time, first_refresh_detected
     
     with rotation_lock:
-        if rotation_active:
+        if refresh_rotation_status():
             return False
         
         try:
@@ -212,6 +279,14 @@ def start_rotation():
             # Reset the first refresh detected flag
             first_refresh_detected = False
             
+            if IN_PROCESS_ENGINE:
+                # Run in this process, the routes read its live state
+                if not rotation_engine.start():
+                    return False
+                blockclock_instance = rotation_engine.control
+                rotation_active = True
+                return True
+            
             # Path to the Python script using project root
             script_path = os.path.join(project_root, 'python', 'blockclock.py')
             
@@ -235,7 +310,9 @@ def stop_rotation():
     global blockclock_process, rotation_active, monitoring_active
 
     with rotation_lock:
-        if os.environ.get("RUNNING_IN_DOCKER") == "1":
+        if IN_PROCESS_ENGINE:
+            rotation_engine.stop()
+        elif os.environ.get("RUNNING_IN_DOCKER") == "1":
             logger.info("🐳 stop_rotation() called in Docker — skipping internal cleanup")
         else:
             kill_all_blockclock_processes()
@@ -273,115 +350,72 @@ def run_rotation():
         with rotation_lock:
             rotation_active = False
 
-def monitor_logs():
-    """Monitor logs for refresh waiting status"""
-    global rotation_active, monitoring_active, monitoring_message, monitoring_start_time
-    
-    # Use only the central log file location
-    log_path = os.path.join(project_root, 'logs', 'blockclock.log')
-    
-    if not os.path.exists(log_path):
-        logger.error(f"❌ Log file not found at {log_path}")
-        return
-    
-    # Start the monitor_logs thread
-    threading.Thread(target=_monitor_logs_thread, args=(log_path,), daemon=True).start()
-
-# Find the _monitor_logs_thread function in routes.py and replace it with this version:
+#######################################################
+# ROTATION EVENT FUNCTIONS
+#######################################################
 
-def _monitor_logs_thread(log_path):
-    """Background thread to monitor logs"""
-    global rotation_active, monitoring_active, monitoring_message
-    global monitoring_start_time, first_refresh_detected
-    
-    last_size = 0
-    last_matched_pattern = ""  # Track the last pattern we matched
-    last_refresh_number = 0  # Track the last refresh number we detected
-    
-    # Do NOT set monitoring message here - it should be set in start_rotation()
+# Device state of the scheduler each event leaves the device in
+EVENT_STATES = {
+    engine_events.SYNCING: SYNCING,
+    engine_events.SYNC_ACQUIRED: ANIMATING,
+    engine_events.REFRESH: ANIMATING,
+    engine_events.WAITING: WAITING,
+    engine_events.POLLING: POLLING,
+    engine_events.QUIET_HOURS: QUIET,
+}
+
+# Number of recent rotation events kept for /engine_events
+RECENT_EVENTS = 200
+
+# Latest state event of every device, in the rotation's device order
+engine_device_events = {}
+engine_device_order = []
+offline_devices = {}
+recent_events = deque(maxlen=RECENT_EVENTS)
+engine_events_lock = threading.Lock()
+
+def on_engine_event(event):
+    """Keep the rotation state from its events (see python/engine_events.py)"""
+    global first_refresh_detected
     
-    while rotation_active:
-        try:
-            # Check if file exists and has changed
-            if os.path.exists(log_path):
-                current_size = os.path.getsize(log_path)
-                
-                # Check log only if it has changed
-                if current_size != last_size:
-                    with open(log_path, 'r') as f:
-                        log_content = f.read()
-                        
-                        # Check for first refresh detection (only if not already detected)
-                        if not first_refresh_detected:
-                            initial_refresh_patterns = [
-                                "First refresh detected after",
-                                "BlockClock refresh 1/",
-                                "Display changed after"
-                            ]
-                            
-                            for pattern in initial_refresh_patterns:
-                                if pattern in log_content:
-                                    first_refresh_detected = True
-                                    logger.info(f"First refresh detected - text sending enabled")
-                                    
-                                    # Reset the monitoring start time when refresh is detected
-                                    monitoring_start_time = time.time()
-                                    
-                                    # Update monitoring message for initial sync completion
-                                    monitoring_message = " ⏳  Waiting for first Refresh  🔍"
-                                    
-                                    # Set as last matched pattern
-                                    last_matched_pattern = pattern
-                                    break
-                        else:
-                            # Already in sync, get only the newly added content
-                            new_content = log_content[-min(5000, current_size - last_size):]
-                            
-                            # First check for individual refresh changes
-                            refresh_match = re.search(r'BlockClock refresh (\d+)/(\d+)', new_content)
-                            if refresh_match:
-                                current_refresh = int(refresh_match.group(1))
-                                total_refreshes = int(refresh_match.group(2))
-                                
-                                # Only reset if this is a new refresh number
-                                if current_refresh != last_refresh_number:
-                                    logger.info(f"Individual refresh detected: {current_refresh}/{total_refreshes} (timer reset)")
-                                    monitoring_start_time = time.time()
-                                    monitoring_message = f"🔄 Monitoring refresh {current_refresh}/{total_refreshes}"
-                                    last_refresh_number = current_refresh
-                            
-                            # Then check for other cycle patterns
-                            cycle_patterns = {
-                                "Sleeping before refresh #": "🔄 Monitoring BlockClock refresh cycles",
-                                "Actively monitoring for refresh #": "🔍 Actively monitoring for refresh",
-                                "Final refresh complete": "✅ Refresh cycle complete",
-                                "Sending new Custom Text": "Reset Timer"
-                            }
-                            
-                            for pattern, message in cycle_patterns.items():
-                                # Only update if we find a pattern in new content and it's different from last match
-                                if pattern in new_content and pattern != last_matched_pattern:
-                                    # Reset timer and update message for this phase
-                                    monitoring_start_time = time.time()
-                                    monitoring_message = message
-                                    logger.info(f"Monitoring phase changed: {message}")
-                                    
-                                    # If this is a new cycle starting, reset the refresh number counter
-                                    if pattern == "Sleeping before refresh #":
-                                        last_refresh_number = 0
-                                    
-                                    # Set as last matched pattern
-                                    last_matched_pattern = pattern
-                                    break
-                    
-                    last_size = current_size
-            
-            # Wait before checking again
-            time.sleep(1)
-        except Exception as e:
-            logger.error(f"❌ Error monitoring logs: {str(e)}")
-            time.sleep(5)  # Wait longer on error
-            
+    event_type = event.get('type')
+    with engine_events_lock:
+        recent_events.append(event)
+        if event_type == engine_events.ROTATION_STARTED:
+            # A new rotation, forget everything about the last one
+            engine_device_events.clear()
+            offline_devices.clear()
+            engine_device_order[:] = [device['ip'] for device in event.get('devices', [])]
+            first_refresh_detected = False
+        elif event_type == engine_events.SYNC_ACQUIRED:
+            first_refresh_detected = True
+        elif event_type == engine_events.DEVICE_DOWN:
+            offline_devices[event['ip']] = event
+        elif event_type == engine_events.DEVICE_UP:
+            offline_devices.pop(event['ip'], None)
+        
+        if event_type in EVENT_STATES:
+            engine_device_events[event['ip']] = event
+
+def first_device_event():
+    """Latest state event of the first device that has one"""
+    with engine_events_lock:
+        for ip in engine_device_order:
+            if ip in engine_device_events:
+                return engine_device_events[ip]
+        return next(iter(engine_device_events.values()), None)
+
+# The engine thread hands its events over directly, a rotation process sends them to the socket
+engine_event_listener = None
+if IN_PROCESS_ENGINE:
+    rotation_engine.events.subscribe(on_engine_event)
+else:
+    engine_event_listener = EventListener(ENGINE_EVENTS_SOCKET)
+    engine_event_listener.subscribe(on_engine_event)
+    try:
+        engine_event_listener.start()
+    except OSError as e:
+        logger.error(f"❌ Could not listen for rotation events on {ENGINE_EVENTS_SOCKET}: {str(e)}")
 
 #######################################################
 # CONFIGURATION FUNCTIONS
@@ -502,6 +536,9 @@ def load_config():
     # Parse config file
     devices = []
     text_options = []
+    text_weights = []
+    text_selection = DEFAULT_STRATEGY
+    text_catalog = ''
     clock_refresh_time = 300
     displays_between_text = 3
     
@@ -510,40 +547,45 @@ def load_config():
     log_archive_size = 10  # Archive logs when they reach 10MB
     log_delete_days = 30  # Delete archived logs after 30 days
     
+    # Maximum age of a cached display snapshot before a device is asked again
+    display_max_staleness = 5
+    
+    # Send shaping across device groups
+    send_max_in_flight = MAX_IN_FLIGHT
+    send_group_spacing = GROUP_SPACING
+    group_priority = []
+    
+    # Time-windowed playlists, kept as written (the rotation validates them)
+    playlists = []
+    
+    # Quiet hours for all clocks and per group
+    quiet_hours = ''
+    group_quiet_hours = {}
+    
     try:
         with open(config_file, 'r') as f:
             config_content = f.read()
             
-        # Parse devices
-        for i in range(1, 6):  # Check for up to 5 devices
-            device_name_key = f"DEVICE_{i}_NAME"
-            device_ip_key = f"DEVICE_{i}_IP"
-            device_password_key = f"DEVICE_{i}_PASSWORD"
-            
-            name_match = device_name_key + '="([^"]*)"'
-            ip_match = device_ip_key + '="?([^"]*)"?'
-            password_match = device_password_key + '="?([^"]*)"?'
-            
-            name = re.search(name_match, config_content)
-            ip = re.search(ip_match, config_content)
-            password = re.search(password_match, config_content)
-            
-            if ip and ip.group(1).strip():
-                device = {
-                    'id': i,
-                    'name': name.group(1) if name else f"Device {i}",
-                    'ip': ip.group(1),
-                    'password': password.group(1) if password else ""
-                }
-                devices.append(device)
+        # Parse devices (any number of DEVICE_<id>_* entries)
+        devices = DeviceRegistry.from_config_text(config_content).list()
         
         # Parse text options
         text_match = r'TEXT_OPTIONS=\(([^)]*)\)'
         match = re.search(text_match, config_content)
         if match:
             text_part = match.group(1)
-            # Extract quoted strings
-            text_options = re.findall(r'"([^"]*)"', text_part)
+            # Extract quoted strings, each "TEXT" or "TEXT:weight"
+            entries = [parse_text_option(entry) for entry in re.findall(r'"([^"]*)"', text_part)]
+            text_options = [text for text, _ in entries]
+            text_weights = [weight for _, weight in entries]
+        
+        match = re.search(r'^TEXT_SELECTION="?(\w+)"?', config_content, re.MULTILINE)
+        if match and match.group(1) in SELECTORS:
+            text_selection = match.group(1)
+        
+        match = re.search(r'^TEXT_CATALOG="([^"]*)"', config_content, re.MULTILINE)
+        if match:
+            text_catalog = match.group(1)
         
         # Parse timing settings
         refresh_match = r'CLOCK_REFRESH_TIME=(\d+)'
@@ -571,6 +613,31 @@ def load_config():
         match = re.search(log_delete_days_match, config_content)
         if match:
             log_delete_days = int(match.group(1))
+        
+        # Parse display cache settings
+        staleness_match = r'DISPLAY_MAX_STALENESS=(\d+)'
+        match = re.search(staleness_match, config_content)
+        if match:
+            display_max_staleness = int(match.group(1))
+        
+        # Parse send shaping settings
+        match = re.search(r'^SEND_MAX_IN_FLIGHT=(\d+)', config_content, re.MULTILINE)
+        if match:
+            send_max_in_flight = int(match.group(1))
+        
+        match = re.search(r'^SEND_GROUP_SPACING=([\d.]+)', config_content, re.MULTILINE)
+        if match:
+            send_group_spacing = float(match.group(1))
+        
+        match = re.search(r'^GROUP_PRIORITY=\(([^)]*)\)', config_content, re.MULTILINE)
+        if match:
+            group_priority = re.findall(r'"([^"]*)"', match.group(1))
+        
+        # Parse playlists (PLAYLIST_<id>_* entries) and quiet hours
+        settings = parse_settings(config_content.splitlines())
+        playlists = list(read_playlists(settings).values())
+        quiet_hours = settings.get('QUIET_HOURS', '')
+        group_quiet_hours = parse_group_quiet_hours(settings.get('GROUP_QUIET_HOURS'))
             
     except Exception as e:
         logger.error(f"❌ Error parsing config: {str(e)}")
@@ -578,11 +645,21 @@ def load_config():
     return {
         'devices': devices,
         'text_options': text_options,
+        'text_weights': text_weights,
+        'text_selection': text_selection,
+        'text_catalog': text_catalog,
         'clock_refresh_time': clock_refresh_time,
         'displays_between_text': displays_between_text,
         'log_archive_days': log_archive_days,
         'log_archive_size': log_archive_size,
-        'log_delete_days': log_delete_days
+        'log_delete_days': log_delete_days,
+        'display_max_staleness': display_max_staleness,
+        'send_max_in_flight': send_max_in_flight,
+        'send_group_spacing': send_group_spacing,
+        'group_priority': group_priority,
+        'playlists': playlists,
+        'quiet_hours': quiet_hours,
+        'group_quiet_hours': group_quiet_hours
     }
 
 
@@ -623,9 +700,12 @@ DEVICE_1_PASSWORD=""  # Leave empty if no password set on the device
 #DEVICE_5_PASSWORD=""
 
 # --------- TEXT OPTIONS ---------
-# Text options to display (separated by spaces)
+# Text options to display (separated by spaces), optionally with a weight: "_HODL_:3"
 TEXT_OPTIONS=("__GFY__" "_BTFD_" "_HODL_" "SATOSHI" "_NGMI_" "BITCOIN" "FIATSUX" "WENMOON" "BEVSTR")
 
+# How the next text is picked: shuffle, weighted, least_recent, round_robin or random
+TEXT_SELECTION="shuffle"
+
 # --------- TIMING SETTINGS ---------
 # Options: 300 (5 min), 600 (10 min), 900 (15 min), 1800 (30 min), 3600 (hourly)
 CLOCK_REFRESH_TIME=300
@@ -645,16 +725,15 @@ def save_config(config_data):
 
 # --------- DEVICE SETTINGS ---------'''
 
-    # Add device settings
-    for i in range(1, 6):
-        device = next((d for d in config_data['devices'] if d['id'] == i), None)
+    # Add device settings, keeping the placeholders for devices 1-5 in small setups
+    devices = {int(d['id']): d for d in config_data['devices']}
+    for i in sorted(set(devices) | set(range(1, 6))):
+        device = devices.get(i)
         
         if device:
             config_content += f'''
 # Device {i}
-DEVICE_{i}_NAME="{device['name']}"
-DEVICE_{i}_IP="{device['ip']}"
-DEVICE_{i}_PASSWORD="{device['password']}"'''
+''' + '\n'.join(device_lines(device))
         else:
             config_content += f'''
 # Device {i} (Optional)
@@ -662,14 +741,25 @@ DEVICE_{i}_PASSWORD="{device['password']}"'''
 #DEVICE_{i}_IP=""
 #DEVICE_{i}_PASSWORD=""'''
     
-    # Add text options
-    text_options_str = '" "'.join(config_data['text_options'])
+    # Add text options, with their weights when they are not 1
+    weights = config_data.get('text_weights') or []
+    if len(weights) != len(config_data['text_options']):
+        weights = [1] * len(config_data['text_options'])
+    text_options_str = '" "'.join(format_text_option(text, float(weight))
+                                  for text, weight in zip(config_data['text_options'], weights))
+    group_priority_str = ' '.join(f'"{group}"' for group in config_data.get('group_priority', []))
     config_content += f'''
 
 # --------- TEXT OPTIONS ---------
-# Text options to display (separated by spaces)
+# Text options to display (separated by spaces), optionally with a weight: "_HODL_:3"
 TEXT_OPTIONS=("{text_options_str}")
 
+# How the next text is picked: shuffle, weighted, least_recent, round_robin or random
+TEXT_SELECTION="{config_data.get('text_selection', DEFAULT_STRATEGY)}"
+
+# File with one text per line that replaces TEXT_OPTIONS (relative to this file), empty for none
+TEXT_CATALOG="{config_data.get('text_catalog', '')}"
+
 # --------- TIMING SETTINGS ---------
 # Options: 300 (5 min), 600 (10 min), 900 (15 min), 1800 (30 min), 3600 (hourly)
 CLOCK_REFRESH_TIME={config_data['clock_refresh_time']}
@@ -677,6 +767,13 @@ CLOCK_REFRESH_TIME={config_data['clock_refresh_time']}
 # Number of built-in screens to show between our text messages
 DISPLAYS_BETWEEN_TEXT={config_data['displays_between_text']}
 
+# --------- QUIET HOURS ---------
+# No device traffic during these windows, e.g. "23:00-07:00" or "Mon-Fri 01:00-08:00; Sun"
+QUIET_HOURS="{config_data.get('quiet_hours', '')}"
+
+# Per group ("Group=WHEN"), a clock's own DEVICE_<id>_QUIET_HOURS goes first
+GROUP_QUIET_HOURS={format_group_quiet_hours(config_data.get('group_quiet_hours') or {})}
+
 # --------- LOG MANAGEMENT ---------
 # Archive logs after this many days
 LOG_ARCHIVE_DAYS={config_data.get('log_archive_days', 1)}
@@ -690,12 +787,39 @@ LOG_DELETE_DAYS={config_data.get('log_delete_days', 30)}
 # --------- DISPLAY SETTINGS ---------
 # Default theme for the web interface (light, dark, or system)
 DEFAULT_THEME="{config_data.get('default_theme', 'light')}"
+
+# Seconds a cached device display may be reused by the dashboard before asking the device again
+DISPLAY_MAX_STALENESS={config_data.get('display_max_staleness', 5)}
+
+# --------- SEND SHAPING ---------
+# Maximum requests in flight at once when sending to many devices
+SEND_MAX_IN_FLIGHT={config_data.get('send_max_in_flight', MAX_IN_FLIGHT)}
+
+# Seconds between the start of one device group and the next
+SEND_GROUP_SPACING={config_data.get('send_group_spacing', GROUP_SPACING)}
+
+# Groups that receive text first, in this order (other groups follow by name)
+GROUP_PRIORITY=({group_priority_str})
 '''
     
+    # Add playlists
+    if config_data.get('playlists'):
+        config_content += '''
+# --------- PLAYLISTS ---------
+# Texts for certain times, replacing TEXT_OPTIONS while active (see docs/configuration.md)'''
+        for playlist in config_data['playlists']:
+            config_content += '\n' + '\n'.join(playlist_lines(playlist)) + '\n'
+    
     # Write the config file
     with open(config_file, 'w') as f:
         f.write(config_content)
 
+def compact_config(registry):
+    """Rewrite the config file once appended device changes have piled up (see device_registry.py)"""
+    if registry.needs_compaction:
+        logger.info(f"🧹 Compacting the config file ({registry.stale_lines} stale device lines)")
+        save_config(load_config())
+
 #######################################################
 # ROUTE HANDLERS
 #######################################################
@@ -712,8 +836,16 @@ def faq():
 def index():
     """Home page"""
     config = load_config()
+    # Only the size of a text catalog is shown here, the texts are paged in settings
+    catalog_size = None
+    if config['text_catalog']:
+        try:
+            catalog_size = len(open_text_catalog(config['text_catalog']))
+        except OSError:
+            pass
     return render_template('index.html', 
                           config=config, 
+                          catalog_size=catalog_size,
                           rotation_active=rotation_active)
 
 @app.route('/settings')
@@ -725,11 +857,49 @@ def settings():
 @app.route('/save_settings', methods=['POST'])
 def save_settings():
     """Save settings"""
-    data = request.json
+    # Keep settings the page does not edit (e.g. file-only options) as they are
+    data = {**load_config(), **request.json}
     save_config(data)
     #flash('Settings saved successfully!', 'success')
     return jsonify({'success': True})
 
+def open_text_catalog(path):
+    """The configured catalog, kept open between page requests until the file changes"""
+    global text_catalog
+    path = resolve_catalog_path(path, app.config['DEFAULT_CONFIG_FILE'])
+    with text_catalog_lock:
+        if text_catalog is not None and (text_catalog.path != path or text_catalog.changed()):
+            text_catalog.close()
+            text_catalog = None
+        if text_catalog is None:
+            text_catalog = TextCatalog(path)
+        return text_catalog
+
+@app.route('/text_catalog')
+def text_catalog_page():
+    """One page of the text catalog, the settings page never loads the whole file"""
+    # Only the configured catalog, a path from the request could name any file on this machine
+    path = load_config()['text_catalog']
+    if not path:
+        return jsonify({'success': False, 'message': 'No text catalog configured'})
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid offset or limit'}), 400
+    try:
+        catalog = open_text_catalog(path)
+        entries = catalog.page(offset, limit)
+    except OSError as e:
+        return jsonify({'success': False, 'message': f'Could not open text catalog: {str(e)}'})
+    return jsonify({
+        'success': True,
+        'path': path,
+        'total': len(catalog),
+        'offset': max(0, offset),
+        'texts': [{'text': text, 'weight': weight} for text, weight in entries]
+    })
+
 @app.route('/start', methods=['POST'])
 def start():
     """Start text rotation"""
@@ -743,7 +913,7 @@ def start():
 def stop():
     """Stop text rotation"""
     try:
-        if os.environ.get("RUNNING_IN_DOCKER") == "1":
+        if os.environ.get("RUNNING_IN_DOCKER") == "1" and not IN_PROCESS_ENGINE:
             logger.warning("🐳 Docker detected — using manual pkill to stop blockclock")
             subprocess.run(["pkill", "-f", "blockclock.py"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             
@@ -768,53 +938,122 @@ def stop():
 @app.route('/status')
 def status():
     """Get rotation status"""
-    global rotation_active, blockclock_process
+    refresh_rotation_status()
     
-    # Check if process is still running
-    if blockclock_process and blockclock_process.poll() is not None:
-        # Process has exited
-        rotation_active = False
-    
-    return jsonify({'active': rotation_active})
+    return jsonify({
+        'active': rotation_active,
+        'paused': IN_PROCESS_ENGINE and rotation_engine.paused
+    })
+
+@app.route('/pause', methods=['POST'])
+def pause():
+    """Pause the running rotation, keeping its sync state"""
+    if not IN_PROCESS_ENGINE:
+        return jsonify({'success': False, 'error': 'Pausing needs the in-process rotation engine'})
+    if rotation_engine.pause():
+        return jsonify({'success': True, 'paused': True})
+    return jsonify({'success': False, 'error': 'Rotation is not running or already paused'})
+
+@app.route('/resume', methods=['POST'])
+def resume():
+    """Resume a paused rotation"""
+    if IN_PROCESS_ENGINE and rotation_engine.resume():
+        return jsonify({'success': True, 'paused': False})
+    return jsonify({'success': False, 'error': 'Rotation is not paused'})
+
+@app.route('/engine_state')
+def engine_state():
+    """Get the live state of the in-process rotation engine"""
+    if not IN_PROCESS_ENGINE:
+        return jsonify({'success': False, 'error': 'Rotation runs as a separate process'})
+    return jsonify({'success': True, **rotation_engine.state()})
 
 @app.route('/monitoring_status')
 def monitoring_status():
     """Get the current monitoring status"""
-    global monitoring_active, monitoring_message, monitoring_start_time
+    if IN_PROCESS_ENGINE:
+        return jsonify(engine_monitoring_status())
     
-    now = time.time()
-    elapsed_seconds = int(now - monitoring_start_time) if monitoring_start_time > 0 else 0
-    minutes = elapsed_seconds // 60
-    seconds = elapsed_seconds % 60
+    return jsonify(event_monitoring_status())
+
+def device_state_message(device_state, number, total):
+    """Monitoring message for the scheduler state of a device"""
+    if device_state == SYNCING:
+        return "⏳ Waiting for first refresh"
+    if device_state == WAITING:
+        return f"🔄 Sleeping before refresh #{number} of {total}" if number <= total else "🔄 Sleeping before final refresh"
+    if device_state == POLLING:
+        return f"🔍 Actively monitoring for refresh #{number} of {total}" if number <= total else "🔍 Actively monitoring for final refresh"
+    if device_state == QUIET:
+        return "🌙 Quiet hours, no device traffic"
+    return "✅ Refresh cycle complete"
+
+def engine_monitoring_status():
+    """Monitoring message and timers from the live state of the first device"""
+    state = rotation_engine.state()
+    if state['state'] == 'stopped' or not state['devices']:
+        return {'active': False, 'message': monitoring_message, 'elapsed': '00:00', 'expected': ''}
     
-    # Calculate expected sleep time
-    expected_time = ""
-    if blockclock_instance:
-        if "Sleeping before" in monitoring_message:
-            # The expected sleep is clock_refresh_time - 45 seconds
-            expected_seconds = blockclock_instance.clock_refresh_time - 45
-            expected_minutes = expected_seconds // 60
-            expected_remainder = expected_seconds % 60
-            expected_time = f"{expected_minutes}:{expected_remainder:02d}"
-        elif "Waiting for first refresh" in monitoring_message:
-            # First refresh could take a full refresh cycle
-            expected_seconds = blockclock_instance.clock_refresh_time
-            expected_minutes = expected_seconds // 60
-            expected_remainder = expected_seconds % 60
-            expected_time = f"{expected_minutes}:{expected_remainder:02d}"
-        elif "refresh #" in monitoring_message and "of" in monitoring_message:
-            # Regular refresh monitoring, expect just the remaining time before next refresh
-            expected_seconds = blockclock_instance.clock_refresh_time
-            expected_minutes = expected_seconds // 60
-            expected_remainder = expected_seconds % 60
-            expected_time = f"{expected_minutes}:{expected_remainder:02d}"
+    device = state['devices'][0]
+    if state['state'] == 'paused':
+        message = "⏸️  Rotation paused"
+    else:
+        message = device_state_message(device['state'], device['refresh_count'] + 1,
+                                       rotation_engine.control.displays_between_text)
     
-    return jsonify({
-        'active': monitoring_active,
-        'message': monitoring_message,
-        'elapsed': f"{minutes:02d}:{seconds:02d}",
-        'expected': expected_time
-    })
+    elapsed_seconds = int(time.time() - device['state_since'])
+    expected = ""
+    if device['state'] in (WAITING, SYNCING, QUIET) and state['state'] != 'paused':
+        expected_seconds = elapsed_seconds + int(device['next_wake_in'])
+        if device['state'] == SYNCING:
+            expected_seconds = device['refresh_time']
+        expected = f"{expected_seconds // 60}:{expected_seconds % 60:02d}"
+    
+    return {
+        'active': True,
+        'message': message,
+        'elapsed': f"{elapsed_seconds // 60:02d}:{elapsed_seconds % 60:02d}",
+        'expected': expected
+    }
+
+def event_monitoring_status():
+    """Monitoring message and timers of the first device, from the rotation process's events"""
+    event = first_device_event()
+    if event is None or not refresh_rotation_status():
+        return {'active': False, 'message': monitoring_message, 'elapsed': '00:00', 'expected': ''}
+    
+    device_state = EVENT_STATES[event['type']]
+    message = device_state_message(device_state, event.get('number', 1), event.get('total', 0))
+    
+    elapsed_seconds = max(0, int(time.time() - event['at']))
+    expected_seconds = None
+    if device_state == WAITING:
+        expected_seconds = int(event['wake_in'])
+    elif device_state == SYNCING:
+        expected_seconds = int(event['refresh_time'])
+    elif device_state == QUIET:
+        expected_seconds = int(event['until'] - event['at'])
+    expected = f"{expected_seconds // 60}:{expected_seconds % 60:02d}" if expected_seconds is not None else ""
+    
+    return {
+        'active': True,
+        'message': message,
+        'elapsed': f"{elapsed_seconds // 60:02d}:{elapsed_seconds % 60:02d}",
+        'expected': expected
+    }
+
+@app.route('/engine_events')
+def engine_events_status():
+    """Recent rotation events and the latest state of every device"""
+    with engine_events_lock:
+        return jsonify({
+            'success': True,
+            'devices': [engine_device_events[ip] for ip in engine_device_order if ip in engine_device_events],
+            'offline': list(offline_devices.values()),
+            'events': list(recent_events),
+            'delivery': (rotation_engine.events.stats() if IN_PROCESS_ENGINE
+                         else engine_event_listener.stats())
+        })
 
 @app.route('/rate_limit_status')
 def rate_limit_status():
@@ -830,26 +1069,59 @@ def sync_status():
     """Get synchronization status"""
     global rotation_active, first_refresh_detected
     
+    if IN_PROCESS_ENGINE:
+        first_refresh_detected = rotation_engine.state()['synced']
+    
     return jsonify({
-        'active': rotation_active,
+        'active': refresh_rotation_status(),
         'sync_ready': first_refresh_detected
     })
 
+@app.route('/device_health')
+def device_health():
+    """Get the circuit breaker state of every device"""
+    # States seen by the rotation process, written whenever a breaker changes state
+    rotation_devices = {}
+    updated_at = None
+    control = engine_control()
+    if control is not None:
+        rotation_devices = control.connections.breakers.status()
+        updated_at = time.time()
+    elif os.path.exists(DEVICE_STATUS_FILE):
+        try:
+            with open(DEVICE_STATUS_FILE, 'r') as f:
+                status = json.load(f)
+            rotation_devices = status.get('devices', {})
+            updated_at = status.get('updated_at')
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read device status: {str(e)}")
+    
+    return jsonify({
+        'success': True,
+        'active': rotation_active,
+        'devices': rotation_devices,
+        'updated_at': updated_at,
+        'web_devices': device_pool.breakers.status()
+    })
+
+@app.route('/send_metrics')
+def send_metrics():
+    """Get counts of text sends and of sends skipped as redundant"""
+    return jsonify({
+        'success': True,
+        'web': send_dedup.stats()
+    })
+
 @app.route('/logs')
 def get_logs():
     """Get the recent application logs"""
-    # Use the central log file location
-    log_path = os.path.join(project_root, 'logs', 'blockclock.log')
-    
     log_content = "No log file found. Please start the text rotation to generate logs."
     
-    if os.path.exists(log_path):
+    if os.path.exists(log_file_path):
         try:
-            with open(log_path, 'r') as f:
-                lines = f.readlines()
-                # Get the last 200 lines
-                recent_logs = lines[-200:] if len(lines) > 200 else lines
-                log_content = ''.join(recent_logs)
+            # Only the bytes appended since the last request are read
+            log_tailer.poll()
+            log_content = recent_log_lines.text()
         except Exception as e:
             log_content = f"Error reading log file: {str(e)}"
     
@@ -864,16 +1136,25 @@ def check_device():
     data = request.json
     ip = data.get('ip', '')
     
-    # Use ping to check if device is reachable
+    # Probe the device's API port in-process (TCP connect + HEAD /api/status)
     try:
-        ping_command = ["ping", "-c", "1", "-W", "2", ip]
-        result = subprocess.run(ping_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        reachable = result.returncode == 0
+        result = probe_device({'name': ip, 'ip': ip, 'password': data.get('password', '')}, pool=engine_device_pool())
+        reachable = result['reachable']
+        
+        if reachable and result['api_ok']:
+            message = f"Device is reachable ({result['rtt_ms']} ms)"
+        elif reachable:
+            message = f"Device is reachable but its API did not respond properly ({result['error'] or result['api_status']})"
+        else:
+            message = 'Device is not reachable'
         
         return jsonify({
             'success': True,
             'reachable': reachable,
-            'message': 'Device is reachable' if reachable else 'Device is not reachable'
+            'rtt_ms': result['rtt_ms'],
+            'api_ok': result['api_ok'],
+            'api_status': result['api_status'],
+            'message': message
         })
     except Exception as e:
         return jsonify({
@@ -882,6 +1163,92 @@ def check_device():
             'message': str(e)
         })
 
+@app.route('/devices')
+def list_devices():
+    """List configured devices, optionally looked up by id, name, ip or group"""
+    registry = DeviceRegistry.load(app.config['DEFAULT_CONFIG_FILE'])
+    
+    if request.args.get('group'):
+        devices = registry.group(request.args['group'])
+    else:
+        lookups = [
+            ('id', registry.get),
+            ('name', registry.by_name),
+            ('ip', registry.by_ip),
+        ]
+        devices = registry.list()
+        for key, lookup in lookups:
+            if request.args.get(key):
+                try:
+                    device = lookup(request.args[key])
+                except ValueError as e:
+                    return jsonify({'success': False, 'message': str(e)}), 400
+                devices = [device] if device else []
+                break
+    
+    return jsonify({
+        'success': True,
+        'devices': devices,
+        'groups': registry.groups(),
+        'count': len(registry)
+    })
+
+@app.route('/add_device', methods=['POST'])
+def add_device():
+    """Add one device by appending it to the config file"""
+    data = request.json or {}
+    name = str(data.get('name') or '').strip()
+    ip = str(data.get('ip') or '').strip()
+    
+    if not name or not ip:
+        return jsonify({'success': False, 'message': 'Device name and IP address are required'})
+    
+    device = {'name': name, 'ip': ip, 'password': data.get('password', '')}
+    if data.get('group'):
+        device['group'] = data['group'].strip()
+    if data.get('refresh_time'):
+        refresh_time = str(data['refresh_time']).strip()
+        if not refresh_time.isdigit() or int(refresh_time) == 0:
+            return jsonify({'success': False, 'message': 'Refresh time must be a whole number of seconds'}), 400
+        device['refresh_time'] = int(refresh_time)
+    
+    config_file = app.config['DEFAULT_CONFIG_FILE']
+    registry = DeviceRegistry.load(config_file)
+    try:
+        device = registry.append_device(config_file, device)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    compact_config(registry)
+    
+    logger.info(f"➕ Added device {device['name']} ({device['ip']}) as device {device['id']}")
+    return jsonify({'success': True, 'device': device})
+
+@app.route('/remove_device', methods=['POST'])
+def remove_device():
+    """Remove one device by marking it removed at the end of the config file"""
+    data = request.json or {}
+    config_file = app.config['DEFAULT_CONFIG_FILE']
+    registry = DeviceRegistry.load(config_file)
+    
+    device = None
+    if data.get('id'):
+        try:
+            device = registry.get(data['id'])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    elif data.get('ip'):
+        device = registry.by_ip(data['ip'])
+    elif data.get('name'):
+        device = registry.by_name(data['name'])
+    
+    if device is None:
+        return jsonify({'success': False, 'message': 'Device not found'})
+    
+    registry.append_removal(config_file, device['id'])
+    compact_config(registry)
+    logger.info(f"➖ Removed device {device['name']} ({device['ip']})")
+    return jsonify({'success': True, 'device': device})
+
 @app.route('/current_display')
 def current_display():
     """Get the current text being displayed on BlockClocks"""
@@ -896,99 +1263,79 @@ def current_display():
         })
     
     try:
-        # Create a temporary connection directly without using BlockClockControl
-        config_file = app.config['DEFAULT_CONFIG_FILE']
+        # Read the first configured device (with its password) from the config
+        config = load_config()
+        if config['devices']:
+            device = config['devices'][0]
+        else:
+            device = {'name': 'Device 1', 'ip': "192.168.0.177", 'password': ''}  # Default IP
         
-        # Get device IP from config
-        device_ip = "192.168.0.177"  # Default IP
-        try:
-            with open(config_file, 'r') as f:
-                for line in f:
-                    if line.strip().startswith('DEVICE_1_IP='):
-                        ip_part = line.strip().split('=', 1)[1]
-                        # Remove quotes if present
-                        if ip_part.startswith('"') and ip_part.endswith('"'):
-                            device_ip = ip_part[1:-1]
-                        else:
-                            device_ip = ip_part
-                        break
-        except Exception as e:
-            logger.error(f"❌ Error reading config file: {e}")
+        # Serve the shared snapshot; a background poller keeps it fresh while
+        # the dashboard is open, however many tabs are polling this route
+        # Explicit staleness, the rotation's cache keeps its own for the rotation
+        cache = engine_display_cache()
+        cache.start_poller(device, interval=config['display_max_staleness'])
+        snapshot = cache.get(device, max_age=config['display_max_staleness'])
         
-        # Get the current display directly using requests
-        try:
-            url = f"http://{device_ip}/api/status"
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "rendered" in data and "contents" in data["rendered"]:
-                    display_text = "".join(data["rendered"]["contents"])
-                    
-                    # Determine display type and format display text
-                    if "$" in display_text:
-                        # It's a Bitcoin price
-                        # Extract only the numeric part
-                        price = ""
-                        for char in display_text:
-                            if char.isdigit():
-                                price += char
-                        
-                        # Format the price with commas
-                        if price:
-                            if len(price) <= 3:
-                                formatted_price = price
-                            elif len(price) <= 6:
-                                # Add one comma (e.g., 12,345)
-                                formatted_price = f"{price[:-3]},{price[-3:]}"
-                            else:
-                                # Add two commas (e.g., 1,234,567)
-                                formatted_price = f"{price[:-6]},{price[-6:-3]},{price[-3:]}"
-                        else:
-                            formatted_price = price
-                        
-                        display_type = "Price Display"
-                        display_info = f"BTC/USD: ${formatted_price}"
-                    elif display_text.strip().isdigit():
-                        # It's a block height
-                        display_type = "Block Height Display"
-                        display_info = f"Block Height: {display_text.strip()}"
-                    elif "TIME" in display_text:
-                        # It's Moscow Time
-                        display_type = "Moscow Time Display"
-                        match = re.search(r'TIME\s+(\d+)', display_text)
-                        time_only = match.group(1) if match else display_text
-                        display_info = f"Moscow Time: {time_only}"
-                    elif display_text.isupper() and len(display_text) <= 7:
-                        # It's likely custom text
-                        display_type = "Custom Text"
-                        display_info = f"{display_text}"
+        if snapshot['ok']:
+            display_text = snapshot['display']
+
+            # Determine display type and format display text
+            if "$" in display_text:
+                # It's a Bitcoin price
+                # Extract only the numeric part
+                price = ""
+                for char in display_text:
+                    if char.isdigit():
+                        price += char
+
+                # Format the price with commas
+                if price:
+                    if len(price) <= 3:
+                        formatted_price = price
+                    elif len(price) <= 6:
+                        # Add one comma (e.g., 12,345)
+                        formatted_price = f"{price[:-3]},{price[-3:]}"
                     else:
-                        # Unknown type
-                        display_type = "BlockClock Display"
-                        display_info = display_text
-                        
-                    return jsonify({
-                        'success': True,
-                        'display_text': display_info,
-                        'display_type': display_type
-                    })
-            
-            # Default fallback
+                        # Add two commas (e.g., 1,234,567)
+                        formatted_price = f"{price[:-6]},{price[-6:-3]},{price[-3:]}"
+                else:
+                    formatted_price = price
+
+                display_type = "Price Display"
+                display_info = f"BTC/USD: ${formatted_price}"
+            elif display_text.strip().isdigit():
+                # It's a block height
+                display_type = "Block Height Display"
+                display_info = f"Block Height: {display_text.strip()}"
+            elif "TIME" in display_text:
+                # It's Moscow Time
+                display_type = "Moscow Time Display"
+                match = re.search(r'TIME\s+(\d+)', display_text)
+                time_only = match.group(1) if match else display_text
+                display_info = f"Moscow Time: {time_only}"
+            elif display_text.isupper() and len(display_text) <= 7:
+                # It's likely custom text
+                display_type = "Custom Text"
+                display_info = f"{display_text}"
+            else:
+                # Unknown type
+                display_type = "BlockClock Display"
+                display_info = display_text
+
             return jsonify({
                 'success': True,
-                'display_text': 'CONNECTING',
-                'display_type': 'Connecting to BlockClock...'
-            })
-            
-        except requests.exceptions.RequestException as e:
-            return jsonify({
-                'success': False,
-                'error': f"Connection error: {str(e)}",
-                'display_text': 'ERROR',
-                'display_type': 'Connection failed'
+                'display_text': display_info,
+                'display_type': display_type
             })
         
+        return jsonify({
+            'success': False,
+            'error': "Connection error: device did not return its display",
+            'display_text': 'ERROR',
+            'display_type': 'Connection failed'
+        })
+        
     except Exception as e:
             error_msg = f"Error getting current display: {str(e)}"
             logger.error(f"❌ {error_msg}")
@@ -999,6 +1346,35 @@ def current_display():
                 'display_type': 'Error occurred'
             })
 
+# Seconds /send_text waits for the running rotation to show a manual text
+MANUAL_TEXT_WAIT = 5
+
+def show_text_on_engine(text):
+    """Hand a manual text to the running rotation engine, which keeps its sync"""
+    global last_manual_text_time
+    
+    manual = rotation_engine.show_text(text)
+    if manual is None:
+        return {'success': False, 'message': 'BlockClock rotation is not running. Please start rotation first.'}
+    last_manual_text_time = time.time()
+    
+    if manual.wait(MANUAL_TEXT_WAIT):
+        # No results at all means no device was sent the text either
+        if not any(result['success'] for result in manual.results):
+            reasons = sorted({result['error'] for result in manual.results if result['error']})
+            detail = f" ({', '.join(reasons)})" if reasons else ''
+            return {'success': False, 'message': f'Text \"{text}\" was not shown on any device{detail}',
+                    'results': manual.results}
+        return {'success': True, 'message': f'Text \"{text}\" sent successfully', 'results': manual.results}
+    
+    # Devices close to a refresh show it right after the refresh instead
+    return {
+        'success': True,
+        'queued': True,
+        'message': f'Text \"{text}\" queued, devices close to a refresh will show it right after',
+        'results': manual.results
+    }
+
 @app.route('/send_text', methods=['POST'])
 def send_text():
     """Send a custom text to devices"""
@@ -1037,36 +1413,15 @@ def send_text():
         logger.info(f"📱 Manual one-time text requested: \"{text}\"")
         logger.info("")
 
+        if IN_PROCESS_ENGINE:
+            return jsonify(show_text_on_engine(text))
+
         # Instead of creating a new instance, we'll call the API directly for each device
         # This avoids creating a parallel process
         config_file = app.config['DEFAULT_CONFIG_FILE']
         
         # Load devices from config
-        devices = []
-        with open(config_file, 'r') as f:
-            config_content = f.read()
-            
-        # Parse devices from the config - reuse the same code pattern from load_config()
-        for i in range(1, 6):  # Check for up to 5 devices
-            device_name_key = f"DEVICE_{i}_NAME"
-            device_ip_key = f"DEVICE_{i}_IP"
-            device_password_key = f"DEVICE_{i}_PASSWORD"
-            
-            name_match = device_name_key + '="([^"]*)"'
-            ip_match = device_ip_key + '="?([^"]*)"?'
-            password_match = device_password_key + '="?([^"]*)"?'
-            
-            name = re.search(name_match, config_content)
-            ip = re.search(ip_match, config_content)
-            password = re.search(password_match, config_content)
-            
-            if ip and ip.group(1).strip():
-                device = {
-                    'name': name.group(1) if name else f"Device {i}",
-                    'ip': ip.group(1),
-                    'password': password.group(1) if password else ""
-                }
-                devices.append(device)
+        devices = DeviceRegistry.load(config_file).list()
         
         if not devices:
             logger.error("❌ No devices configured for manual text send")
@@ -1075,17 +1430,9 @@ def send_text():
                 'message': 'No devices configured'
             })
         
-        # Check if at least one device is reachable
-        any_reachable = False
-        for device in devices:
-            ping_command = ["ping", "-c", "1", "-W", "2", device['ip']]
-            try:
-                result = subprocess.run(ping_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                if result.returncode == 0:
-                    any_reachable = True
-                    break
-            except Exception as e:
-                continue
+        # Check if at least one device is reachable (all probed in parallel)
+        probe_results = probe_devices(devices, pool=device_pool)
+        any_reachable = any(result['reachable'] for result in probe_results)
         
         if not any_reachable:
             logger.error("❌ No devices reachable for manual text send")
@@ -1094,26 +1441,27 @@ def send_text():
                 'message': 'No devices are reachable'
             })
         
-        # Send text directly to each device without creating a new BlockClockControl instance
-        for device in devices:
-            name = device["name"]
-            ip = device["ip"]
-            password = device["password"]
-            
-            # Prepare API URL
-            url = f"http://{ip}/api/show/text/{text}"
-            
-            try:
-                # Make the request
-                if password:
-                    response = requests.get(url, auth=("", password), timeout=5)
-                else:
-                    response = requests.get(url, timeout=5)
-                
+        # Send text group by group without creating a new BlockClockControl instance
+        config = load_config()
+        send_policy = SendPolicy(config['send_max_in_flight'], config['send_group_spacing'], config['group_priority'])
+        to_send, skipped = send_dedup.partition(devices, text)
+        results, groups = send_policy.fan_out(device_pool, to_send, f"/api/show/text/{text}")
+        send_dedup.record(results, text)
+        for result in skipped:
+            logger.info(f"⏭️  [{result['name']}] already has \"{text}\", skipping send ({result['skipped']})")
+        results += skipped
+        for result in results:
+            if result["error"]:
+                logger.error(f"❌ Error sending text to {result['name']}: {result['error']} "
+                             f"(after {result['completed_after']:.2f}s)")
+            else:
                 # Log the text send
-                logger.info(f"✅ [{name}] updated with one-time text: \"{text}\"")
-            except Exception as e:
-                logger.error(f"❌ Error sending text to {name}: {str(e)}")
+                logger.info(f"✅ [{result['name']}] updated with one-time text: \"{text}\" "
+                            f"(completed after {result['completed_after']:.2f}s)")
+        if len(groups) > 1:
+            for group in groups:
+                logger.info(f"⏱️  Group \"{group['group']}\": {group['succeeded']}/{group['devices']} devices "
+                            f"updated, completed after {group['completed_after']:.2f}s")
 
         # ✅ This block must be OUTSIDE the for-loop
         # After sending text, restart the app process
@@ -1140,7 +1488,9 @@ def send_text():
             last_manual_text_time = time.time()
             return jsonify({
                 'success': True,
-                'message': f'Text \"{text}\" sent successfully. Please press Start to resume the app.'
+                'message': f'Text \"{text}\" sent successfully. Please press Start to resume the app.',
+                'results': results,
+                'groups': groups
             })
 
         # Outside Docker: safe to proceed
@@ -1158,7 +1508,9 @@ def send_text():
 
         return jsonify({
             'success': True,
-            'message': f'Text \"{text}\" sent successfully (restarting app to maintain sync)'
+            'message': f'Text \"{text}\" sent successfully (restarting app to maintain sync)',
+            'results': results,
+            'groups': groups
         })
 
     except Exception as e: